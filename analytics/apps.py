@@ -1,6 +1,35 @@
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
+
+_startup_lock = threading.Lock()
+_started = False
 
 
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analytics'
+
+
+def start_serving_process() -> None:
+    """
+    Background startup work of a process that serves requests: MongoDB index checks and
+    the Ollama model warm-up, each behind its setting. Called by the serving entry points
+    only (wsgi.py, which runserver loads too, and the ASGI lifespan startup), never from
+    ready(), so management commands, scripts, tests and batch workers stay quiet.
+    Runs once per process.
+    """
+    global _started
+    with _startup_lock:
+        if _started:
+            return
+        _started = True
+    if getattr(settings, "MONGODB_ENSURE_INDEXES_ON_STARTUP", False):
+        from .services.mongo_indexes import ensure_indexes_in_background
+
+        ensure_indexes_in_background()
+    if getattr(settings, "OLLAMA_WARM_UP_ON_STARTUP", False):
+        from .services.ollama_client import warm_up_in_background
+
+        warm_up_in_background()
@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from analytics.services import report_generator, text_processing, utils
+from analytics.services.fake_ollama import FakeOllamaServer
+from analytics.services.inference_scheduler import AsyncInferenceLimiter, InferenceScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the weekly report endpoint through the sync (WSGI) and async (ASGI) "
+        "code paths against a fake Ollama server with configurable latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per run")
+        parser.add_argument("--wsgi-threads", type=int, default=8, help="Worker threads of the simulated WSGI server")
+        parser.add_argument("--concurrency", type=int, default=200, help="Concurrent in-flight requests on the ASGI side")
+        parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds the fake Ollama takes per call")
+        parser.add_argument("--mongo-latency", type=float, default=0.01, help="Seconds a simulated Mongo fetch takes")
+        parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        mongo_latency = options["mongo_latency"]
+
+        def fake_fetch(intern_id, start_date, end_date):
+            time.sleep(mongo_latency)
+            return [
+                {
+                    "date": start_date,
+                    "todays_work": f"Completed feature {intern_id} and tested the API",
+                    "challenges": "Debugged a failing build",
+                    "tomorrow_plan": "Implement the review comments",
+                }
+            ]
+
+        # The debug toolbar is a dev-only, sync-only middleware that serializes async requests;
+        # leave it out of both runs so they measure what a production deployment would do.
+        middleware = [name for name in settings.MIDDLEWARE if not name.startswith("debug_toolbar.")]
+
+        # Let the fake server, not the scheduler, be the only limit on parallel LLM calls
+        scheduler = InferenceScheduler(max_in_flight=total, max_queue_size=total)
+        limiter = AsyncInferenceLimiter(max_in_flight=total, max_queue_size=total)
+
+        with FakeOllamaServer(latency=options["llm_latency"]) as fake, \
+                override_settings(ALLOWED_HOSTS=["testserver"], MIDDLEWARE=middleware), \
+                mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url), \
+                mock.patch.object(text_processing, "get_llm_cache", return_value=None), \
+                mock.patch.object(text_processing, "get_scheduler", return_value=scheduler), \
+                mock.patch.object(text_processing, "get_async_limiter", return_value=limiter), \
+                mock.patch.object(report_generator, "fetch_logbook_entries", fake_fetch), \
+                mock.patch.object(utils, "fetch_logbook_entries", fake_fetch), \
+                contextlib.redirect_stdout(io.StringIO()):
+            results = {
+                "wsgi": self._run_wsgi(total, options["wsgi_threads"]),
+                "asgi": self._run_asgi(total, options["concurrency"]),
+            }
+        scheduler.shutdown()
+
+        results["config"] = {key: options[key] for key in ("requests", "wsgi_threads", "concurrency", "llm_latency", "mongo_latency")}
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for name in ("wsgi", "asgi"):
+            r = results[name]
+            self.stdout.write(
+                f"{name.upper()}: {r['requests']} requests in {r['elapsed_s']}s "
+                f"-> {r['throughput_rps']} req/s (p50 {r['latency_ms']['p50']}ms, "
+                f"p95 {r['latency_ms']['p95']}ms, errors {r['errors']})"
+            )
+
+    def _run_wsgi(self, total: int, threads: int) -> dict:
+        client = Client()
+
+        def one(i: int) -> tuple:
+            started = time.perf_counter()
+            response = client.get(f"/api/interns/intern-{i}/weekly-report/")
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            samples = list(pool.map(one, range(total)))
+        return self._summarize(samples, time.perf_counter() - started)
+
+    def _run_asgi(self, total: int, concurrency: int) -> dict:
+        async def run() -> list:
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(i: int) -> tuple:
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(f"/api/interns/intern-{i}/weekly-report/async/")
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(*(one(i) for i in range(total)))
+
+        started = time.perf_counter()
+        samples = asyncio.run(run())
+        return self._summarize(samples, time.perf_counter() - started)
+
+    @staticmethod
+    def _summarize(samples: list, elapsed: float) -> dict:
+        latencies = sorted(latency for latency, _ in samples)
+        p95_index = max(0, int(len(latencies) * 0.95) - 1)
+        return {
+            "requests": len(samples),
+            "errors": sum(1 for _, status in samples if status != 200),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": round(statistics.median(latencies) * 1000, 1),
+                "p95": round(latencies[p95_index] * 1000, 1),
+            },
+        }
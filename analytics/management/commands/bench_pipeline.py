@@ -0,0 +1,193 @@
+import contextlib
+import io
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from analytics.services import report_generator, scoring_engine, text_normalization, text_processing
+from analytics.services.fake_ollama import FakeOllamaServer
+from analytics.services.synthetic_logbook import generate_dailyrecords, generate_interns, write_snapshot
+from analytics.services.utils import fetch_logbook_entries, get_week_range
+
+TEXT_CASES = ("clean_text", "text_normalization.")
+
+SCORERS = ["tokenize_entries", "batch_sentiment_score", "consistency_score", "effort_score", "compute_intern_score"]
+
+
+def measure(func, repeat: int, number: int = 1) -> dict:
+    """Run `func` number x repeat times; per-call statistics over the `repeat` samples."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "calls": repeat * number,
+        "min_ms": round(samples[0] * 1000, 4),
+        "median_ms": round(median * 1000, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000, 4),
+        "ops_per_second": round(1 / median, 1) if median else None,
+    }
+
+
+def regex_clean_text(text: str) -> str:
+    """The two-pass regex clean_text that text_normalization replaced, as a baseline."""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^A-Za-z0-9.,;:!?()\-\n ]', '', text)
+    return text.strip()
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the report pipeline stages (fetch, text build, scorers, text normalization, end-to-end "
+        "generate_weekly_report) on a synthetic logbook, against a fake Ollama with configurable latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interns", type=int, default=50)
+        parser.add_argument("--days", type=int, default=60, help="Days of synthetic history per intern")
+        parser.add_argument("--window", type=int, default=7, help="Report window in days")
+        parser.add_argument("--entry-words", type=int, default=30, help="Average words per work description")
+        parser.add_argument("--vocabulary-file", help="Word list (one per line) to build entries from")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--repeat", type=int, default=20, help="Samples per benchmark")
+        parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake Ollama takes per call")
+        parser.add_argument("--only", action="append", help="Run only benchmarks whose name starts with this")
+        parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+        parser.add_argument("--output", help="Also write the JSON results to this file")
+        parser.add_argument("--compare", help="JSON results of an earlier run to compare the medians against")
+
+    def handle(self, *args, **options):
+        vocabulary = None
+        if options["vocabulary_file"]:
+            with open(options["vocabulary_file"], encoding="utf-8") as words:
+                vocabulary = [word.strip() for word in words if word.strip()]
+            if not vocabulary:
+                raise CommandError(f"{options['vocabulary_file']} has no words.")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as previous:
+                baseline = json.load(previous)["benchmarks"]
+
+        with tempfile.TemporaryDirectory(prefix="bench-logbook-") as directory:
+            interns = generate_interns(options["interns"], seed=options["seed"])
+            end_date = "2025-12-31"
+            entries = write_snapshot(directory, interns, generate_dailyrecords(
+                interns, options["days"], end_date, options["entry_words"], vocabulary, seed=options["seed"],
+            ))
+            # Reports read the synthetic snapshot; nothing is cached or stored between samples
+            with override_settings(
+                LOGBOOK_DATA_SOURCE="snapshot",
+                LOGBOOK_SNAPSHOT_DIR=directory,
+                LOGBOOK_SNAPSHOT_AS_OF=end_date,
+                PERSIST_WEEKLY_REPORTS=False,
+                FEATURE_STORE_ENABLED=False,
+            ), mock.patch.object(text_processing, "get_llm_cache", return_value=None), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                benchmarks = self._run(interns, options)
+
+        results = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_revision": _git_revision(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "config": {
+                    key: options[key]
+                    for key in ("interns", "days", "window", "entry_words", "seed", "repeat", "llm_latency")
+                },
+                "entries": entries,
+            },
+            "benchmarks": benchmarks,
+        }
+        if baseline is not None:
+            for name, stats in benchmarks.items():
+                previous = baseline.get(name)
+                if previous and previous.get("median_ms"):
+                    stats["change"] = round(stats["median_ms"] / previous["median_ms"] - 1, 3)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(results, output, indent=2)
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{entries} synthetic entries, {options['interns']} interns, {options['window']}-day window")
+        for name, stats in benchmarks.items():
+            change = f"  {stats['change']:+.1%}" if "change" in stats else ""
+            self.stdout.write(
+                f"  {name:<44} median {stats['median_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms{change}"
+            )
+
+    def _run(self, interns, options) -> dict:
+        repeat = options["repeat"]
+        only = options["only"]
+        start_date, end_date = get_week_range(options["window"])
+        intern_ids = [str(intern["id"]) for intern in interns]
+        window = {intern_id: fetch_logbook_entries(intern_id, start_date, end_date) for intern_id in intern_ids}
+        texts = {intern_id: report_generator._build_log_texts_from_entries(e) for intern_id, e in window.items()}
+        all_texts = [text for intern_texts in texts.values() for text in intern_texts]
+
+        def cohort(func, values):
+            return lambda: [func(value) for value in values]
+
+        cases = {
+            "fetch_logbook_entries": cohort(lambda i: fetch_logbook_entries(i, start_date, end_date), intern_ids),
+            "build_log_texts": cohort(report_generator._build_log_texts_from_entries, window.values()),
+            "clean_text": cohort(text_processing.clean_text, all_texts),
+            "clean_text.regex_baseline": cohort(regex_clean_text, all_texts),
+            "text_normalization.normalize_batch": lambda: text_normalization.normalize_batch(all_texts, unicode=False),
+            "text_normalization.normalize_batch.unicode": lambda: text_normalization.normalize_batch(all_texts, unicode=True),
+        }
+        for name in SCORERS:
+            cases[f"scoring_engine.{name}"] = cohort(getattr(scoring_engine, name), texts.values())
+
+        benchmarks = {}
+        for name, func in cases.items():
+            if not only or any(name.startswith(prefix) for prefix in only):
+                func()  # warm-up: snapshot index, sentiment lexicon, ...
+                items = len(all_texts if name.startswith(TEXT_CASES) else intern_ids)
+                stats = measure(func, repeat)
+                benchmarks[name] = {**stats, "items": items}
+                if stats["median_ms"]:
+                    benchmarks[name]["items_per_second"] = round(items / stats["median_ms"] * 1000, 1)
+
+        name = "generate_weekly_report"
+        if not only or any(name.startswith(prefix) for prefix in only):
+            with FakeOllamaServer(latency=options["llm_latency"]) as fake, \
+                    override_settings(OLLAMA_BACKENDS=[fake.url]):
+                intern = interns[0]
+                report_generator.generate_weekly_report(str(intern["id"]), intern["name"], options["window"])
+                benchmarks[name] = {
+                    **measure(
+                        lambda: report_generator.generate_weekly_report(str(intern["id"]), intern["name"], options["window"]),
+                        repeat,
+                    ),
+                    "items": 1,
+                }
+        return benchmarks
@@ -0,0 +1,92 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.services.sentiment import TextBlobSentiment, build_lexicon_backend
+
+SUBJECTS = ["the login API", "unit tests", "the dashboard", "a failing build", "the auth service", "the report page"]
+VERBS = ["Completed", "Developed", "Tested", "Debugged", "Implemented", "Fixed", "Optimized", "Reviewed"]
+PHRASES = [
+    "it was really good progress",
+    "the deployment was not easy",
+    "very difficult bug in the cache",
+    "great feedback from the mentor!",
+    "never had such a slow query",
+    "pretty happy with the new design",
+    "still stuck, the docs are confusing",
+    "extremely useful pairing session",
+    "nothing special today",
+]
+
+
+def synthetic_entries(count: int, seed: int = 42):
+    """Logbook-like texts built from a fixed vocabulary."""
+    rnd = random.Random(seed)
+    return [
+        f"{rnd.choice(VERBS)} {rnd.choice(SUBJECTS)}. {rnd.choice(PHRASES).capitalize()}. "
+        f"Tomorrow: {rnd.choice(VERBS).lower()} {rnd.choice(SUBJECTS)}, {rnd.choice(PHRASES)}."
+        for _ in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare sentiment throughput of the lexicon backend and TextBlob on synthetic entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=100_000)
+        parser.add_argument("--batch-size", type=int, default=1000, help="Entries per lexicon batch call")
+        parser.add_argument("--textblob-entries", type=int, default=None,
+                            help="Score only this many entries with TextBlob and extrapolate (default: all)")
+        parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+
+    def handle(self, *args, **options):
+        entries = synthetic_entries(options["entries"])
+        batch_size = options["batch_size"]
+        results = {"entries": len(entries)}
+
+        started = time.perf_counter()
+        lexicon = build_lexicon_backend()
+        results["lexicon_load_seconds"] = round(time.perf_counter() - started, 3)
+
+        started = time.perf_counter()
+        lexicon_scores = []
+        for offset in range(0, len(entries), batch_size):
+            lexicon_scores.extend(lexicon.score_batch(entries[offset:offset + batch_size]))
+        elapsed = time.perf_counter() - started
+        results["lexicon"] = {"seconds": round(elapsed, 3), "entries_per_second": round(len(entries) / elapsed)}
+
+        try:
+            textblob = TextBlobSentiment()
+        except ImportError:
+            results["textblob"] = None
+        else:
+            sample = entries[: options["textblob_entries"] or len(entries)]
+            started = time.perf_counter()
+            textblob_scores = [textblob.score(text) for text in sample]
+            elapsed = time.perf_counter() - started
+            differences = [abs(a - b) for a, b in zip(lexicon_scores, textblob_scores)]
+            results["textblob"] = {
+                "entries": len(sample),
+                "seconds": round(elapsed, 3),
+                "entries_per_second": round(len(sample) / elapsed),
+                "speedup": round(results["lexicon"]["entries_per_second"] / (len(sample) / elapsed), 1),
+                "max_score_difference": max(differences, default=0.0),
+                "mismatched_scores": sum(1 for diff in differences if diff > 0.01),
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{results['entries']} entries (lexicon loaded in {results['lexicon_load_seconds']}s)")
+        self.stdout.write(f"  lexicon : {results['lexicon']['entries_per_second']:>9} entries/s")
+        if results["textblob"] is None:
+            self.stdout.write("  textblob: not installed")
+        else:
+            tb = results["textblob"]
+            self.stdout.write(
+                f"  textblob: {tb['entries_per_second']:>9} entries/s  ({tb['speedup']}x slower, "
+                f"{tb['mismatched_scores']} of {tb['entries']} scores differ, max diff {tb['max_score_difference']})"
+            )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.services.mongo_indexes import check_query_shapes, ensure_indexes, resolve_logbook_source
+from analytics.services.utils import get_logbook_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Create (or with --check, only verify) the MongoDB indexes the report pipeline needs, "
+        "and explain() its hot queries to catch collection scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Do not create anything; fail if an index is missing")
+        parser.add_argument("--no-explain", action="store_true", help="Skip the explain() query plan check")
+
+    def handle(self, *args, **options):
+        db = get_logbook_collection().database
+
+        source = resolve_logbook_source(db)
+        if source:
+            self.stdout.write(f"Logbook entries: {source[0]}.{source[1]}")
+
+        problems = []
+        for collection_name, statuses in ensure_indexes(db, create=not options["check"]).items():
+            for index_name, status in statuses.items():
+                self.stdout.write(f"  {collection_name}.{index_name}: {status}")
+                if status in ("missing", "conflict"):
+                    problems.append(f"{collection_name}.{index_name} is {status}")
+
+        if not options["no_explain"]:
+            for result in check_query_shapes(db):
+                plan = " > ".join(result["stages"]) or "?"
+                self.stdout.write(f"  query {result['label']}: {plan}")
+                if result["collscan"]:
+                    problems.append(f"query {result['label']} uses a COLLSCAN")
+
+        if problems:
+            raise CommandError("; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("MongoDB indexes OK"))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.services.logbook_store import LogbookStore, export_to_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Export logbook entries (from Mongo, or the BSON snapshot with LOGBOOK_DATA_SOURCE=snapshot) "
+        "into the local month-partitioned analytics store, with their scoring features."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--full", action="store_true", help="Rebuild the store instead of exporting new entries only")
+        parser.add_argument("--path", default=None, help="Store file (default: settings.LOGBOOK_STORE_PATH)")
+
+    def handle(self, *args, **options):
+        store = LogbookStore(options["path"])
+        started = time.perf_counter()
+        stats = export_to_store(store, batch_size=options["batch_size"], full=options["full"])
+        self.stdout.write(
+            f"Exported {stats['written']} of {stats['read']} entries in {time.perf_counter() - started:.1f}s "
+            f"to {store.path} ({store.count()} rows in {len(store.partitions())} partitions)"
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from analytics.services.batch_scoring import run_batch_scoring
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly batch: score every intern for the current window (and run the Ollama analysis), "
+        "fanned out over a process pool, and store the reports served by the weekly report API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0 = run in-process)")
+        parser.add_argument("--chunk-size", type=int, default=25, help="Interns per worker task")
+        parser.add_argument("--no-llm", action="store_true", help="Only compute the scores, skip the Ollama analysis")
+        parser.add_argument("--resume", action="store_true", help="Skip interns already done by an interrupted run of the same window")
+        parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: settings.SCORE_INTERNS_CHECKPOINT)")
+
+    def handle(self, *args, **options):
+        def progress(state):
+            eta = f"{state['eta']:.0f}s" if state["eta"] is not None else "?"
+            self.stdout.write(
+                f"  {state['done']}/{state['done'] + state['remaining']} interns "
+                f"({state['failed']} failed, {state['rate']:.1f}/s, eta {eta})"
+            )
+
+        stats = run_batch_scoring(
+            days=options["days"],
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+            analyze=not options["no_llm"],
+            checkpoint_path=options["checkpoint"],
+            resume=options["resume"],
+            progress=progress,
+        )
+        self.stdout.write(
+            f"Scored {stats['scored']} of {stats['total']} interns for {stats['start']}..{stats['end']} "
+            f"in {stats['seconds']}s ({stats['analyzed']} analyzed, {stats['skipped']} skipped, {stats['failed']} failed)"
+        )
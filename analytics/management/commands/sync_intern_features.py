@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.services.feature_store import sync_feature_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Incrementally update the per-intern, per-day feature store from the dailyrecords "
+        "collection (new documents by _id, edited documents by updatedAt)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of syncing once")
+        parser.add_argument("--interval", type=float, default=60.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = sync_feature_store(batch_size=options["batch_size"])
+            self.stdout.write(f"Feature store synced: {stats['inserted']} new, {stats['updated']} updated entries")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .services import tracing
+
+logger = logging.getLogger("analytics.tracing")
+
+
+class ServerTimingMiddleware:
+    """
+    Times the report pipeline stages of each request (see services.tracing) and returns
+    them in a `Server-Timing` header, which browser dev tools show next to the request.
+    Requests that ran any stage also get one structured log record with the timings.
+    Streaming responses only carry the stages that ran before the first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not tracing.tracing_enabled():
+            return self.get_response(request)
+        with tracing.trace() as trace:
+            response = self.get_response(request)
+        return self._finish(request, response, trace)
+
+    async def __acall__(self, request):
+        if not tracing.tracing_enabled():
+            return await self.get_response(request)
+        with tracing.trace() as trace:
+            response = await self.get_response(request)
+        return self._finish(request, response, trace)
+
+    @staticmethod
+    def _finish(request, response, trace: tracing.Trace):
+        timing = trace.server_timing()
+        existing = response.get("Server-Timing")
+        response["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        if trace.stages:
+            logger.info(
+                "%s %s %s stages=%s",
+                request.method, request.path, response.status_code, timing,
+                extra={
+                    "path": request.path,
+                    "status": response.status_code,
+                    "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in trace.durations().items()},
+                },
+            )
+        return response
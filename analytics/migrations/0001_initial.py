@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('last_id', models.CharField(blank=True, default='', max_length=24)),
+                ('last_updated_at', models.CharField(blank=True, default='', max_length=40)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyInternFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intern_id', models.CharField(max_length=64)),
+                ('day', models.CharField(max_length=10)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('word_count_sum', models.PositiveIntegerField(default=0)),
+                ('word_count_sq_sum', models.PositiveIntegerField(default=0)),
+                ('keyword_hits', models.PositiveIntegerField(default=0)),
+                ('polarity_sum', models.FloatField(default=0.0)),
+                ('polarity_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('intern_id', 'day'), name='unique_intern_day_features')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EntryFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.CharField(max_length=24, unique=True)),
+                ('intern_id', models.CharField(max_length=64)),
+                ('day', models.CharField(max_length=10)),
+                ('word_count', models.PositiveIntegerField()),
+                ('keyword_hits', models.PositiveIntegerField()),
+                ('polarity_sum', models.FloatField()),
+                ('polarity_count', models.PositiveIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['intern_id', 'day'], name='analytics_e_intern__0cbbf4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intern_id', models.CharField(max_length=64)),
+                ('intern_name', models.CharField(blank=True, default='', max_length=255)),
+                ('period_start', models.CharField(max_length=10)),
+                ('period_end', models.CharField(max_length=10)),
+                ('days', models.PositiveIntegerField(default=7)),
+                ('score', models.IntegerField(default=0)),
+                ('report', models.JSONField(default=dict)),
+                ('analyzed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['intern_id', 'period_end'], name='analytics_w_intern__f40736_idx')],
+                'constraints': [models.UniqueConstraint(fields=('intern_id', 'period_start', 'period_end'), name='unique_intern_report_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_weeklyreport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weeklyreport',
+            name='entries_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='weeklyreport',
+            name='milestones',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='weeklyreport',
+            name='model',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='weeklyreport',
+            name='prompt_version',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='weeklyreport',
+            name='trajectory',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyreport',
+            index=models.Index(fields=['model', 'prompt_version'], name='analytics_w_model_605a5a_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import models
+
+
+class EntryFeatures(models.Model):
+    """
+    Scoring features of one `dailyrecords` document, computed once when the
+    document is first seen (or updated) by the feature store sync.
+    """
+
+    source_id = models.CharField(max_length=24, unique=True)
+    intern_id = models.CharField(max_length=64)
+    day = models.CharField(max_length=10)  # 'YYYY-MM-DD', same format as dailyrecords.date
+    word_count = models.PositiveIntegerField()
+    keyword_hits = models.PositiveIntegerField()
+    polarity_sum = models.FloatField()
+    polarity_count = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["intern_id", "day"])]
+
+
+class DailyInternFeatures(models.Model):
+    """
+    Per-intern, per-day sums of EntryFeatures. A score for any window is the
+    sum of at most `days` of these rows.
+    """
+
+    intern_id = models.CharField(max_length=64)
+    day = models.CharField(max_length=10)
+    entry_count = models.PositiveIntegerField(default=0)
+    word_count_sum = models.PositiveIntegerField(default=0)
+    word_count_sq_sum = models.PositiveIntegerField(default=0)
+    keyword_hits = models.PositiveIntegerField(default=0)
+    polarity_sum = models.FloatField(default=0.0)
+    polarity_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["intern_id", "day"], name="unique_intern_day_features"),
+        ]
+
+
+class FeatureSyncState(models.Model):
+    """Watermarks of the last feature store sync (highest _id and updatedAt seen)."""
+
+    name = models.CharField(max_length=64, unique=True)
+    last_id = models.CharField(max_length=24, blank=True, default="")
+    last_updated_at = models.CharField(max_length=40, blank=True, default="")
+    synced_at = models.DateTimeField(auto_now=True)
+
+
+class WeeklyReport(models.Model):
+    """
+    Weekly report of one intern for one window, precomputed by `manage.py score_interns`
+    or stored by generate_weekly_report. A stored report is reused while the entries
+    fingerprint, model and prompt version it was generated from are unchanged.
+    """
+
+    intern_id = models.CharField(max_length=64)
+    intern_name = models.CharField(max_length=255, blank=True, default="")
+    period_start = models.CharField(max_length=10)  # 'YYYY-MM-DD', as returned by get_week_range
+    period_end = models.CharField(max_length=10)
+    days = models.PositiveIntegerField(default=7)
+    score = models.IntegerField(default=0)
+    trajectory = models.CharField(max_length=32, blank=True, default="")
+    milestones = models.JSONField(default=list)
+    report = models.JSONField(default=dict)
+    analyzed = models.BooleanField(default=False)  # True when the report has the Ollama narrative
+    model = models.CharField(max_length=64, blank=True, default="")
+    prompt_version = models.CharField(max_length=16, blank=True, default="")
+    entries_fingerprint = models.CharField(max_length=64, blank=True, default="")  # sha256 of the window's entries
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["intern_id", "period_start", "period_end"], name="unique_intern_report_period"),
+        ]
+        indexes = [
+            models.Index(fields=["intern_id", "period_end"]),
+            models.Index(fields=["model", "prompt_version"]),
+        ]
@@ -1,30 +1,69 @@
-from pymongo import MongoClient
 from django.conf import settings
 from typing import List, Dict, Optional
 import logging
+import threading
 from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+from .services.mongo_client import get_shared_client
+from .services.mongo_indexes import explain_once, resolve_logbook_source
 
 logger = logging.getLogger(__name__)
 
+
+class _ObjectIdAsString(TypeDecoder):
+    """Decode ObjectIds (at any depth) straight to strings for JSON responses."""
+
+    bson_type = ObjectId
+
+    def transform_bson(self, value):
+        return str(value)
+
+
+JSON_CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([_ObjectIdAsString()]))
+
+
 class TalentHubMongoService:
-    """Service class for connecting to TalentHub MongoDB database"""
+    """
+    Service class for connecting to TalentHub MongoDB database.
+    The connection is opened (and pinged) on first use of `client` or `db`, not when
+    the service is created, so importing this module never touches the network.
+    """
     
     def __init__(self):
-        self.client = None
-        self.db = None
-        self.connect()
+        self._client = None
+        self._db = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    @property
+    def db(self):
+        if self._db is None:
+            self.connect()
+        return self._db
     
     def connect(self):
         """Establish connection to MongoDB"""
+        with self._lock:
+            if self._db is not None:
+                return
+            self._connect()
+
+    def _connect(self):
         try:
             connection_string = settings.MONGO_URI
             database_name = settings.DATABASE_NAME
             
-            self.client = MongoClient(connection_string)
-            self.db = self.client[database_name]
+            client = get_shared_client(connection_string)
+            db = client.get_database(database_name, codec_options=JSON_CODEC_OPTIONS)
             
             # Test connection
-            self.client.admin.command('ping')
+            client.admin.command('ping')
+            self._client, self._db = client, db
             logger.info(f"Connected to TalentHub MongoDB: {database_name}")
             
         except Exception as e:
@@ -34,10 +73,8 @@ class TalentHubMongoService:
     def test_connection(self) -> bool:
         """Test if MongoDB connection is working"""
         try:
-            if self.client:
-                self.client.admin.command('ping')
-                return True
-            return False
+            self.client.admin.command('ping')
+            return True
         except Exception as e:
             logger.error(f"MongoDB connection test failed: {str(e)}")
             return False
@@ -45,9 +82,7 @@ class TalentHubMongoService:
     def get_collections(self) -> List[str]:
         """Get list of all collections in the database"""
         try:
-            if self.db:
-                return self.db.list_collection_names()
-            return []
+            return self.db.list_collection_names()
         except Exception as e:
             logger.error(f"Error getting collections: {str(e)}")
             return []
@@ -74,16 +109,10 @@ class TalentHubMongoService:
                     }))
                     
                     if interns:
-                        # Convert ObjectId to string for JSON serialization
-                        for intern in interns:
-                            intern['_id'] = str(intern['_id'])
                         return interns
             
             # If no specific role filter works, try to get all users
-            users = list(self.db.users.find().limit(10))  # Limit for safety
-            for user in users:
-                user['_id'] = str(user['_id'])
-            return users
+            return list(self.db.users.find().limit(10))  # Limit for safety
             
         except Exception as e:
             logger.error(f"Error fetching interns: {str(e)}")
@@ -101,7 +130,6 @@ class TalentHubMongoService:
                     })
                     
                     if intern:
-                        intern['_id'] = str(intern['_id'])
                         return intern
             
             return None
@@ -112,38 +140,20 @@ class TalentHubMongoService:
     
     def get_logbook_entries(self, intern_id: str, limit: int = 100) -> List[Dict]:
         """
-        Get logbook entries for a specific intern
-        Adjust collection name based on TalentHub's actual structure
+        Get logbook entries for a specific intern.
+        The collection and intern field are resolved once (see services.mongo_indexes)
+        instead of probing every collection/field combination on each call.
         """
         try:
-            # Common collection names for logbooks
-            collection_names = ['logbooks', 'logbook_entries', 'entries', 'logs', 'daily_logs']
-            
-            for collection_name in collection_names:
-                if collection_name in self.db.list_collection_names():
-                    # Try different field names for intern reference
-                    queries = [
-                        {"internId": ObjectId(intern_id)},
-                        {"userId": ObjectId(intern_id)},
-                        {"user_id": ObjectId(intern_id)},
-                        {"intern_id": ObjectId(intern_id)},
-                        {"createdBy": ObjectId(intern_id)}
-                    ]
-                    
-                    for query in queries:
-                        entries = list(self.db[collection_name].find(query).limit(limit))
-                        if entries:
-                            # Convert ObjectId to string
-                            for entry in entries:
-                                entry['_id'] = str(entry['_id'])
-                                # Convert other ObjectIds if present
-                                for key, value in entry.items():
-                                    if isinstance(value, ObjectId):
-                                        entry[key] = str(value)
-                            return entries
-            
-            return []
-            
+            source = resolve_logbook_source(self.db)
+            if source is None:
+                return []
+            collection_name, field = source
+            collection = self.db[collection_name]
+            query = {field: ObjectId(intern_id)}
+            explain_once(collection, f"get_logbook_entries:{collection_name}.{field}", query)
+            return list(collection.find(query).limit(limit))
+
         except Exception as e:
             logger.error(f"Error fetching logbook entries: {str(e)}")
             return []
@@ -151,34 +161,47 @@ class TalentHubMongoService:
     def get_all_logbook_entries(self, limit: int = 500) -> List[Dict]:
         """Get all logbook entries for general analysis"""
         try:
-            collection_names = ['logbooks', 'logbook_entries', 'entries', 'logs', 'daily_logs']
-            
-            for collection_name in collection_names:
-                if collection_name in self.db.list_collection_names():
-                    entries = list(self.db[collection_name].find().limit(limit))
-                    if entries:
-                        # Convert ObjectIds to strings
-                        for entry in entries:
-                            entry['_id'] = str(entry['_id'])
-                            for key, value in entry.items():
-                                if isinstance(value, ObjectId):
-                                    entry[key] = str(value)
-                        return entries
-            
-            return []
-            
+            source = resolve_logbook_source(self.db)
+            if source is None:
+                return []
+            return list(self.db[source[0]].find().limit(limit))
+
         except Exception as e:
             logger.error(f"Error fetching all logbook entries: {str(e)}")
             return []
     
     def close_connection(self):
-        """Close MongoDB connection"""
-        try:
-            if self.client:
-                self.client.close()
-                logger.info("MongoDB connection closed")
-        except Exception as e:
-            logger.error(f"Error closing MongoDB connection: {str(e)}")
+        """
+        Release this service's handle on the shared MongoClient. The pool itself is shared
+        with the rest of the process and stays open; close_shared_clients() closes it at exit.
+        """
+        with self._lock:
+            self._client = None
+            self._db = None
+
+_mongo_service: Optional[TalentHubMongoService] = None
+_mongo_service_lock = threading.Lock()
+
+
+def get_mongo_service():
+    """
+    The process-wide service: the BSON snapshot when LOGBOOK_DATA_SOURCE == "snapshot",
+    else a TalentHubMongoService that connects on first query.
+    """
+    global _mongo_service
+    from .services.bson_snapshot import get_snapshot, snapshot_enabled
+
+    if snapshot_enabled():
+        return get_snapshot()
+    if _mongo_service is None:
+        with _mongo_service_lock:
+            if _mongo_service is None:
+                _mongo_service = TalentHubMongoService()
+    return _mongo_service
+
 
-# Global service instance
-mongo_service = TalentHubMongoService()
\ No newline at end of file
+def __getattr__(name):
+    # `from analytics.mongo_service import mongo_service` keeps working, resolved on access
+    if name == "mongo_service":
+        return get_mongo_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .json_stream import IncrementalJSONObjectParser
+
+# Sent to Ollama as `format`, so generation is constrained to this shape, and used to
+# validate what comes back (older Ollama versions ignore schemas they cannot enforce).
+ANALYSIS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "trajectory": {"type": "string", "enum": ["improving", "stagnant", "declining"]},
+        "milestones_achieved": {"type": "array", "items": {"type": "string"}},
+        "summary": {"type": "string"},
+        "challenges": {"type": "array", "items": {"type": "string"}},
+        "recommendations": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["trajectory", "milestones_achieved", "summary", "challenges", "recommendations"],
+}
+
+_JSON_TYPES = {"object": dict, "array": list, "string": str, "boolean": bool, "null": type(None)}
+
+
+class SchemaViolation(ValueError):
+    pass
+
+
+def validate_value(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Errors of `value` against the JSON-schema subset used here (type, enum, items, properties, required)."""
+    expected = schema.get("type")
+    if expected == "number":
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+    elif expected == "integer":
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        ok = expected is None or isinstance(value, _JSON_TYPES[expected])
+    if not ok:
+        return [f"{path} should be {expected}, got {type(value).__name__}"]
+
+    errors: List[str] = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path} should be one of {schema['enum']}, got {value!r}")
+    if expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_value(item, schema["items"], f"{path}[{i}]"))
+    if expected == "object":
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name} is missing")
+        for name, item in value.items():
+            if name in schema.get("properties", {}):
+                errors.extend(validate_value(item, schema["properties"][name], f"{path}.{name}"))
+    return errors
+
+
+def validate_analysis(analysis: Any, schema: Dict[str, Any] = ANALYSIS_SCHEMA) -> List[str]:
+    return validate_value(analysis, schema)
+
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def repair_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Local, model-free repair of common breakage: code fences, text around the object,
+    trailing commas and output cut off mid-object (open strings/brackets are closed).
+    Returns the object, or None when it still does not parse.
+    """
+    text = _FENCE_RE.sub("", text)
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+
+    stack: List[str] = []
+    in_string = escape = False
+    end = len(text)
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                end = i + 1
+                break
+    text = text[:end]
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",").rstrip(":")
+    text = _TRAILING_COMMA_RE.sub(r"\1", text + "".join(reversed(stack)))
+    try:
+        repaired = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    return repaired if isinstance(repaired, dict) else None
+
+
+class StreamingAnalysisValidator:
+    """
+    Validates a streamed analysis while it is generated. Each top-level field is checked
+    against the schema as soon as it is complete, so a wrong type, an unexpected enum
+    value or a model that rambles instead of writing JSON raises SchemaViolation after a
+    few tokens, and the generation can be stopped instead of running to the end.
+    """
+
+    def __init__(self, schema: Dict[str, Any] = ANALYSIS_SCHEMA, max_preamble: int = 200, max_chars: int = 12000):
+        self.schema = schema
+        self.max_preamble = max_preamble
+        self.max_chars = max_chars
+        self.parser = IncrementalJSONObjectParser()
+        self.text = ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        fields = self.parser.feed(chunk)
+        for name, value in fields:
+            schema = self.schema.get("properties", {}).get(name)
+            if schema is not None:
+                errors = validate_value(value, schema, f"$.{name}")
+                if errors:
+                    raise SchemaViolation(errors[0])
+        if "{" not in self.text and len(self.text) > self.max_preamble:
+            raise SchemaViolation(f"No JSON object after {len(self.text)} characters")
+        if not self.parser.done and len(self.text) > self.max_chars:
+            raise SchemaViolation(f"JSON object still open after {len(self.text)} characters")
+        return fields
+
+    def finish(self) -> Dict[str, Any]:
+        """The validated analysis from the complete text (repaired if it was cut off)."""
+        start = self.text.find("{")
+        analysis = None
+        if start >= 0 and self.parser.done:
+            try:
+                analysis, _ = json.JSONDecoder().raw_decode(self.text[start:])
+            except json.JSONDecodeError:
+                analysis = None
+        if analysis is None:
+            analysis = repair_json(self.text)
+        if analysis is None:
+            raise SchemaViolation("Model output is not a JSON object")
+        errors = validate_analysis(analysis, self.schema)
+        if errors:
+            raise SchemaViolation(errors[0])
+        return analysis
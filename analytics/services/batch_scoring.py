@@ -0,0 +1,253 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from .inference_scheduler import PRIORITY_BATCH, SchedulerQueueFull
+from .report_store import entries_fingerprint, save_report
+from .report_generator import (
+    _build_log_texts_from_entries,
+    _build_report,
+    _insufficient_data_report,
+    _no_data_report,
+    _score_window,
+)
+from .long_window import analyze_long_window, use_long_window
+from .text_processing import analyze_with_ollama
+from .utils import fetch_cohort_logbook_entries, get_week_range
+
+logger = logging.getLogger(__name__)
+
+# (intern_id, intern_name)
+Intern = Tuple[str, str]
+
+
+def list_interns() -> List[Intern]:
+    """Every intern known to the data source (TalentHubMongoService.get_all_interns or the snapshot)."""
+    from ..mongo_service import get_mongo_service
+
+    interns: List[Intern] = []
+    for doc in get_mongo_service().get_all_interns():
+        intern_id = str(doc.get("_id") or doc.get("id") or "")
+        if intern_id:
+            name = doc.get("name") or doc.get("fullName") or doc.get("username") or f"Intern {intern_id}"
+            interns.append((intern_id, str(name)))
+    return list(dict.fromkeys(interns))
+
+
+def _init_worker(max_in_flight: Optional[int] = None) -> None:
+    """
+    ProcessPoolExecutor initializer: make Django usable in spawned (non-forked) workers too,
+    and give this worker's inference scheduler its share of the Ollama in-flight budget.
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    if max_in_flight is not None:
+        settings.OLLAMA_MAX_IN_FLIGHT = max_in_flight
+
+
+def score_chunk(
+    interns: Sequence[Intern],
+    start_date: str,
+    end_date: str,
+    analyze: bool = True,
+    long_window: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Worker task: one cohort fetch for the chunk, then the score (and, with `analyze`, the
+    Ollama narrative, week by week with `long_window`) of each intern. Returns one result
+    per intern, in input order.
+    """
+    names = dict(interns)
+    entries_by_intern = fetch_cohort_logbook_entries(list(names), start_date, end_date)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending: List[Tuple[str, int, List[Any]]] = []
+    for intern_id, intern_name in interns:
+        entries = entries_by_intern.get(intern_id) or []
+        log_texts = _build_log_texts_from_entries(entries)
+        fingerprint = entries_fingerprint(entries)
+        if not entries:
+            results[intern_id] = {"report": _no_data_report(intern_id, intern_name), "analyzed": True}
+        elif not log_texts:
+            results[intern_id] = {"report": _insufficient_data_report(intern_id, intern_name), "analyzed": True}
+        else:
+            base_score = _score_window(intern_id, start_date, end_date, log_texts)
+            results[intern_id] = {"report": _build_report(intern_id, base_score, {}), "analyzed": False}
+            pending.append((intern_id, base_score, entries if long_window else log_texts))
+        results[intern_id]["fingerprint"] = fingerprint
+
+    if analyze and pending:
+        # No more threads than this process may have calls in flight; the rest would only queue
+        threads = min(len(pending), getattr(settings, "OLLAMA_MAX_IN_FLIGHT", 2))
+        with ThreadPoolExecutor(threads, thread_name_prefix="batch-report") as pool:
+            analyze_one = analyze_long_window if long_window else analyze_with_ollama
+            futures = {
+                pool.submit(analyze_one, names[intern_id], material, PRIORITY_BATCH): (intern_id, base_score)
+                for intern_id, base_score, material in pending
+            }
+            for future in as_completed(futures):
+                intern_id, base_score = futures[future]
+                try:
+                    analysis = future.result()
+                except SchedulerQueueFull as e:
+                    analysis = {"error": str(e)}
+                report = _build_report(intern_id, base_score, analysis)
+                results[intern_id].update(report=report, analyzed="error" not in analysis)
+
+    return [
+        {"intern_id": intern_id, "intern_name": intern_name, **results[intern_id]}
+        for intern_id, intern_name in interns
+    ]
+
+
+class Checkpoint:
+    """
+    Interns already written for one scoring period, kept in a small JSON file that is
+    rewritten atomically after every chunk, so an interrupted run can be resumed.
+    """
+
+    def __init__(self, path: str, start_date: str, end_date: str):
+        self.path = str(path)
+        self.start_date, self.end_date = start_date, end_date
+        self.done: set = set()
+
+    def load(self) -> "Checkpoint":
+        """Pick up the done set of a previous run of the same period (another period is ignored)."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get("start") == self.start_date and data.get("end") == self.end_date:
+            self.done = set(data.get("done") or [])
+        return self
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"start": self.start_date, "end": self.end_date, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _save_results(results: List[Dict[str, Any]], start_date: str, end_date: str, days: int) -> None:
+    for result in results:
+        save_report(
+            result["intern_id"], result["intern_name"], start_date, end_date, days,
+            result["report"], result["fingerprint"], analyzed=result["analyzed"],
+        )
+
+
+def run_batch_scoring(
+    interns: Optional[Sequence[Intern]] = None,
+    days: int = 7,
+    workers: Optional[int] = None,
+    chunk_size: int = 25,
+    analyze: bool = True,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Score every intern for the current `days` window and store the reports in WeeklyReport.
+
+    Interns are split into chunks of `chunk_size` and fanned out over a process pool
+    (workers=0 runs the chunks in this process). The parent writes each finished chunk to
+    the database and the checkpoint; with `resume`, interns recorded by an interrupted run
+    of the same period are skipped. `progress` is called after every chunk.
+    """
+    from django.db import connections
+
+    start_date, end_date = get_week_range(days=days)
+    long_window = use_long_window(days)
+    interns = list(interns) if interns is not None else list_interns()
+    checkpoint = Checkpoint(
+        checkpoint_path or getattr(settings, "SCORE_INTERNS_CHECKPOINT", settings.BASE_DIR / "score_interns.checkpoint.json"),
+        start_date, end_date,
+    )
+    if resume:
+        checkpoint.load()
+    todo = [intern for intern in interns if intern[0] not in checkpoint.done]
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), max(chunk_size, 1))]
+
+    stats = {
+        "start": start_date,
+        "end": end_date,
+        "total": len(interns),
+        "skipped": len(interns) - len(todo),
+        "scored": 0,
+        "analyzed": 0,
+        "failed": 0,
+    }
+    started = time.perf_counter()
+
+    def record(chunk: Sequence[Intern], results: Optional[List[Dict[str, Any]]]) -> None:
+        if results is None:
+            stats["failed"] += len(chunk)
+        else:
+            _save_results(results, start_date, end_date, days)
+            checkpoint.done.update(result["intern_id"] for result in results)
+            checkpoint.save()
+            stats["scored"] += len(results)
+            stats["analyzed"] += sum(1 for result in results if result["analyzed"])
+        if progress is not None:
+            finished = stats["scored"] + stats["failed"]
+            elapsed = time.perf_counter() - started
+            rate = finished / elapsed if elapsed else 0.0
+            progress({
+                **stats,
+                "done": finished,
+                "remaining": len(todo) - finished,
+                "rate": rate,
+                "eta": (len(todo) - finished) / rate if rate else None,
+            })
+
+    if workers == 0:
+        for chunk in chunks:
+            try:
+                results = score_chunk(chunk, start_date, end_date, analyze, long_window)
+            except Exception:
+                logger.exception("Scoring a chunk of %d interns failed", len(chunk))
+                results = None
+            record(chunk, results)
+    elif chunks:
+        # Forked workers must not inherit the parent's open database connections
+        connections.close_all()
+        workers = workers or min(len(chunks), os.cpu_count() or 1)
+        # Every worker process has its own scheduler; split OLLAMA_MAX_IN_FLIGHT between them
+        # instead of multiplying it by the number of workers. Each analyzing worker needs at
+        # least one call, so there are no more of them than the budget allows.
+        budget = max(1, getattr(settings, "OLLAMA_MAX_IN_FLIGHT", 2))
+        if analyze:
+            workers = min(workers, budget)
+        per_worker = max(1, budget // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(per_worker,)) as executor:
+            futures = {
+                executor.submit(score_chunk, chunk, start_date, end_date, analyze, long_window): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception:
+                    logger.exception("Scoring a chunk of %d interns failed", len(futures[future]))
+                    results = None
+                record(futures[future], results)
+
+    if not stats["failed"]:
+        checkpoint.remove()
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
@@ -0,0 +1,236 @@
+from __future__ import annotations
+import bisect
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from django.conf import settings
+
+from .utils import LogbookEntry
+
+_INT32 = struct.Struct("<i")
+
+LOGBOOK_FILE = "logbook_entries.bson"
+USERS_FILE = "users.bson"
+
+
+class _MappedFile:
+    """A read-only memory map of a file (empty files get an empty buffer; mmap rejects them)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self) -> None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+
+def iter_document_spans(buffer) -> Iterator[Tuple[int, int]]:
+    """(offset, length) of each document in a mongodump .bson buffer, without decoding them."""
+    offset, size = 0, len(buffer)
+    while offset < size:
+        if size - offset < 5:
+            raise ValueError(f"Truncated BSON data at byte {offset}")
+        (length,) = _INT32.unpack_from(buffer, offset)
+        if length < 5 or offset + length > size:
+            raise ValueError(f"Corrupt BSON document length {length} at byte {offset}")
+        yield offset, length
+        offset += length
+
+
+def iter_bson_file(path: str, chunk_size: int = 1000, raw: bool = False) -> Iterator[Any]:
+    """
+    Stream the documents of a mongodump .bson file. The file is memory-mapped and decoded
+    `chunk_size` documents at a time, so memory stays bounded by one chunk of decoded
+    documents regardless of the file size. With raw=True documents are RawBSONDocuments.
+    """
+    mapped = _MappedFile(path)
+    try:
+        buffer = mapped.buffer
+        codec_options = bson.CodecOptions(document_class=RawBSONDocument) if raw else bson.DEFAULT_CODEC_OPTIONS
+        chunk_start = chunk_end = count = 0
+        for offset, length in iter_document_spans(buffer):
+            chunk_end = offset + length
+            count += 1
+            if count == chunk_size:
+                yield from bson.decode_all(buffer[chunk_start:chunk_end], codec_options)
+                chunk_start, count = chunk_end, 0
+        if count:
+            yield from bson.decode_all(buffer[chunk_start:chunk_end], codec_options)
+    finally:
+        mapped.close()
+
+
+def _text(doc, name: str) -> str:
+    return (doc.get(name) or "").strip()
+
+
+def _entry_from_snapshot_doc(doc) -> LogbookEntry:
+    """The snapshot keeps the original logbook field names (todays_work, task_stack, ...)."""
+    return LogbookEntry(
+        date=doc.get("date"),
+        status=_text(doc, "status"),
+        tech_stack=_text(doc, "task_stack"),
+        todays_work=_text(doc, "todays_work"),
+        challenges=_text(doc, "challenges"),
+        tomorrow_plan=_text(doc, "tomorrow_plan"),
+    )
+
+
+def _json_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: str(value) if isinstance(value, ObjectId) else value for key, value in doc.items()}
+
+
+class BSONSnapshot:
+    """
+    Read-only logbook data source over a mongodump directory (logbook_entries.bson, users.bson).
+
+    On first use the logbook file is memory-mapped and scanned once to build an index of
+    intern -> [(date, offset, length)] sorted by date; queries bisect that index and decode
+    only the matching documents straight from the map. Interns are addressed by the
+    snapshot's numeric user id ("8") or by the user's ObjectId string.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = str(directory)
+        self._lock = threading.Lock()
+        self._logbook: Optional[_MappedFile] = None
+        self._index: Dict[int, List[Tuple[str, int, int]]] = {}
+        self._dates: Dict[int, List[str]] = {}
+        self._users: List[Dict[str, Any]] = []
+        self._user_ids_by_object_id: Dict[str, int] = {}
+        self._latest_date: Optional[str] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _ensure_loaded(self) -> None:
+        if self._logbook is not None:
+            return
+        with self._lock:
+            if self._logbook is not None:
+                return
+            if os.path.exists(self._path(USERS_FILE)):
+                self._users = list(iter_bson_file(self._path(USERS_FILE)))
+            self._user_ids_by_object_id = {str(user["_id"]): user.get("id") for user in self._users}
+
+            logbook = _MappedFile(self._path(LOGBOOK_FILE))
+            index: Dict[int, List[Tuple[str, int, int]]] = {}
+            for offset, length in iter_document_spans(logbook.buffer):
+                doc = RawBSONDocument(bytes(logbook.buffer[offset:offset + length]))
+                intern_id, day = doc.get("intern_id"), doc.get("date")
+                if intern_id is None or not day:
+                    continue
+                index.setdefault(intern_id, []).append((str(day)[:10], offset, length))
+            for spans in index.values():
+                spans.sort()
+            self._index = index
+            self._dates = {intern_id: [span[0] for span in spans] for intern_id, spans in index.items()}
+            self._latest_date = max((spans[-1][0] for spans in index.values()), default=None)
+            self._logbook = logbook
+
+    @property
+    def latest_date(self) -> Optional[str]:
+        """Date of the newest entry in the snapshot."""
+        self._ensure_loaded()
+        return self._latest_date
+
+    def close(self) -> None:
+        with self._lock:
+            if self._logbook is not None:
+                self._logbook.close()
+                self._logbook = None
+
+    def resolve_intern(self, intern_id: Any) -> Optional[int]:
+        """Snapshot user id for a numeric id or a user ObjectId string; None if unknown."""
+        self._ensure_loaded()
+        value = str(intern_id).strip()
+        if value.isdigit():
+            return int(value)
+        return self._user_ids_by_object_id.get(value)
+
+    def _decode(self, offset: int, length: int) -> Dict[str, Any]:
+        return bson.decode(self._logbook.buffer[offset:offset + length])
+
+    def _spans(self, intern_key: Optional[int], start_date: str, end_date: str) -> List[Tuple[str, int, int]]:
+        if intern_key is None or intern_key not in self._index:
+            return []
+        dates = self._dates[intern_key]
+        low, high = bisect.bisect_left(dates, start_date), bisect.bisect_right(dates, end_date)
+        return self._index[intern_key][low:high]
+
+    # -- fetch_logbook_entries / fetch_cohort_logbook_entries interface --
+
+    def fetch_logbook_entries(self, intern_id: str, start_date: str, end_date: str) -> List[LogbookEntry]:
+        self._ensure_loaded()
+        spans = self._spans(self.resolve_intern(intern_id), start_date, end_date)
+        return [_entry_from_snapshot_doc(RawBSONDocument(self._logbook.buffer[o:o + n])) for _, o, n in spans]
+
+    def fetch_cohort_logbook_entries(self, intern_ids: List[str], start_date: str, end_date: str) -> Dict[str, List[LogbookEntry]]:
+        return {intern_id: self.fetch_logbook_entries(intern_id, start_date, end_date) for intern_id in intern_ids}
+
+    # -- TalentHubMongoService interface --
+
+    def test_connection(self) -> bool:
+        return os.path.exists(self._path(LOGBOOK_FILE))
+
+    def get_collections(self) -> List[str]:
+        return sorted(name[:-len(".bson")] for name in os.listdir(self.directory) if name.endswith(".bson"))
+
+    def get_all_interns(self) -> List[Dict]:
+        """Users that have logbook entries in the snapshot."""
+        self._ensure_loaded()
+        return [_json_document(user) for user in self._users if user.get("id") in self._index]
+
+    def get_intern_by_id(self, intern_id: str) -> Optional[Dict]:
+        key = self.resolve_intern(intern_id)
+        user = next((user for user in self._users if user.get("id") == key), None)
+        return _json_document(user) if user else None
+
+    def get_logbook_entries(self, intern_id: str, limit: int = 100) -> List[Dict]:
+        self._ensure_loaded()
+        spans = self._index.get(self.resolve_intern(intern_id), [])[:limit]
+        return [_json_document(self._decode(offset, length)) for _, offset, length in spans]
+
+    def get_all_logbook_entries(self, limit: int = 500) -> List[Dict]:
+        entries = []
+        for doc in iter_bson_file(self._path(LOGBOOK_FILE)):
+            if len(entries) >= limit:
+                break
+            entries.append(_json_document(doc))
+        return entries
+
+    def close_connection(self) -> None:
+        self.close()
+
+
+_snapshot: Optional[BSONSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def snapshot_enabled() -> bool:
+    return getattr(settings, "LOGBOOK_DATA_SOURCE", "mongo") == "snapshot"
+
+
+def get_snapshot() -> BSONSnapshot:
+    """The BSONSnapshot for settings.LOGBOOK_SNAPSHOT_DIR (one per process)."""
+    global _snapshot
+    directory = str(getattr(settings, "LOGBOOK_SNAPSHOT_DIR", ""))
+    if _snapshot is None or _snapshot.directory != directory:
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.directory != directory:
+                if not os.path.isdir(directory):
+                    raise RuntimeError(f"LOGBOOK_SNAPSHOT_DIR {directory!r} is not a directory.")
+                if _snapshot is not None:
+                    _snapshot.close()
+                _snapshot = BSONSnapshot(directory)
+    return _snapshot
@@ -0,0 +1,192 @@
+"""
+Local stand-in for the Ollama HTTP API, used by tests and load experiments.
+
+Serves POST /api/generate (streaming and non-streaming), GET /api/tags and
+GET /api/version with a configurable artificial latency. It has no Django
+dependency, so it can also be run on its own:
+
+    python -m analytics.services.fake_ollama --port 11434 --latency 2
+"""
+from __future__ import annotations
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_ANALYSIS = {
+    "trajectory": "improving",
+    "milestones_achieved": ["Completed the assigned feature"],
+    "summary": "The intern made steady progress this week.",
+    "challenges": ["Debugging API calls"],
+    "recommendations": ["Keep writing detailed daily updates"],
+}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once; the default backlog of 5 stalls them.
+    request_queue_size = 1024
+
+
+class FakeOllamaServer:
+    """
+    Threaded HTTP server mimicking the parts of Ollama the analytics app uses.
+    `latency` is slept once per /api/generate call and `chunk_latency` before every
+    streamed piece; `response` is the object the model "generates" (serialized as JSON
+    text in the `response` field). A list of responses is answered one per generation,
+    the last one repeating, to script invalid output followed by a valid retry.
+    """
+
+    def __init__(
+        self,
+        response: Optional[Any] = None,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        model: str = "gemma3:1b",
+        chunk_latency: float = 0.0,
+    ):
+        self.response = DEFAULT_ANALYSIS if response is None else response
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.model = model
+        self.requests: List[Dict[str, Any]] = []
+        self.connections = 0  # TCP connections accepted, to observe keep-alive reuse
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.aborted = 0  # streams the client closed before the end
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _response_text(self) -> str:
+        response = self.response
+        if isinstance(response, list):
+            with self._lock:
+                response = self.response.pop(0) if len(self.response) > 1 else self.response[0]
+        if isinstance(response, str):
+            return response
+        return json.dumps(response)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # keep test output quiet
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionError:
+                    pass  # the client went away: a timed-out call, or an aborted stream's connection
+
+            def _send_json(self, body: Dict[str, Any], status: int = 200) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": server.model, "model": server.model}]})
+                elif self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-fake"})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+
+                with server._lock:
+                    server.requests.append(payload)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    text = server._response_text() if payload.get("prompt") else ""
+                    if payload.get("stream", True):
+                        self._stream(text, payload.get("model") or server.model)
+                    else:
+                        self._send_json({"model": payload.get("model"), "response": text, "done": True})
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _stream(self, text: str, model: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = [text[i:i + 8] for i in range(0, len(text), 8)]
+                try:
+                    for piece in pieces:
+                        if server.chunk_latency:
+                            time.sleep(server.chunk_latency)
+                        self._write_chunk({"model": model, "response": piece, "done": False})
+                    self._write_chunk({"model": model, "response": "", "done": True})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.aborted += 1
+                    self.close_connection = True
+
+            def _write_chunk(self, body: Dict[str, Any]) -> None:
+                line = (json.dumps(body) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per generate call")
+    args = parser.parse_args()
+
+    fake = FakeOllamaServer(latency=args.latency, host=args.host, port=args.port)
+    print(f"Fake Ollama listening on {fake.url}")
+    try:
+        fake._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from bson import ObjectId
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from ..models import DailyInternFeatures, EntryFeatures, FeatureSyncState
+from .report_generator import _build_log_texts_from_entries
+from .scoring_engine import score_from_aggregates, tokenize_entries
+from .sentiment import get_sentiment_backend
+from .utils import LOGBOOK_PROJECTION, _entry_from_doc, get_logbook_collection
+
+logger = logging.getLogger(__name__)
+
+SYNC_STATE_NAME = "dailyrecords"
+
+
+def entry_features(text: str) -> Dict[str, Any]:
+    """Tokenize and score one entry's text once; everything later only adds these up."""
+    entry = tokenize_entries([text])[0]
+    polarity_sum, polarity_count = get_sentiment_backend().polarity_components_tokenized([entry])[0]
+    return {
+        "word_count": entry.word_count,
+        "keyword_hits": entry.keyword_total,
+        "polarity_sum": polarity_sum,
+        "polarity_count": polarity_count,
+    }
+
+
+def _day_key(value: Any) -> Optional[str]:
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str) and value:
+        return value[:10]
+    return None
+
+
+def _watermark_value(raw: str) -> Any:
+    """updatedAt watermarks are stored as text; compare as datetime when they were one."""
+    if raw.startswith("dt:"):
+        return datetime.fromisoformat(raw[3:])
+    return raw
+
+
+def _apply_documents(docs: Iterable[Dict[str, Any]], intern_field: str) -> Tuple[Set[Tuple[str, str]], int]:
+    """Upsert EntryFeatures for `docs`; return the (intern, day) pairs whose totals changed."""
+    touched: Set[Tuple[str, str]] = set()
+    applied = 0
+    for doc in docs:
+        source_id = str(doc["_id"])
+        previous = EntryFeatures.objects.filter(source_id=source_id).values("intern_id", "day").first()
+        if previous:
+            touched.add((previous["intern_id"], previous["day"]))
+
+        intern_id, day = doc.get(intern_field), _day_key(doc.get("date"))
+        texts = _build_log_texts_from_entries([_entry_from_doc(doc)])
+        if intern_id is None or day is None or not texts:
+            # Entries without descriptive text are not scored by compute_intern_score either
+            EntryFeatures.objects.filter(source_id=source_id).delete()
+            continue
+
+        intern_id = str(intern_id)
+        EntryFeatures.objects.update_or_create(
+            source_id=source_id,
+            defaults={"intern_id": intern_id, "day": day, **entry_features(texts[0])},
+        )
+        touched.add((intern_id, day))
+        applied += 1
+    return touched, applied
+
+
+def _refresh_daily_rows(touched: Set[Tuple[str, str]]) -> None:
+    """Recompute the daily sums for the given (intern, day) pairs from their entries."""
+    for intern_id, day in touched:
+        rows = list(
+            EntryFeatures.objects.filter(intern_id=intern_id, day=day).values_list(
+                "word_count", "keyword_hits", "polarity_sum", "polarity_count"
+            )
+        )
+        if not rows:
+            DailyInternFeatures.objects.filter(intern_id=intern_id, day=day).delete()
+            continue
+        DailyInternFeatures.objects.update_or_create(
+            intern_id=intern_id,
+            day=day,
+            defaults={
+                "entry_count": len(rows),
+                "word_count_sum": sum(row[0] for row in rows),
+                "word_count_sq_sum": sum(row[0] ** 2 for row in rows),
+                "keyword_hits": sum(row[1] for row in rows),
+                "polarity_sum": sum(row[2] for row in rows),
+                "polarity_count": sum(row[3] for row in rows),
+            },
+        )
+
+
+def _updated_watermark(value: Any) -> str:
+    return f"dt:{value.isoformat()}" if isinstance(value, datetime) else str(value)
+
+
+def sync_feature_store(collection=None, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Bring the feature store up to date with `dailyrecords` by polling two watermarks:
+    documents whose updatedAt reached the last one seen (edits) and documents with an
+    _id above the last one seen (inserts). Only those documents are read.
+    Re-applying a document is idempotent, so boundary documents may be seen twice.
+    """
+    collection = collection if collection is not None else get_logbook_collection()
+    intern_field = getattr(settings, "FEATURE_STORE_INTERN_FIELD", "internId")
+    updated_field = getattr(settings, "FEATURE_STORE_UPDATED_FIELD", "updatedAt")
+    state, _ = FeatureSyncState.objects.get_or_create(name=SYNC_STATE_NAME)
+    stats = {"inserted": 0, "updated": 0}
+    projection = {**LOGBOOK_PROJECTION, "_id": 1, intern_field: 1, updated_field: 1}
+
+    def advance_updated_watermark(batch) -> None:
+        newest = max((doc[updated_field] for doc in batch if doc.get(updated_field)), default=None)
+        if newest is not None and (
+            not state.last_updated_at or newest > _watermark_value(state.last_updated_at)
+        ):
+            state.last_updated_at = _updated_watermark(newest)
+
+    # 1) Edits to documents already covered by the _id watermark. This runs first so
+    #    that inserts below cannot move the updatedAt watermark past unseen edits.
+    if state.last_id and state.last_updated_at:
+        batch = list(
+            collection.find(
+                {
+                    updated_field: {"$gte": _watermark_value(state.last_updated_at)},
+                    "_id": {"$lte": ObjectId(state.last_id)},
+                },
+                projection,
+            )
+        )
+        if batch:
+            with transaction.atomic():
+                touched, applied = _apply_documents(batch, intern_field)
+                _refresh_daily_rows(touched)
+                advance_updated_watermark(batch)
+                state.save()
+            stats["updated"] += applied
+
+    # 2) New documents, in _id order so the watermark can advance batch by batch
+    while True:
+        query = {"_id": {"$gt": ObjectId(state.last_id)}} if state.last_id else {}
+        batch = list(collection.find(query, projection).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            touched, applied = _apply_documents(batch, intern_field)
+            _refresh_daily_rows(touched)
+            state.last_id = str(batch[-1]["_id"])
+            advance_updated_watermark(batch)
+            state.save()
+        stats["inserted"] += applied
+
+    # Record when the store was last known to be current, even if nothing changed
+    state.save()
+    return stats
+
+
+def score_window(
+    intern_id: str, start_date: str, end_date: str, expected_entries: Optional[int] = None
+) -> Optional[int]:
+    """
+    Score an intern's window by summing the precomputed daily rows (O(days)).
+    Returns None when the store cannot be trusted for that window: it has nothing for it,
+    the last sync ran before the window ended, or it holds a different number of entries
+    than `expected_entries` (entries written or edited since the last sync).
+    """
+    state = FeatureSyncState.objects.filter(name=SYNC_STATE_NAME).first()
+    if state is None or timezone.localdate(state.synced_at).isoformat() < end_date:
+        return None
+    totals = DailyInternFeatures.objects.filter(
+        intern_id=intern_id, day__gte=start_date, day__lte=end_date
+    ).aggregate(
+        days=Count("id"),
+        entry_count=Sum("entry_count"),
+        word_count_sum=Sum("word_count_sum"),
+        word_count_sq_sum=Sum("word_count_sq_sum"),
+        keyword_hits=Sum("keyword_hits"),
+        polarity_sum=Sum("polarity_sum"),
+        polarity_count=Sum("polarity_count"),
+    )
+    if not totals.pop("days"):
+        return None
+    if expected_entries is not None and totals["entry_count"] != expected_entries:
+        return None
+    return score_from_aggregates(**totals)
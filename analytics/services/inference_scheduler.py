@@ -0,0 +1,331 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import itertools
+import logging
+import math
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first. Interactive page views jump ahead of batch/cohort work.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class SchedulerQueueFull(Exception):
+    """Raised when the inference queue is full; callers should answer 429."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceTimeout(Exception):
+    """Raised when a call did not finish (queue wait + generation) within its timeout."""
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    fn: Callable[..., Any] = field(compare=False)
+    args: tuple = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    future: Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    context: Optional[contextvars.Context] = field(compare=False, default=None)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(math.ceil(pct / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[max(index, 0)]
+
+
+class InferenceScheduler:
+    """
+    Bounded worker pool in front of the Ollama server.
+    At most `max_in_flight` calls run at once; up to `max_queue_size` more wait in a
+    priority queue (FIFO within a priority). Anything beyond that is rejected with
+    SchedulerQueueFull so the view can answer 429 instead of pinning a request thread.
+    """
+
+    def __init__(self, max_in_flight: int = 2, max_queue_size: int = 32, sample_size: int = 1000):
+        self.max_in_flight = max_in_flight
+        self.max_queue_size = max_queue_size
+
+        self._queue: "queue.PriorityQueue[_Job]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._shutdown = False
+
+        self._outstanding = 0  # queued + running
+        self._in_flight = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+        self._wait_times = deque(maxlen=sample_size)
+        self._service_times = deque(maxlen=sample_size)
+
+    def submit(self, fn: Callable[..., Any], *args, priority: int = PRIORITY_INTERACTIVE, **kwargs) -> Future:
+        """Queue `fn(*args, **kwargs)` and return a Future for its result."""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Inference scheduler has been shut down.")
+            if self._outstanding >= self.max_in_flight + self.max_queue_size:
+                self._counters["rejected"] += 1
+                raise SchedulerQueueFull(self._retry_after())
+            self._start_workers()
+            self._outstanding += 1
+            self._counters["submitted"] += 1
+
+        future: Future = Future()
+        # The job runs in the caller's context, so e.g. its request trace sees the stages timed on the worker
+        job = _Job(priority, next(self._seq), fn, args, kwargs, future, time.monotonic(), contextvars.copy_context())
+        self._queue.put(job)
+        return future
+
+    def run(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Submit and wait for the result. `timeout` covers queue wait plus execution;
+        a call still waiting in the queue when it expires is cancelled and never sent.
+        A call that has already started cannot be interrupted: the caller gets
+        InferenceTimeout right away, but the job keeps its worker slot until `fn`
+        returns (for Ollama calls, until their own HTTP timeout). Jobs that must stop
+        early take a threading.Event to check, as the streaming path does.
+        """
+        future = self.submit(fn, *args, priority=priority, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._counters["timed_out"] += 1
+            raise InferenceTimeout(f"Inference did not complete within {timeout}s")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, concurrency, counters and wait/service time stats (ms)."""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            services = sorted(self._service_times)
+            return {
+                "queue_depth": self._outstanding - self._in_flight,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "max_queue_size": self.max_queue_size,
+                **self._counters,
+                "wait_time_ms": {
+                    "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                    "p50": round(_percentile(waits, 50) * 1000, 2),
+                    "p95": round(_percentile(waits, 95) * 1000, 2),
+                    "max": round(waits[-1] * 1000, 2) if waits else 0.0,
+                },
+                "service_time_ms": {
+                    "avg": round(sum(services) / len(services) * 1000, 2) if services else 0.0,
+                    "p50": round(_percentile(services, 50) * 1000, 2),
+                    "p95": round(_percentile(services, 95) * 1000, 2),
+                },
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers; queued calls that have not started are cancelled."""
+        with self._lock:
+            self._shutdown = True
+            workers = list(self._workers)
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job.future.cancel()
+        for _ in workers:
+            self._queue.put(_Job(math.inf, next(self._seq), None, (), {}, Future(), 0.0))
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up, based on recent service times."""
+        if self._service_times:
+            avg_service = sum(self._service_times) / len(self._service_times)
+        else:
+            avg_service = 1.0
+        queued = self._outstanding - self._in_flight
+        return max(1, int(math.ceil(avg_service * (queued + 1) / max(self.max_in_flight, 1))))
+
+    def _start_workers(self) -> None:
+        # Workers are started lazily (and per process) so that importing this module
+        # or forking a server worker never inherits half-dead threads.
+        while len(self._workers) < self.max_in_flight:
+            worker = threading.Thread(
+                target=self._work,
+                name=f"ollama-inference-{len(self._workers)}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job.fn is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                with self._lock:
+                    self._outstanding -= 1
+                continue
+
+            started_at = time.monotonic()
+            with self._lock:
+                self._in_flight += 1
+                self._wait_times.append(started_at - job.enqueued_at)
+            outcome = "completed"
+            try:
+                result = job.context.run(job.fn, *job.args, **job.kwargs)
+            except BaseException as e:
+                outcome = "failed"
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._outstanding -= 1
+                    self._service_times.append(time.monotonic() - started_at)
+                    self._counters[outcome] += 1
+
+
+class AsyncInferenceLimiter:
+    """
+    asyncio counterpart of InferenceScheduler for the ASGI code path: at most
+    `max_in_flight` coroutines talk to Ollama at once, up to `max_queue_size` more
+    wait for a slot, and anything beyond that gets SchedulerQueueFull.
+    Waiters are served FIFO by the underlying asyncio.Semaphore.
+    """
+
+    def __init__(self, max_in_flight: int = 2, max_queue_size: int = 32):
+        self.max_in_flight = max_in_flight
+        self.max_queue_size = max_queue_size
+        # asyncio primitives are bound to one event loop; keep one semaphore per loop.
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._outstanding = 0
+        self._in_flight = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return semaphore
+
+    async def run(
+        self,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Any:
+        """Await `fn(*args, **kwargs)` once a slot is free; `timeout` covers wait plus execution."""
+        if self._outstanding >= self.max_in_flight + self.max_queue_size:
+            self._counters["rejected"] += 1
+            queued = self._outstanding - self._in_flight
+            raise SchedulerQueueFull(max(1, int(math.ceil((queued + 1) / max(self.max_in_flight, 1)))))
+
+        self._outstanding += 1
+        self._counters["submitted"] += 1
+        try:
+            return await asyncio.wait_for(self._run_in_slot(fn, *args, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            self._counters["timed_out"] += 1
+            raise InferenceTimeout(f"Inference did not complete within {timeout}s")
+        finally:
+            self._outstanding -= 1
+
+    async def _run_in_slot(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        async with self._semaphore():
+            self._in_flight += 1
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                self._counters["failed"] += 1
+                raise
+            finally:
+                self._in_flight -= 1
+            self._counters["completed"] += 1
+            return result
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._outstanding - self._in_flight,
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_queue_size": self.max_queue_size,
+            **self._counters,
+        }
+
+
+_scheduler: Optional[InferenceScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> InferenceScheduler:
+    """Process-wide scheduler configured from settings, created on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = InferenceScheduler(
+                    max_in_flight=getattr(settings, "OLLAMA_MAX_IN_FLIGHT", 2),
+                    max_queue_size=getattr(settings, "OLLAMA_QUEUE_SIZE", 32),
+                )
+    return _scheduler
+
+
+_async_limiter: Optional[AsyncInferenceLimiter] = None
+
+
+def get_async_limiter() -> AsyncInferenceLimiter:
+    """
+    Process-wide limiter for async Ollama calls. Its slots are separate from the threaded
+    scheduler's: a process serving both the sync and the async views can have
+    OLLAMA_MAX_IN_FLIGHT + OLLAMA_ASYNC_MAX_IN_FLIGHT generations in flight.
+    """
+    global _async_limiter
+    if _async_limiter is None:
+        _async_limiter = AsyncInferenceLimiter(
+            max_in_flight=getattr(settings, "OLLAMA_ASYNC_MAX_IN_FLIGHT", None) or getattr(settings, "OLLAMA_MAX_IN_FLIGHT", 2),
+            max_queue_size=getattr(settings, "OLLAMA_QUEUE_SIZE", 32),
+        )
+    return _async_limiter
+
+
+def _reset_after_fork() -> None:
+    global _scheduler, _scheduler_lock, _async_limiter
+    _scheduler = None
+    _scheduler_lock = threading.Lock()
+    _async_limiter = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
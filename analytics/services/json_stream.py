@@ -0,0 +1,83 @@
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Tuple
+
+
+class IncrementalJSONObjectParser:
+    """
+    Parses a JSON object that arrives in pieces (e.g. streamed LLM tokens) and reports
+    each top-level field as soon as its value is complete.
+
+        parser = IncrementalJSONObjectParser()
+        parser.feed('{"trajectory": "impro')   -> []
+        parser.feed('ving", "summary"')        -> [("trajectory", "improving")]
+
+    Any text before the opening brace (models like to say "Here is the JSON:") is skipped.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume the next piece of text; return the (name, value) pairs completed by it."""
+        if self.done or not chunk:
+            return []
+
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self._text
+
+        while self._pos < len(text):
+            char = text[self._pos]
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._close_member(self._pos))
+                    self.done = True
+                    self._pos += 1
+                    break
+            elif char == "," and self._depth == 1:
+                completed.extend(self._close_member(self._pos))
+                self._member_start = self._pos + 1
+
+            self._pos += 1
+
+        return completed
+
+    def _close_member(self, end: int) -> List[Tuple[str, Any]]:
+        member = self._text[self._member_start:end].strip()
+        if not member:
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            # Not valid JSON (e.g. a stray comment); the final full parse decides.
+            return []
+        items = list(parsed.items())
+        self.fields.update(items)
+        return items
@@ -0,0 +1,266 @@
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, options: Dict[str, Any], prompt: str) -> str:
+    """
+    Content address of one Ollama analysis: same model, options and prompt
+    text means the same cache entry.
+    """
+    material = json.dumps(
+        {"model": model, "options": options, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Base class for analysis-result caches. Values are JSON-serializable dicts,
+    stored as JSON text so callers always get a fresh copy back.
+    Subclasses implement _get/_set/_clear.
+    """
+
+    backend_name = "base"
+
+    def __init__(self, ttl: int = 86400, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self._get(key)
+        except Exception as e:
+            logger.error(f"LLM cache read failed: {str(e)}")
+            raw = None
+        self._count("hits" if raw is not None else "misses")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self._set(key, json.dumps(value, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f"LLM cache write failed: {str(e)}")
+            return
+        self._count("sets")
+
+    def clear(self) -> None:
+        self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["backend"] = self.backend_name
+        return stats
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, raw: str) -> None:
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryLLMCache(LLMCache):
+    """Per-process LRU with TTL."""
+
+    backend_name = "memory"
+
+    def __init__(self, ttl: int = 86400, max_entries: int = 1000):
+        super().__init__(ttl, max_entries)
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, raw = item
+            if expires_at < time.time():
+                del self._entries[key]
+                self._count("expired")
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set(self, key: str, raw: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteLLMCache(LLMCache):
+    """
+    Persistent cache in a SQLite file (the project's db.sqlite3 by default), shared by
+    every worker process on the host. LRU order is tracked with `accessed_at`.
+    """
+
+    backend_name = "sqlite"
+    table = "analytics_llm_cache"
+
+    def __init__(self, ttl: int = 86400, max_entries: int = 1000, path: Optional[str] = None):
+        super().__init__(ttl, max_entries)
+        self.path = str(path or settings.DATABASES["default"]["NAME"])
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        if not self._schema_ready:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at ON {self.table} (accessed_at)"
+            )
+            self._schema_ready = True
+        return conn
+
+    def _get(self, key: str) -> Optional[str]:
+        conn = self._connection()
+        row = conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] + self.ttl < now:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._count("expired")
+            return None
+        conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _set(self, key: str, raw: str) -> None:
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, raw, now, now),
+        )
+        (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            self._count("evictions", overflow)
+
+    def _clear(self) -> None:
+        self._connection().execute(f"DELETE FROM {self.table}")
+
+
+class DjangoCacheLLMCache(LLMCache):
+    """
+    Delegates storage to a Django cache alias (LocMem, Redis, Memcached, ...).
+    TTL is passed as the cache timeout; eviction follows the cache backend's own policy.
+    Entries are written under a generation number kept in the same cache: clear() bumps
+    it, so only this cache's entries become unreachable (and expire with their TTL),
+    not the rest of the alias.
+    """
+
+    backend_name = "django"
+    GENERATION_KEY = "llm:generation"
+
+    def __init__(self, ttl: int = 86400, max_entries: int = 1000, alias: str = "default"):
+        super().__init__(ttl, max_entries)
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def _generation(self) -> int:
+        return self._cache.get_or_set(self.GENERATION_KEY, 1, timeout=None)
+
+    def _get(self, key: str) -> Optional[str]:
+        return self._cache.get(f"llm:{key}", version=self._generation())
+
+    def _set(self, key: str, raw: str) -> None:
+        self._cache.set(f"llm:{key}", raw, timeout=self.ttl, version=self._generation())
+
+    def _clear(self) -> None:
+        try:
+            self._cache.incr(self.GENERATION_KEY)
+        except ValueError:  # never written (or evicted): start a generation no entry uses yet
+            self._cache.set(self.GENERATION_KEY, 2, timeout=None)
+
+
+CACHE_BACKENDS = {
+    "memory": InMemoryLLMCache,
+    "sqlite": SQLiteLLMCache,
+    "django": DjangoCacheLLMCache,
+}
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Cache configured by settings.LLM_CACHE, created on first use.
+    Returns None when caching is disabled (BACKEND set to None or "none").
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        config = dict(getattr(settings, "LLM_CACHE", {"BACKEND": "memory"}))
+        backend = config.pop("BACKEND", "memory")
+        if not backend or backend == "none":
+            return None
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                if backend not in CACHE_BACKENDS:
+                    raise RuntimeError(
+                        f"Unknown LLM_CACHE backend {backend!r}; expected one of {sorted(CACHE_BACKENDS)}."
+                    )
+                options = {key.lower(): value for key, value in config.items()}
+                _llm_cache = CACHE_BACKENDS[backend](**options)
+    return _llm_cache
+
+
+def _reset_after_fork() -> None:
+    # A SQLite connection must not be shared across fork(); the child opens its own
+    global _llm_cache, _llm_cache_lock
+    _llm_cache = None
+    _llm_cache_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
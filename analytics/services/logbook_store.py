@@ -0,0 +1,347 @@
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from django.conf import settings
+
+from .report_generator import _build_log_texts_from_entries
+from .scoring_engine import score_from_aggregates, tokenize_entries
+from .sentiment import get_sentiment_backend
+from .utils import LOGBOOK_PROJECTION, LogbookEntry, _entry_from_doc, get_logbook_collection
+
+PARTITION_PREFIX = "entries_"
+_PARTITION_RE = re.compile(r"^entries_(\d{4})_(\d{2})$")
+
+# (source_id, intern_id, day, status, tech_stack, text, word_count, keyword_hits, polarity_sum, polarity_count)
+StoreRow = Tuple[str, str, str, str, str, str, int, int, float, int]
+
+
+def partition_name(day: str) -> str:
+    """Monthly partition table for a 'YYYY-MM-DD' day, e.g. entries_2025_09."""
+    return f"{PARTITION_PREFIX}{day[:4]}_{day[5:7]}"
+
+
+def rows_from_entries(items: Sequence[Tuple[str, str, LogbookEntry]]) -> List[StoreRow]:
+    """
+    Feature rows for (source_id, intern_id, entry) triples. Tokenization and sentiment
+    run once over the whole batch; entries without descriptive text are skipped, as in scoring.
+    """
+    kept: List[Tuple[str, str, LogbookEntry, str]] = []
+    for source_id, intern_id, entry in items:
+        texts = _build_log_texts_from_entries([entry])
+        day = str(entry.date or "")[:10]
+        if texts and len(day) == 10:
+            kept.append((source_id, intern_id, entry, texts[0]))
+
+    tokenized = tokenize_entries([text for *_, text in kept])
+    polarity = get_sentiment_backend().polarity_components_tokenized(tokenized)
+    return [
+        (
+            source_id, intern_id, str(entry.date)[:10], entry.status, entry.tech_stack, text,
+            tokens.word_count, tokens.keyword_total, polarity_sum, polarity_count,
+        )
+        for (source_id, intern_id, entry, text), tokens, (polarity_sum, polarity_count) in zip(kept, tokenized, polarity)
+    ]
+
+
+class LogbookStore:
+    """
+    Local analytics copy of `dailyrecords` in its own SQLite file, partitioned into one
+    table per month. Each row carries the entry's precomputed scoring features, so window
+    and cohort scores are single set-based aggregations (SUM/GROUP BY inside SQLite)
+    over only the partitions the date range touches — no Mongo reads, no re-tokenizing.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or getattr(settings, "LOGBOOK_STORE_PATH", settings.BASE_DIR / "logbook_store.sqlite3"))
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # -- partitions --
+
+    def partitions(self) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'entries\\_%' ESCAPE '\\' ORDER BY name"
+        ).fetchall()
+        return [name for (name,) in rows if _PARTITION_RE.match(name)]
+
+    def _partitions_for(self, start_date: str, end_date: str) -> List[str]:
+        first, last = partition_name(start_date), partition_name(end_date)
+        return [name for name in self.partitions() if first <= name <= last]
+
+    def _ensure_partition(self, name: str) -> None:
+        # Clustered on (day, intern_id): a date range is a contiguous range of pages
+        self._connection().execute(
+            f"CREATE TABLE IF NOT EXISTS {name} ("
+            "day TEXT NOT NULL, intern_id TEXT NOT NULL, source_id TEXT NOT NULL, "
+            "status TEXT, tech_stack TEXT, text TEXT, "
+            "word_count INTEGER NOT NULL, keyword_hits INTEGER NOT NULL, "
+            "polarity_sum REAL NOT NULL, polarity_count INTEGER NOT NULL, "
+            "PRIMARY KEY (day, intern_id, source_id)) WITHOUT ROWID"
+        )
+        self._connection().execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_source ON {name} (source_id)")
+
+    # -- writes --
+
+    def write_rows(self, rows: Iterable[StoreRow]) -> int:
+        """Upsert feature rows (an entry that moved to another day/partition is moved too)."""
+        by_partition: Dict[str, List[StoreRow]] = {}
+        for row in rows:
+            by_partition.setdefault(partition_name(row[2]), []).append(row)
+        if not by_partition:
+            return 0
+
+        conn = self._connection()
+        written = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = self.partitions()
+            for name, partition_rows in by_partition.items():
+                self._ensure_partition(name)
+                source_ids = [(row[0],) for row in partition_rows]
+                for other in existing:
+                    if other != name:
+                        conn.executemany(f"DELETE FROM {other} WHERE source_id = ?", source_ids)
+                conn.executemany(f"DELETE FROM {name} WHERE source_id = ?", source_ids)
+                conn.executemany(
+                    f"INSERT INTO {name} (source_id, intern_id, day, status, tech_stack, text, "
+                    "word_count, keyword_hits, polarity_sum, polarity_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    partition_rows,
+                )
+                written += len(partition_rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return written
+
+    def delete_sources(self, source_ids: Iterable[str]) -> None:
+        """Remove the rows of these entries from every partition (edited to no longer be scored)."""
+        params = [(source_id,) for source_id in source_ids]
+        conn = self._connection()
+        for name in self.partitions():
+            conn.executemany(f"DELETE FROM {name} WHERE source_id = ?", params)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._connection().execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self._connection().execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def truncate(self) -> None:
+        conn = self._connection()
+        for name in self.partitions():
+            conn.execute(f"DROP TABLE {name}")
+        conn.execute("DELETE FROM store_meta")
+
+    # -- queries --
+
+    def _union(self, start_date: str, end_date: str, columns: str, intern_ids: Optional[Sequence[str]]):
+        """UNION ALL over the partitions overlapping the range, with the day (and intern) filter pushed into each."""
+        partitions = self._partitions_for(start_date, end_date)
+        where = "day BETWEEN ? AND ?"
+        params: List[Any] = []
+        if intern_ids:
+            where += f" AND intern_id IN ({','.join('?' * len(intern_ids))})"
+        per_partition = [start_date, end_date, *(intern_ids or [])]
+        selects = []
+        for name in partitions:
+            selects.append(f"SELECT {columns} FROM {name} WHERE {where}")
+            params.extend(per_partition)
+        return " UNION ALL ".join(selects), params
+
+    def intern_aggregates(
+        self, start_date: str, end_date: str, intern_ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Per-intern sums of the scoring features for the window (what score_from_aggregates takes)."""
+        union, params = self._union(
+            start_date, end_date,
+            "intern_id, word_count, keyword_hits, polarity_sum, polarity_count", intern_ids,
+        )
+        if not union:
+            return {}
+        rows = self._connection().execute(
+            "SELECT intern_id, COUNT(*), SUM(word_count), SUM(word_count * word_count), "
+            f"SUM(keyword_hits), SUM(polarity_sum), SUM(polarity_count) FROM ({union}) GROUP BY intern_id",
+            params,
+        ).fetchall()
+        return {
+            row[0]: {
+                "entry_count": row[1],
+                "word_count_sum": row[2],
+                "word_count_sq_sum": row[3],
+                "keyword_hits": row[4],
+                "polarity_sum": row[5],
+                "polarity_count": row[6],
+            }
+            for row in rows
+        }
+
+    def cohort_scores(
+        self, start_date: str, end_date: str, intern_ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, int]:
+        """Same scores as compute_intern_score, for every intern (or `intern_ids`) in the window."""
+        return {
+            intern_id: score_from_aggregates(**totals)
+            for intern_id, totals in self.intern_aggregates(start_date, end_date, intern_ids).items()
+        }
+
+    def daily_activity(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Entries, active interns and mean polarity per day, across the whole cohort."""
+        union, params = self._union(start_date, end_date, "day, intern_id, polarity_sum, polarity_count", None)
+        if not union:
+            return []
+        rows = self._connection().execute(
+            "SELECT day, COUNT(*), COUNT(DISTINCT intern_id), SUM(polarity_sum), SUM(polarity_count) "
+            f"FROM ({union}) GROUP BY day ORDER BY day",
+            params,
+        ).fetchall()
+        return [
+            {
+                "day": day,
+                "entries": entries,
+                "interns": interns,
+                "polarity": round(polarity_sum / polarity_count, 4) if polarity_count else 0.0,
+            }
+            for day, entries, interns, polarity_sum, polarity_count in rows
+        ]
+
+    def count(self) -> int:
+        conn = self._connection()
+        return sum(conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0] for name in self.partitions())
+
+
+def _mongo_batches(store: LogbookStore, batch_size: int) -> Iterator[Tuple[List[Tuple[str, str, LogbookEntry]], Dict[str, str]]]:
+    """
+    `dailyrecords` documents the store has not seen, with the watermarks to record after
+    them. As in sync_feature_store: first the exported documents edited since the updatedAt
+    watermark, then new documents in _id order after the _id watermark.
+    """
+    from .feature_store import _updated_watermark, _watermark_value  # feature_store imports the ORM
+
+    collection = get_logbook_collection()
+    intern_field = getattr(settings, "FEATURE_STORE_INTERN_FIELD", "internId")
+    updated_field = getattr(settings, "FEATURE_STORE_UPDATED_FIELD", "updatedAt")
+    projection = {**LOGBOOK_PROJECTION, "_id": 1, intern_field: 1, updated_field: 1}
+    last_id, last_updated_at = store.get_meta("last_id"), store.get_meta("last_updated_at")
+
+    def items(docs) -> List[Tuple[str, str, LogbookEntry]]:
+        return [
+            (str(doc["_id"]), str(doc[intern_field]), _entry_from_doc(doc))
+            for doc in docs
+            if doc.get(intern_field) is not None
+        ]
+
+    def watermarks(docs) -> Dict[str, str]:
+        nonlocal last_updated_at
+        newest = max((doc[updated_field] for doc in docs if doc.get(updated_field)), default=None)
+        if newest is not None and (not last_updated_at or newest > _watermark_value(last_updated_at)):
+            last_updated_at = _updated_watermark(newest)
+        return {"last_updated_at": last_updated_at} if last_updated_at else {}
+
+    # Edits first, so the inserts below cannot move the updatedAt watermark past unseen edits
+    if last_id and last_updated_at:
+        edited = list(collection.find(
+            {updated_field: {"$gte": _watermark_value(last_updated_at)}, "_id": {"$lte": ObjectId(last_id)}},
+            projection,
+        ))
+        if edited:
+            yield items(edited), watermarks(edited)
+
+    while True:
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        docs = list(collection.find(query, projection).sort("_id", 1).limit(batch_size))
+        if not docs:
+            return
+        last_id = str(docs[-1]["_id"])
+        yield items(docs), {"last_id": last_id, **watermarks(docs)}
+
+
+def _snapshot_batches(batch_size: int) -> Iterator[Tuple[List[Tuple[str, str, LogbookEntry]], Dict[str, str]]]:
+    """All entries of the BSON snapshot (re-exporting it is idempotent)."""
+    from .bson_snapshot import LOGBOOK_FILE, _entry_from_snapshot_doc, get_snapshot, iter_bson_file
+
+    path = os.path.join(get_snapshot().directory, LOGBOOK_FILE)
+    items: List[Tuple[str, str, LogbookEntry]] = []
+    for doc in iter_bson_file(path, chunk_size=batch_size):
+        if doc.get("intern_id") is None:
+            continue
+        items.append((str(doc["_id"]), str(doc["intern_id"]), _entry_from_snapshot_doc(doc)))
+        if len(items) == batch_size:
+            yield items, {}
+            items = []
+    if items:
+        yield items, {}
+
+
+def export_to_store(store: Optional[LogbookStore] = None, batch_size: int = 5000, full: bool = False) -> Dict[str, int]:
+    """
+    Land logbook entries into the store, batch by batch, from the configured data source
+    (LOGBOOK_DATA_SOURCE). From Mongo only documents past the last exported _id, or edited
+    since the last exported updatedAt, are read, unless `full` rebuilds the store from scratch.
+    """
+    from .bson_snapshot import snapshot_enabled
+
+    store = store or LogbookStore()
+    if full:
+        store.truncate()
+    stats = {"read": 0, "written": 0}
+    batches = _snapshot_batches(batch_size) if snapshot_enabled() else _mongo_batches(store, batch_size)
+    for items, meta in batches:
+        stats["read"] += len(items)
+        rows = rows_from_entries(items)
+        stats["written"] += store.write_rows(rows)
+        # An entry edited down to no descriptive text is no longer scored
+        dropped = {source_id for source_id, _, _ in items} - {row[0] for row in rows}
+        if dropped:
+            store.delete_sources(dropped)
+        for key, value in meta.items():
+            store.set_meta(key, value)
+    return stats
+
+
+_store: Optional[LogbookStore] = None
+_store_lock = threading.Lock()
+
+
+def get_logbook_store() -> LogbookStore:
+    """Process-wide store at LOGBOOK_STORE_PATH; each thread keeps its own SQLite connection to it."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LogbookStore()
+    return _store
+
+
+def _reset_after_fork() -> None:
+    # SQLite connections must not cross fork(); the child opens its own
+    global _store, _store_lock
+    _store = None
+    _store_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+
+from .inference_scheduler import PRIORITY_INTERACTIVE
+from .text_processing import analyze_with_ollama, reduce_weekly_analyses
+
+
+# Bucket of entries without a parseable date; sorts after every week
+UNDATED = "undated"
+
+
+def week_start(day: str) -> str:
+    """Monday of the ISO week containing 'YYYY-MM-DD'."""
+    parsed = date.fromisoformat(str(day)[:10])
+    return (parsed - timedelta(days=parsed.weekday())).isoformat()
+
+
+def weekly_chunks(entries: List[Any]) -> List[Tuple[str, List[str]]]:
+    """
+    (week_start, log texts) per calendar week, oldest first. Weeks are aligned to Mondays
+    rather than to the window, so a past week yields the same prompt on every request and
+    its analysis comes straight from the LLM cache. Entries with a missing or malformed
+    date go to a final UNDATED chunk instead of being dropped.
+    """
+    from .report_generator import _build_log_texts_from_entries
+
+    by_week: Dict[str, List[Any]] = {}
+    for entry in entries:
+        try:
+            week = week_start(str(entry.get("date") or ""))
+        except ValueError:
+            week = UNDATED
+        by_week.setdefault(week, []).append(entry)
+    chunks = []
+    for week in sorted(by_week):
+        texts = _build_log_texts_from_entries(by_week[week])
+        if texts:
+            chunks.append((week, texts))
+    return chunks
+
+
+def use_long_window(days: int) -> bool:
+    return days >= getattr(settings, "LONG_WINDOW_MIN_DAYS", 14)
+
+
+def _merge_weeks(weeks: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Fallback when the reduce call fails: the latest trajectory and the weeks' lists concatenated."""
+
+    def merged(field: str) -> List[Any]:
+        return list(dict.fromkeys(item for _, analysis in weeks for item in analysis.get(field) or []))
+
+    return {
+        "trajectory": weeks[-1][1].get("trajectory", "unknown"),
+        "milestones_achieved": merged("milestones_achieved"),
+        "summary": " ".join(f"Week of {week}: {analysis.get('summary', '')}" for week, analysis in weeks),
+        "challenges": merged("challenges"),
+        "recommendations": merged("recommendations"),
+    }
+
+
+def analyze_long_window(intern_name: str, entries: List[Any], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """
+    Map-reduce analysis of a long window: every week is analyzed concurrently (the
+    scheduler bounds how many run on Ollama at once, so latency grows with weeks / slots),
+    then one reduce call turns the weekly analyses into the final trajectory and milestones.
+    SchedulerQueueFull from any week is re-raised.
+    """
+    chunks = weekly_chunks(entries)
+    if not chunks:
+        from .report_generator import _build_log_texts_from_entries
+
+        return analyze_with_ollama(intern_name, _build_log_texts_from_entries(entries), priority)
+    if len(chunks) == 1:
+        return analyze_with_ollama(intern_name, chunks[0][1], priority)
+
+    workers = min(len(chunks), getattr(settings, "LONG_WINDOW_WORKERS", 4))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="week-analysis") as pool:
+        # Each week runs in a copy of the caller's context, so its stages reach the request's trace
+        futures = [
+            pool.submit(contextvars.copy_context().run, analyze_with_ollama, intern_name, texts, priority)
+            for _, texts in chunks
+        ]
+        analyses = [future.result() for future in futures]
+
+    weeks = [(week, analysis) for (week, _), analysis in zip(chunks, analyses) if "error" not in analysis]
+    if not weeks:
+        return analyses[-1]
+
+    result = reduce_weekly_analyses(intern_name, weeks, priority)
+    if "error" in result:
+        result = _merge_weeks(weeks)
+    return result
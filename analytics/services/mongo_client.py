@@ -0,0 +1,91 @@
+from __future__ import annotations
+import atexit
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+
+logger = logging.getLogger(__name__)
+
+# One MongoClient per (process, uri). MongoClient is thread-safe and keeps its own
+# connection pool, so every request in a worker process shares the same instance.
+_clients: Dict[Tuple[int, str], MongoClient] = {}
+_lock = threading.Lock()
+
+
+def _client_options() -> Dict[str, Any]:
+    """
+    Pool and timeout options passed to every MongoClient.
+    All values can be overridden from settings.
+    """
+    return {
+        "maxPoolSize": getattr(settings, "MONGODB_MAX_POOL_SIZE", 50),
+        "minPoolSize": getattr(settings, "MONGODB_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": getattr(settings, "MONGODB_MAX_IDLE_TIME_MS", 300000),
+        "connectTimeoutMS": getattr(settings, "MONGODB_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": getattr(settings, "MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": getattr(settings, "MONGODB_SOCKET_TIMEOUT_MS", 30000),
+        "waitQueueTimeoutMS": getattr(settings, "MONGODB_WAIT_QUEUE_TIMEOUT_MS", 5000),
+    }
+
+
+def get_shared_client(uri: Optional[str] = None) -> MongoClient:
+    """
+    Return the process-wide MongoClient for `uri`, creating it on first use.
+    A client created before a fork is never reused in the child process.
+    """
+    uri = uri or getattr(settings, "MONGODB_URI", None) or os.environ.get("MONGODB_URI")
+    if not uri:
+        raise RuntimeError("MONGODB_URI not configured in settings or environment.")
+
+    key = (os.getpid(), uri)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            from pymongo import MongoClient  # imported on first use: pymongo is slow to import
+
+            client = MongoClient(uri, connect=False, **_client_options())
+            _clients[key] = client
+            logger.info("Created shared MongoClient for pid %s", key[0])
+    return client
+
+
+def close_shared_clients() -> None:
+    """
+    Close every client owned by the current process.
+    Called at interpreter exit and safe to call from worker shutdown hooks.
+    """
+    pid = os.getpid()
+    with _lock:
+        owned = [key for key in _clients if key[0] == pid]
+        for key in owned:
+            client = _clients.pop(key)
+            try:
+                client.close()
+            except Exception as e:
+                logger.error(f"Error closing MongoDB client: {str(e)}")
+
+
+def _reset_after_fork() -> None:
+    """
+    Drop clients inherited from the parent process. Their sockets and monitor
+    threads belong to the parent, so the child must build its own pool.
+    """
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(close_shared_clients)
@@ -0,0 +1,215 @@
+from __future__ import annotations
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ASCENDING = 1  # pymongo.ASCENDING, without importing pymongo for it
+
+# Collections the legacy TalentHub service used to probe, in order
+LOGBOOK_COLLECTION_CANDIDATES = ["logbooks", "logbook_entries", "entries", "logs", "daily_logs"]
+INTERN_FIELD_CANDIDATES = ["internId", "userId", "user_id", "intern_id", "createdBy"]
+
+
+def logbook_collection_name() -> str:
+    return getattr(settings, "MONGODB_LOGBOOK_COLLECTION", "dailyrecords")
+
+
+def required_indexes(logbook_source: Optional[Tuple[str, str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Indexes the report pipeline relies on, per collection:
+      - (internId, date): fetch_logbook_entries / cohort $match on intern + date range, sorted by date
+      - (updatedAt, _id): the feature store's edits pass (updatedAt >= watermark, _id <= watermark)
+    plus (field) on the legacy (collection, intern field) used by TalentHubMongoService, if given.
+    """
+    indexes = {
+        logbook_collection_name(): [
+            {"name": "internId_1_date_1", "keys": [("internId", ASCENDING), ("date", ASCENDING)]},
+            {"name": "updatedAt_1__id_1", "keys": [("updatedAt", ASCENDING), ("_id", ASCENDING)]},
+        ],
+    }
+    if logbook_source and logbook_source != (logbook_collection_name(), "internId"):
+        collection_name, field = logbook_source
+        indexes.setdefault(collection_name, []).append({"name": f"{field}_1", "keys": [(field, ASCENDING)]})
+    return indexes
+
+
+def query_shapes() -> List[Dict[str, Any]]:
+    """Representative queries of the hot paths; explain() must not pick a COLLSCAN for them."""
+    collection = logbook_collection_name()
+    return [
+        {
+            "label": "fetch_logbook_entries",
+            "collection": collection,
+            "filter": {"internId": ObjectId(), "date": {"$gte": "2025-01-01", "$lte": "2025-01-07"}},
+            "sort": [("date", ASCENDING)],
+        },
+        {
+            "label": "fetch_cohort_logbook_entries",
+            "collection": collection,
+            "filter": {"internId": {"$in": [ObjectId(), ObjectId()]}, "date": {"$gte": "2025-01-01", "$lte": "2025-01-07"}},
+            "sort": None,
+        },
+        {
+            "label": "feature_store_edits",
+            "collection": collection,
+            "filter": {"updatedAt": {"$gte": "2025-01-01"}, "_id": {"$lte": ObjectId()}},
+            "sort": None,
+        },
+    ]
+
+
+def ensure_indexes(db, create: bool = True) -> Dict[str, Dict[str, str]]:
+    """
+    Compare the declared indexes with the existing ones and create the missing ones.
+    Returns {collection: {index_name: "ok" | "created" | "missing" | "conflict"}};
+    "conflict" means an index with that name exists on different keys (left untouched).
+    """
+    report: Dict[str, Dict[str, str]] = {}
+    for collection_name, specs in required_indexes(resolve_logbook_source(db)).items():
+        collection = db[collection_name]
+        existing = {name: info["key"] for name, info in collection.index_information().items()}
+        existing_keys = [list(map(tuple, keys)) for keys in existing.values()]
+        statuses = report.setdefault(collection_name, {})
+
+        for spec in specs:
+            keys = [(field, direction) for field, direction in spec["keys"]]
+            if spec["name"] in existing:
+                statuses[spec["name"]] = "ok" if list(map(tuple, existing[spec["name"]])) == keys else "conflict"
+            elif any(other[:len(keys)] == keys for other in existing_keys):
+                # Same keys (or a compound index starting with them) under another name
+                statuses[spec["name"]] = "ok"
+            elif create:
+                collection.create_index(keys, name=spec["name"])
+                statuses[spec["name"]] = "created"
+                logger.info("Created index %s on %s", spec["name"], collection_name)
+            else:
+                statuses[spec["name"]] = "missing"
+
+            if statuses[spec["name"]] in ("missing", "conflict"):
+                logger.warning("Index %s on %s is %s", spec["name"], collection_name, statuses[spec["name"]])
+    return report
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """All stage names in an explain() plan tree."""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+def winning_plan_stages(explain: Dict[str, Any]) -> List[str]:
+    query_planner = explain.get("queryPlanner", {})
+    return _plan_stages(query_planner.get("winningPlan", {}))
+
+
+def explain_query(db, shape: Dict[str, Any]) -> Dict[str, Any]:
+    """Run explain() for one query shape; log a warning when the winning plan scans the collection."""
+    cursor = db[shape["collection"]].find(shape["filter"])
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    stages = winning_plan_stages(cursor.explain())
+    collscan = "COLLSCAN" in stages
+    if collscan:
+        logger.warning(
+            "Query %s on %s uses a COLLSCAN (plan: %s); check the indexes with `manage.py ensure_mongo_indexes`",
+            shape["label"], shape["collection"], " > ".join(stages),
+        )
+    return {"label": shape["label"], "collection": shape["collection"], "stages": stages, "collscan": collscan}
+
+
+def check_query_shapes(db) -> List[Dict[str, Any]]:
+    return [explain_query(db, shape) for shape in query_shapes()]
+
+
+_explained: set = set()
+_explained_lock = threading.Lock()
+
+
+def explain_once(collection, label: str, query: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None) -> None:
+    """
+    With settings.MONGODB_EXPLAIN_QUERIES, explain each query label once per process and
+    log COLLSCAN plans. Cheap no-op otherwise; never raises into the request path.
+    """
+    if not getattr(settings, "MONGODB_EXPLAIN_QUERIES", False):
+        return
+    with _explained_lock:
+        if label in _explained:
+            return
+        _explained.add(label)
+    try:
+        explain_query(collection.database, {"label": label, "collection": collection.name, "filter": query, "sort": sort})
+    except Exception as exc:  # explain is diagnostics only
+        logger.debug("explain() for %s failed: %s", label, exc)
+
+
+# -- Resolution of the legacy TalentHub collection / field names (cached per database) --
+
+_resolved: Dict[Tuple[str, str], Any] = {}
+_resolved_lock = threading.Lock()
+
+
+def _cached(db, key: str, resolve):
+    """Resolve once per (database, key); a None result is not cached so it is retried later."""
+    cache_key = (db.name, key)
+    if cache_key not in _resolved:
+        with _resolved_lock:
+            if cache_key not in _resolved:
+                value = resolve()
+                if value is None:
+                    return None
+                _resolved[cache_key] = value
+    return _resolved[cache_key]
+
+
+def resolve_logbook_source(db) -> Optional[Tuple[str, str]]:
+    """
+    (collection, intern field) holding the logbook entries, found once per process instead
+    of trying every collection x field combination on each request. None if nothing matches.
+    """
+
+    def resolve():
+        names = set(db.list_collection_names())
+        candidates = [logbook_collection_name()] + LOGBOOK_COLLECTION_CANDIDATES
+        for collection_name in (name for name in candidates if name in names):
+            for field in INTERN_FIELD_CANDIDATES:
+                if db[collection_name].find_one({field: {"$exists": True}}, projection={"_id": 1}) is not None:
+                    logger.info("Logbook entries resolved to %s.%s", collection_name, field)
+                    return collection_name, field
+        return None
+
+    return _cached(db, "logbook_source", resolve)
+
+
+def reset_resolution_cache() -> None:
+    with _resolved_lock:
+        _resolved.clear()
+
+
+def ensure_indexes_in_background() -> threading.Thread:
+    """Startup hook: create/verify indexes and explain the hot queries without blocking boot."""
+
+    def run():
+        from .utils import get_logbook_collection
+
+        try:
+            db = get_logbook_collection().database
+            ensure_indexes(db)
+            check_query_shapes(db)
+        except Exception as exc:
+            logger.warning("Could not ensure MongoDB indexes on startup: %s", exc)
+
+    thread = threading.Thread(target=run, name="ensure-mongo-indexes", daemon=True)
+    thread.start()
+    return thread
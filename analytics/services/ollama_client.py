@@ -0,0 +1,176 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaClient:
+    """
+    HTTP client for one Ollama server. Calls share a requests.Session whose connection
+    pool keeps TCP connections open between calls, and every generation carries
+    `keep_alive` so Ollama keeps the model loaded in memory between reports.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        keep_alive: Optional[str] = "30m",
+        pool_size: int = 4,
+        timeout: float = 120,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        # requests is imported with the first client, not with the module (it is slow to import)
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.warmed_up_at: Optional[float] = None
+
+    def _payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.keep_alive is not None and "keep_alive" not in payload:
+            payload = {**payload, "keep_alive": self.keep_alive}
+        return payload
+
+    def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Blocking POST /api/generate (payload["stream"] should be False)."""
+        response = self.session.post(
+            f"{self.base_url}/api/generate", json=self._payload(payload), timeout=timeout or self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def stream_generate(
+        self,
+        payload: Dict[str, Any],
+        timeout: Optional[float] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming POST /api/generate, one parsed chunk per yielded dict. Stopping early
+        (or setting `cancelled`) closes the connection, which stops the generation.
+        """
+        with self.session.post(
+            f"{self.base_url}/api/generate",
+            json=self._payload({**payload, "stream": True}),
+            stream=True,
+            timeout=timeout or self.timeout,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if cancelled is not None and cancelled.is_set():
+                    return
+                if not line:
+                    continue
+                data = json.loads(line)
+                yield data
+                if data.get("done"):
+                    return
+
+    def warm_up(self) -> float:
+        """
+        Load the model into memory (a generate call without a prompt only loads it) and
+        keep it there for `keep_alive`. Returns the seconds it took.
+        """
+        started = time.perf_counter()
+        self.generate({"model": self.model, "prompt": "", "stream": False})
+        self.warmed_up_at = time.time()
+        return time.perf_counter() - started
+
+    def health(self, timeout: float = 5) -> Dict[str, Any]:
+        """Reachability of the server, its version and whether the configured model is installed."""
+        import requests
+
+        started = time.perf_counter()
+        status: Dict[str, Any] = {"url": self.base_url, "model": self.model}
+        try:
+            version = self.session.get(f"{self.base_url}/api/version", timeout=timeout)
+            version.raise_for_status()
+            tags = self.session.get(f"{self.base_url}/api/tags", timeout=timeout)
+            tags.raise_for_status()
+        except (requests.RequestException, ValueError) as e:
+            status.update(ok=False, error=str(e))
+        else:
+            models = tags.json().get("models", [])
+            names = {m.get("name") for m in models} | {m.get("model") for m in models}
+            status.update(
+                ok=self.model in names,
+                version=version.json().get("version"),
+                model_available=self.model in names,
+            )
+            if not status["ok"]:
+                status["error"] = f"Model {self.model!r} is not pulled on this server"
+        status["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        status["warmed_up_at"] = self.warmed_up_at
+        return status
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: Dict[str, OllamaClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_ollama_client(base_url: Optional[str] = None) -> OllamaClient:
+    """Shared client (and connection pool) per Ollama server, configured from settings."""
+    base_url = (base_url or getattr(settings, "OLLAMA_API_URL", "http://localhost:11434")).rstrip("/")
+    client = _clients.get(base_url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(base_url)
+            if client is None:
+                client = _clients[base_url] = OllamaClient(
+                    base_url,
+                    model=getattr(settings, "OLLAMA_MODEL", "gemma3:1b"),
+                    keep_alive=getattr(settings, "OLLAMA_KEEP_ALIVE", "30m"),
+                    # Concurrency is bounded by the inference scheduler; +2 for health checks and warm-up
+                    pool_size=getattr(settings, "OLLAMA_MAX_IN_FLIGHT", 2) + 2,
+                    timeout=getattr(settings, "OLLAMA_REQUEST_TIMEOUT", 120),
+                )
+    return client
+
+
+def warm_up_in_background(urls: Optional[Sequence[str]] = None) -> threading.Thread:
+    """
+    Startup hook: load the model on every backend (default: OLLAMA_BACKENDS, else
+    OLLAMA_API_URL) before the first report asks for it, without blocking boot.
+    """
+    urls = list(urls or getattr(settings, "OLLAMA_BACKENDS", None) or [getattr(settings, "OLLAMA_API_URL", "http://localhost:11434")])
+
+    def run():
+        for url in urls:
+            client = get_ollama_client(url)
+            try:
+                seconds = client.warm_up()
+                logger.info("Ollama model %s loaded on %s in %.1fs", client.model, client.base_url, seconds)
+            except Exception as exc:
+                logger.warning("Could not warm up Ollama model %s on %s: %s", client.model, client.base_url, exc)
+
+    thread = threading.Thread(target=run, name="ollama-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _reset_after_fork() -> None:
+    # Pooled sockets must not be shared with a forked child
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,299 @@
+from __future__ import annotations
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+
+from .ollama_client import get_ollama_client
+
+logger = logging.getLogger(__name__)
+
+
+class NoBackendAvailable(RuntimeError):
+    pass
+
+
+class Backend:
+    """One Ollama server as seen by the router."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.unhealthy_until = 0.0
+        self.latency = 0.0  # exponentially weighted moving average, seconds
+        self.calls = 0
+        self.failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ms": round(self.latency * 1000, 1),
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+def _is_failover_error(error: BaseException) -> bool:
+    """Errors worth retrying on another server: timeouts, refused or dropped connections, 5xx."""
+    # Only the HTTP library that raised the error has to be loaded; neither is imported here
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+            return True
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500
+    httpx = sys.modules.get("httpx")
+    if httpx is not None:
+        if isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+    return False
+
+
+class OllamaRouter:
+    """
+    Spreads generations over several Ollama servers.
+
+    - Load balancing: each call goes to the healthy backend with the fewest outstanding
+      requests (ties broken by the lower moving-average latency).
+    - Failover: a timeout, connection error or 5xx marks the backend unhealthy for
+      `cooldown` seconds and the call is retried on the next backend.
+    - Health checks: check_health() probes every backend (GET /api/version + /api/tags);
+      unhealthy backends come back once their cooldown has passed or a probe succeeds.
+    - Fallback model: when a call with the primary model takes longer than `latency_slo`
+      seconds, the next calls use `fallback_model` for `cooldown` seconds. A call that
+      failed on every backend is retried once with the fallback model too.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        fallback_model: Optional[str] = None,
+        latency_slo: Optional[float] = None,
+        cooldown: float = 30.0,
+    ):
+        if not urls:
+            raise NoBackendAvailable("No Ollama backends configured.")
+        self.backends = [Backend(url) for url in dict.fromkeys(urls)]
+        self.fallback_model = fallback_model
+        self.latency_slo = latency_slo
+        self.cooldown = cooldown
+        self.degraded_until = 0.0
+        self._lock = threading.Lock()
+
+    # -- backend selection --
+
+    def _acquire(self, exclude: Sequence[Backend] = ()) -> Backend:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                raise NoBackendAvailable("Every Ollama backend failed for this request.")
+            for backend in candidates:
+                if not backend.healthy and backend.unhealthy_until <= now:
+                    backend.healthy = True  # cooldown over, give it another chance
+            healthy = [b for b in candidates if b.healthy] or candidates
+            backend = min(healthy, key=lambda b: (b.outstanding, b.latency))
+            backend.outstanding += 1
+            return backend
+
+    def _release(self, backend: Backend, seconds: Optional[float], error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            backend.calls += 1
+            if error is not None:
+                backend.failures += 1
+                backend.healthy = False
+                backend.unhealthy_until = time.monotonic() + self.cooldown
+            elif seconds is not None:
+                backend.latency = seconds if not backend.latency else 0.8 * backend.latency + 0.2 * seconds
+
+    # -- fallback model --
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.fallback_model) and time.monotonic() < self.degraded_until
+
+    def _with_model(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {**payload, "model": self.fallback_model} if self.degraded else payload
+
+    def _observe_latency(self, payload: Dict[str, Any], seconds: float) -> None:
+        if (
+            self.latency_slo
+            and self.fallback_model
+            and payload.get("model") != self.fallback_model
+            and seconds > self.latency_slo
+        ):
+            logger.warning(
+                "Ollama call took %.1fs (SLO %.1fs); using %s for the next %.0fs",
+                seconds, self.latency_slo, self.fallback_model, self.cooldown,
+            )
+            self.degraded_until = time.monotonic() + self.cooldown
+
+    # -- calls --
+
+    def _retry_with_fallback(self, payload: Dict[str, Any]) -> bool:
+        return bool(self.fallback_model) and payload.get("model") != self.fallback_model
+
+    def _failed(self, backend: Backend, error: Exception) -> None:
+        """Release a backend after an error; re-raise it unless another backend may succeed."""
+        failover = _is_failover_error(error)
+        self._release(backend, None, error if failover else None)
+        if not failover:
+            raise error
+        logger.warning("Ollama backend %s failed (%s); failing over", backend.url, error)
+
+    def _succeeded(self, backend: Backend, payload: Dict[str, Any], started: float) -> None:
+        seconds = time.perf_counter() - started
+        self._release(backend, seconds)
+        self._observe_latency(payload, seconds)
+
+    def _call(self, payload: Dict[str, Any], call: Callable[[str, Dict[str, Any]], Any]) -> Any:
+        tried: List[Backend] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.backends):
+            backend = self._acquire(tried)
+            tried.append(backend)
+            started = time.perf_counter()
+            try:
+                result = call(backend.url, payload)
+            except Exception as e:
+                self._failed(backend, e)
+                last_error = e
+                continue
+            self._succeeded(backend, payload, started)
+            return result
+
+        if self._retry_with_fallback(payload):
+            logger.warning("All Ollama backends failed; retrying with %s", self.fallback_model)
+            return self._call({**payload, "model": self.fallback_model}, call)
+        raise last_error
+
+    def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST /api/generate on the least busy healthy backend, failing over on errors."""
+        return self._call(self._with_model(payload), lambda url, body: get_ollama_client(url).generate(body, timeout))
+
+    def stream_generate(
+        self,
+        payload: Dict[str, Any],
+        timeout: Optional[float] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming generate. Fails over only until the first chunk arrives; after that
+        the stream is bound to its backend.
+        """
+        payload = self._with_model(payload)
+        tried: List[Backend] = []
+        while True:
+            backend = self._acquire(tried)
+            tried.append(backend)
+            started = time.perf_counter()
+            chunks = get_ollama_client(backend.url).stream_generate(payload, timeout, cancelled)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                self._failed(backend, e)
+                if len(tried) == len(self.backends):
+                    raise
+                continue
+            try:
+                if first is not None:
+                    yield first
+                    yield from chunks
+            except GeneratorExit:
+                chunks.close()
+                self._release(backend, None)
+                raise
+            except Exception as e:
+                self._release(backend, None, e if _is_failover_error(e) else None)
+                raise
+            self._succeeded(backend, payload, started)
+            return
+
+    async def agenerate(
+        self,
+        payload: Dict[str, Any],
+        post: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """Async twin of generate(); `post(base_url, payload)` performs the HTTP call."""
+        payload = self._with_model(payload)
+        tried: List[Backend] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.backends):
+            backend = self._acquire(tried)
+            tried.append(backend)
+            started = time.perf_counter()
+            try:
+                result = await post(backend.url, payload)
+            except Exception as e:
+                self._failed(backend, e)
+                last_error = e
+                continue
+            self._succeeded(backend, payload, started)
+            return result
+
+        if self._retry_with_fallback(payload):
+            return await self.agenerate({**payload, "model": self.fallback_model}, post)
+        raise last_error
+
+    # -- health --
+
+    def check_health(self) -> List[Dict[str, Any]]:
+        """Probe every backend and update its health; returns one status per backend."""
+        statuses = []
+        for backend in self.backends:
+            status = get_ollama_client(backend.url).health()
+            with self._lock:
+                backend.healthy = status["ok"]
+                if not status["ok"]:
+                    backend.unhealthy_until = time.monotonic() + self.cooldown
+            statuses.append({**status, **backend.snapshot()})
+        return statuses
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backends": [backend.snapshot() for backend in self.backends],
+                "degraded": self.degraded,
+                "fallback_model": self.fallback_model,
+            }
+
+
+_routers: Dict[tuple, OllamaRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(urls: Optional[Sequence[str]] = None) -> OllamaRouter:
+    """Router over `urls` (default: settings.OLLAMA_BACKENDS, else OLLAMA_API_URL), one per process."""
+    urls = tuple(urls or getattr(settings, "OLLAMA_BACKENDS", None) or [getattr(settings, "OLLAMA_API_URL", "http://localhost:11434")])
+    router = _routers.get(urls)
+    if router is None:
+        with _routers_lock:
+            router = _routers.get(urls)
+            if router is None:
+                router = _routers[urls] = OllamaRouter(
+                    urls,
+                    fallback_model=getattr(settings, "OLLAMA_FALLBACK_MODEL", None),
+                    latency_slo=getattr(settings, "OLLAMA_LATENCY_SLO", None),
+                    cooldown=getattr(settings, "OLLAMA_BACKEND_COOLDOWN", 30.0),
+                )
+    return router
+
+
+def _reset_after_fork() -> None:
+    global _routers_lock
+    _routers.clear()
+    _routers_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
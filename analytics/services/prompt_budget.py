@@ -0,0 +1,189 @@
+from __future__ import annotations
+import contextvars
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Rough size of a gemma/llama token in English text. Counting both characters and words
+# keeps the estimate on the safe side for short words and long identifiers alike.
+CHARS_PER_TOKEN = 4
+TOKENS_PER_WORD = 4 / 3
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_SPACE_RE = re.compile(r"\s+")
+
+SUMMARY_PREFIX = "Summary of earlier entries:"
+
+# summarize(text, max_words) -> summary text, or None when the model call failed
+Summarizer = Callable[[str, int], Optional[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token count of `text` without running a tokenizer."""
+    if not text:
+        return 0
+    return math.ceil(max(len(text) / CHARS_PER_TOKEN, len(text.split()) * TOKENS_PER_WORD))
+
+
+def estimate_entries_tokens(entries: Sequence[str]) -> int:
+    # +1 for the newline each entry is joined with
+    return sum(estimate_tokens(entry) + 1 for entry in entries)
+
+
+def _sentence_key(sentence: str) -> str:
+    return _SPACE_RE.sub(" ", sentence).strip(" .!?;,").casefold()
+
+
+def compress_entries(entries: Sequence[str]) -> List[str]:
+    """
+    Drop sentences that repeat in a more recent entry ("Same as yesterday.", a plan copied
+    every day, duplicated entries) and mark the kept, most recent copy with the number of
+    days (entries) it was written on; a sentence repeated within one entry counts once.
+    Entries that end up empty are removed. Order is preserved.
+    """
+    seen: Dict[str, int] = {}  # sentence key -> entries containing it
+    kept: List[List[str]] = []
+    for entry in reversed(entries):
+        sentences = []
+        in_entry = set()
+        for sentence in _SENTENCE_RE.split(entry.strip()):
+            key = _sentence_key(sentence)
+            if not key or key in in_entry:
+                continue
+            in_entry.add(key)
+            if key in seen:
+                seen[key] += 1
+                continue
+            seen[key] = 1
+            sentences.append(sentence.strip())
+        kept.append(sentences)
+
+    compressed: List[str] = []
+    for sentences in reversed(kept):
+        if not sentences:
+            continue
+        parts = []
+        for sentence in sentences:
+            repeats = seen[_sentence_key(sentence)]
+            parts.append(f"{sentence} (x{repeats} days)" if repeats > 1 else sentence)
+        compressed.append(" ".join(parts))
+    return compressed
+
+
+def truncate_to_tokens(text: str, max_tokens: int, placeholder: str = " ... (truncated)") -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    max_words = max(int(max_tokens / TOKENS_PER_WORD) - 3, 0)
+    text = " ".join(words[:max_words])
+    return text[:max(max_tokens * CHARS_PER_TOKEN - len(placeholder), 0)] + placeholder
+
+
+def _chunk_by_tokens(texts: Sequence[str], chunk_tokens: int) -> List[List[str]]:
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for text in texts:
+        tokens = estimate_tokens(text) + 1
+        if current and size + tokens > chunk_tokens:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(truncate_to_tokens(text, chunk_tokens))
+        size += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def map_reduce_summarize(
+    texts: Sequence[str],
+    max_tokens: int,
+    summarize: Summarizer,
+    chunk_tokens: int = 1500,
+    workers: int = 4,
+    max_rounds: int = 3,
+) -> Optional[str]:
+    """
+    Summarize `texts` into at most ~max_tokens: chunks of `chunk_tokens` are summarized in
+    parallel (map), and the summaries are summarized again (reduce) until they fit.
+    Returns None when a summarization call fails, so the caller can fall back to dropping.
+    """
+    texts = list(texts)
+    for _ in range(max_rounds):
+        if estimate_entries_tokens(texts) <= max_tokens:
+            break
+        chunks = _chunk_by_tokens(texts, chunk_tokens)
+        # Each chunk gets its share of the budget, expressed in words for the model
+        max_words = max(int(max_tokens / len(chunks) / TOKENS_PER_WORD), 20)
+        with ThreadPoolExecutor(max_workers=max(min(workers, len(chunks)), 1), thread_name_prefix="prompt-summary") as pool:
+            # One copy of the caller's context per call (contextvars: request trace, ...)
+            futures = [
+                pool.submit(contextvars.copy_context().run, summarize, "\n".join(chunk), max_words)
+                for chunk in chunks
+            ]
+            summaries = [future.result() for future in futures]
+        if any(not summary for summary in summaries):
+            return None
+        texts = summaries
+    return truncate_to_tokens(" ".join(texts), max_tokens)
+
+
+def fit_entries(
+    entries: Sequence[str],
+    max_tokens: int,
+    summarize: Optional[Summarizer] = None,
+    summary_share: float = 0.3,
+    chunk_tokens: int = 1500,
+    workers: int = 4,
+) -> List[str]:
+    """
+    Entries (oldest first) that fit in `max_tokens` prompt tokens.
+
+    1. Repeated sentences are compressed (compress_entries).
+    2. If that is still too long, the most recent entries are kept verbatim, newest first,
+       until (1 - summary_share) of the budget is used.
+    3. The older entries are replaced by one map-reduce summary within the rest of the
+       budget; without `summarize` (or if it fails) they are dropped, newest kept first,
+       and a note says how many were omitted.
+    """
+    entries = compress_entries(entries)
+    if estimate_entries_tokens(entries) <= max_tokens:
+        return entries
+
+    recent_budget = int(max_tokens * (1 - summary_share))
+    recent: List[str] = []
+    used = 0
+    for entry in reversed(entries):
+        tokens = estimate_tokens(entry) + 1
+        if used + tokens > recent_budget:
+            if not recent:
+                # Even the newest entry alone is too long: keep a truncated copy of it
+                recent.append(truncate_to_tokens(entry, recent_budget - 1))
+            break
+        recent.append(entry)
+        used += tokens
+    recent.reverse()
+    older = entries[:len(entries) - len(recent)]
+    if not older:
+        return recent
+
+    remaining = max_tokens - estimate_entries_tokens(recent)
+    summary_budget = remaining - estimate_tokens(SUMMARY_PREFIX) - 1
+    if summarize is not None and summary_budget > 20:
+        summary = map_reduce_summarize(older, summary_budget, summarize, chunk_tokens=chunk_tokens, workers=workers)
+        if summary:
+            return [f"{SUMMARY_PREFIX} {summary}"] + recent
+
+    note = "({} earlier entries omitted)"
+    remaining -= estimate_tokens(note.format(len(older))) + 1
+    kept_older: List[str] = []
+    for entry in reversed(older):
+        tokens = estimate_tokens(entry) + 1
+        if tokens > remaining:
+            break
+        kept_older.append(entry)
+        remaining -= tokens
+    kept_older.reverse()
+    omitted = len(older) - len(kept_older)
+    return ([note.format(omitted)] if omitted else []) + kept_older + recent
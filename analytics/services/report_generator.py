@@ -130,17 +130,35 @@ from __future__ import annotations
 
 # analytics/services/report_generator.py
 
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
-
-from .text_processing import analyze_with_ollama, extract_insights_from_logbook
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .inference_scheduler import PRIORITY_BATCH, SchedulerQueueFull
+from .text_processing import (
+    analyze_with_ollama,
+    analyze_with_ollama_async,
+    extract_insights_from_logbook,
+    stream_analysis_with_ollama,
+)
+from .long_window import analyze_long_window, use_long_window
+from .report_store import aload_report, entries_fingerprint, load_report, persistence_enabled, save_report
 from .scoring_engine import compute_intern_score, calculate_intern_score
-from .utils import fetch_logbook_entries,get_week_range  # adjust if your db module name is different
+from .structured_logging import truncated
+from .tracing import stage
+from .utils import fetch_logbook_entries, fetch_logbook_entries_async, fetch_cohort_logbook_entries, get_week_range  # adjust if your db module name is different
+
+logger = logging.getLogger(__name__)
+payload_logger = logging.getLogger("analytics.payloads")
 
 
 def _build_log_texts_from_entries(entries: List[Dict[str, Any]]) -> List[str]:
     """
-    Turn MongoDB logbook documents into plain text chunks used for scoring & LLM analysis.
+    Turn MongoDB logbook documents (dicts or LogbookEntry tuples) into plain text chunks used for scoring & LLM analysis.
     We only use human-readable fields, not ids/dates.
     """
     log_texts: List[str] = []
@@ -149,19 +167,20 @@ def _build_log_texts_from_entries(entries: List[Dict[str, Any]]) -> List[str]:
         parts: List[str] = []
 
         # Today’s work
-        if e.get("todays_work"):
-            parts.append(str(e["todays_work"]))
+        todays_work = e.get("todays_work")
+        if todays_work:
+            parts.append(str(todays_work))
 
         # Challenges
-        if e.get("challenges"):
-            parts.append(str(e["challenges"]))
+        challenges = e.get("challenges")
+        if challenges:
+            parts.append(str(challenges))
 
         # Tomorrow’s plan (your Mongo field name is `tomorrow_plan`)
-        if e.get("tomorrow_plan"):
-            parts.append(str(e["tomorrow_plan"]))
-        elif e.get("tomorrow_work"):
-            # fallback in case old data uses a different key
-            parts.append(str(e["tomorrow_work"]))
+        # fallback to `tomorrow_work` in case old data uses a different key
+        tomorrow_plan = e.get("tomorrow_plan") or e.get("tomorrow_work")
+        if tomorrow_plan:
+            parts.append(str(tomorrow_plan))
 
         text = " ".join(parts).strip()
         if text:
@@ -170,76 +189,312 @@ def _build_log_texts_from_entries(entries: List[Dict[str, Any]]) -> List[str]:
     return log_texts
 
 
+def _no_data_report(intern_id: str, intern_name: str) -> Dict[str, Any]:
+    """No data → minimal, but still valid JSON in the report format."""
+    return {
+        "intern_id": intern_id,
+        "score": 0,
+        "trajectory": "no-data",
+        "milestones_achieved": [],
+        "summary": f"No logbook entries found for intern {intern_name} in the given period.",
+        "challenges": [],
+        "recommendations": [
+            "Ask the intern to regularly update their logbook with daily work, challenges, and plans."
+        ],
+    }
+
+
+def _insufficient_data_report(intern_id: str, intern_name: str) -> Dict[str, Any]:
+    """Entries exist but are empty/low quality."""
+    return {
+        "intern_id": intern_id,
+        "score": 0,
+        "trajectory": "insufficient-data",
+        "milestones_achieved": [],
+        "summary": f"Logbook entries for intern {intern_name} do not contain enough descriptive information.",
+        "challenges": [],
+        "recommendations": [
+            "Encourage the intern to write more detailed daily updates including what they did, issues faced, and next steps."
+        ],
+    }
+
+
+def _build_report(intern_id: str, base_score: int, ollama_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge the numeric score with Ollama's JSON, using safe defaults for missing fields.
+    A failed analysis keeps its error, so the report does not look like an empty week.
+    """
+    report = {
+        "intern_id": intern_id,
+        "score": base_score,
+        "trajectory": ollama_result.get("trajectory", "unknown"),
+        "milestones_achieved": ollama_result.get("milestones_achieved") or [],
+        "summary": ollama_result.get("summary", ""),
+        "challenges": ollama_result.get("challenges") or [],
+        "recommendations": ollama_result.get("recommendations") or [],
+    }
+    if "error" in ollama_result:
+        report["error"] = ollama_result["error"]
+    return report
+
+
+def _score_window(intern_id: str, start_date: str, end_date: str, log_texts: List[str]) -> int:
+    """
+    Score from summed daily aggregates when FEATURE_STORE_ENABLED (no re-tokenizing),
+    falling back to compute_intern_score over the texts when the store has no rows for the
+    window, was last synced before it ended, or does not hold one row per text.
+    """
+    if getattr(settings, "FEATURE_STORE_ENABLED", False):
+        from .feature_store import score_window  # feature_store imports this module
+
+        score = score_window(intern_id, start_date, end_date, expected_entries=len(log_texts))
+        if score is not None:
+            return score
+    return compute_intern_score(log_texts)
+
+
 def generate_weekly_report(
     intern_id: str,
     intern_name: str,
     days: int = 7,
-) -> Dict[str, Any]:
+    use_stored: bool = True,
+    with_source: bool = False,
+) -> Any:
     """
     Main entry point used by your Django view.
     1. Fetch logbook entries for the given intern and date window.
     2. Compute a numeric score using score_engine.
-    3. Call Ollama (gemma3:1b) via analyze_with_ollama to get structured insights.
+    3. Call Ollama (gemma3:1b) via analyze_with_ollama to get structured insights
+       (for windows of LONG_WINDOW_MIN_DAYS or more: per-week analyses plus a reduce step).
     4. Return JSON with: intern_id, score, trajectory, milestones_achieved, summary, challenges, recommendations.
+    `use_stored=False` skips the stored report and generates a fresh one. With `with_source`
+    the result is `(report, source)`, source being "precomputed" for a stored report else "generated".
     """
+    report, source = _generate_weekly_report(intern_id, intern_name, days, use_stored)
+    return (report, source) if with_source else report
+
+
+def _generate_weekly_report(intern_id: str, intern_name: str, days: int, use_stored: bool) -> Tuple[Dict[str, Any], str]:
 
     # 1) Get the date window and fetch entries
-    start_date, end_date = get_week_range(days=days)
-    print("start_date,end_date",start_date,end_date)
-    entries = fetch_logbook_entries(intern_id, start_date, end_date)
-    print("Entries",entries)
+    with stage("date_range"):
+        start_date, end_date = get_week_range(days=days)
+    logger.debug("Weekly report for %s: %s to %s", intern_id, start_date, end_date)
+    with stage("fetch"):
+        entries = fetch_logbook_entries(intern_id, start_date, end_date)
+    payload_logger.debug("Entries for %s: %s", intern_id, truncated(entries))
 
     if not entries:
-        # No data → minimal, but still valid JSON in your new format
-        return {
-            "intern_id": intern_id,
-            "score": 0,
-            "trajectory": "no-data",
-            "milestones_achieved": [],
-            "summary": f"No logbook entries found for intern {intern_name} in the given period.",
-            "challenges": [],
-            "recommendations": [
-                "Ask the intern to regularly update their logbook with daily work, challenges, and plans."
-            ],
-        }
+        return _no_data_report(intern_id, intern_name), "generated"
 
     # 2) Convert entries into raw text snippets
-    log_texts = _build_log_texts_from_entries(entries)
+    with stage("text_build"):
+        log_texts = _build_log_texts_from_entries(entries)
 
     if not log_texts:
-        # Entries exist but are empty/low quality
-        return {
-            "intern_id": intern_id,
-            "score": 0,
-            "trajectory": "insufficient-data",
-            "milestones_achieved": [],
-            "summary": f"Logbook entries for intern {intern_name} do not contain enough descriptive information.",
-            "challenges": [],
-            "recommendations": [
-                "Encourage the intern to write more detailed daily updates including what they did, issues faced, and next steps."
-            ],
-        }
+        return _insufficient_data_report(intern_id, intern_name), "generated"
+
+    # 3) Serve the stored report while the window's entries are unchanged
+    fingerprint = entries_fingerprint(entries)
+    if use_stored and persistence_enabled():
+        stored = load_report(intern_id, start_date, end_date, fingerprint)
+        if stored is not None:
+            return stored, "precomputed"
+
+    # 4) Compute numeric score, from the precomputed feature store when it is enabled
+    base_score = _score_window(intern_id, start_date, end_date, log_texts)
+
+    # 5) Ask Ollama (gemma3:1b) for structured analysis, week by week for long windows
+    if use_long_window(days):
+        ollama_result = analyze_long_window(intern_name, entries)
+    else:
+        ollama_result = analyze_with_ollama(intern_name, log_texts)
+
+    # 6) Final JSON response in the format you requested, stored for the next request
+    report = _build_report(intern_id, base_score, ollama_result)
+    if persistence_enabled() and not ({"error", "fallback_model"} & ollama_result.keys()):
+        save_report(intern_id, intern_name, start_date, end_date, days, report, fingerprint)
+    return report, "generated"
+
+
+def _entry_stats(entries: List[Dict[str, Any]], log_texts: List[str]) -> Dict[str, Any]:
+    """Cheap facts about the window that can be shown before the LLM narrative arrives."""
+    first_date, last_date = entries[0].get("date"), entries[-1].get("date")
+    return {
+        "count": len(entries),
+        "with_text": len(log_texts),
+        "first_date": str(first_date) if first_date is not None else None,
+        "last_date": str(last_date) if last_date is not None else None,
+    }
+
+
+def stream_weekly_report(
+    intern_id: str,
+    intern_name: str,
+    days: int = 7,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of generate_weekly_report. Returns an iterator of events:
+      {"event": "score", ...}   numeric score and entry stats, available in milliseconds
+      {"event": "token"/"field", ...}  relayed from the Ollama stream as it generates
+      {"event": "report", "report": {...}}  the same JSON generate_weekly_report returns
+    Fetching, scoring and queueing the generation happen before this returns, so a
+    full inference queue raises SchedulerQueueFull while the view can still answer 429.
+    """
+    with stage("date_range"):
+        start_date, end_date = get_week_range(days=days)
+    with stage("fetch"):
+        entries = fetch_logbook_entries(intern_id, start_date, end_date)
 
-    # 3) Compute numeric score from logs using score_engine.compute_intern_score
-    base_score = compute_intern_score(log_texts)
+    if not entries:
+        return iter([{"event": "report", "report": _no_data_report(intern_id, intern_name)}])
 
-    # 4) Ask Ollama (gemma3:1b) for structured analysis
-    ollama_result = analyze_with_ollama(intern_name, log_texts)
+    with stage("text_build"):
+        log_texts = _build_log_texts_from_entries(entries)
 
-    # 4b) Normal path: use Ollama’s JSON, with safe defaults
-    trajectory = ollama_result.get("trajectory", "unknown")
-    milestones = ollama_result.get("milestones_achieved") or []
-    summary = ollama_result.get("summary", "")
-    challenges = ollama_result.get("challenges") or []
-    recommendations = ollama_result.get("recommendations") or []
+    if not log_texts:
+        return iter([{"event": "report", "report": _insufficient_data_report(intern_id, intern_name)}])
 
-    # 5) Final JSON response in the format you requested
-    return {
-        "intern_id": intern_id,
-        "score": base_score,
-        "trajectory": trajectory,
-        "milestones_achieved": milestones,
-        "summary": summary,
-        "challenges": challenges,
-        "recommendations": recommendations,
-    }
+    base_score = _score_window(intern_id, start_date, end_date, log_texts)
+    if use_long_window(days):
+        llm_events = _long_window_events(intern_name, entries)
+    else:
+        llm_events = stream_analysis_with_ollama(intern_name, log_texts)
+    return _report_events(intern_id, base_score, _entry_stats(entries, log_texts), llm_events)
+
+
+def _long_window_events(intern_name: str, entries: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """The map-reduce analysis has no token stream; it arrives as one analysis event."""
+    try:
+        analysis = analyze_long_window(intern_name, entries)
+    except SchedulerQueueFull as e:
+        analysis = {"error": str(e)}
+    yield {"event": "analysis", "analysis": analysis}
+
+
+def _report_events(
+    intern_id: str,
+    base_score: int,
+    stats: Dict[str, Any],
+    llm_events: Iterator[Dict[str, Any]],
+) -> Iterator[Dict[str, Any]]:
+    yield {"event": "score", "intern_id": intern_id, "score": base_score, "entries": stats}
+    try:
+        for event in llm_events:
+            if event["event"] == "analysis":
+                yield {"event": "report", "report": _build_report(intern_id, base_score, event["analysis"])}
+            else:
+                yield event
+    finally:
+        # Propagate a client disconnect so the Ollama generation is abandoned too
+        llm_events.close()
+
+
+async def agenerate_weekly_report(
+    intern_id: str,
+    intern_name: str,
+    days: int = 7,
+    use_stored: bool = True,
+    with_source: bool = False,
+) -> Any:
+    """
+    Async version of generate_weekly_report for the ASGI view. Same steps, arguments, output and
+    stored reports; the Mongo fetch and the Ollama call are awaited instead of blocking a worker thread.
+    """
+    report, source = await _agenerate_weekly_report(intern_id, intern_name, days, use_stored)
+    return (report, source) if with_source else report
+
+
+async def _agenerate_weekly_report(
+    intern_id: str, intern_name: str, days: int, use_stored: bool
+) -> Tuple[Dict[str, Any], str]:
+    with stage("date_range"):
+        start_date, end_date = get_week_range(days=days)
+    with stage("fetch"):
+        entries = await fetch_logbook_entries_async(intern_id, start_date, end_date)
+
+    if not entries:
+        return _no_data_report(intern_id, intern_name), "generated"
+
+    with stage("text_build"):
+        log_texts = _build_log_texts_from_entries(entries)
+
+    if not log_texts:
+        return _insufficient_data_report(intern_id, intern_name), "generated"
+
+    fingerprint = entries_fingerprint(entries)
+    if use_stored and persistence_enabled():
+        stored = await aload_report(intern_id, start_date, end_date, fingerprint)
+        if stored is not None:
+            return stored, "precomputed"
+
+    if getattr(settings, "FEATURE_STORE_ENABLED", False):
+        # The feature store is read through the (sync) ORM
+        base_score = await sync_to_async(_score_window)(intern_id, start_date, end_date, log_texts)
+    else:
+        # Scoring is pure CPU work in the millisecond range, fine to run on the loop
+        base_score = compute_intern_score(log_texts)
+
+    if use_long_window(days):
+        # Runs the weekly analyses on threads (through the sync scheduler), off the event loop
+        ollama_result = await sync_to_async(analyze_long_window, thread_sensitive=False)(intern_name, entries)
+    else:
+        ollama_result = await analyze_with_ollama_async(intern_name, log_texts)
+
+    report = _build_report(intern_id, base_score, ollama_result)
+    if persistence_enabled() and not ({"error", "fallback_model"} & ollama_result.keys()):
+        await sync_to_async(save_report)(intern_id, intern_name, start_date, end_date, days, report, fingerprint)
+    return report, "generated"
+
+
+def generate_cohort_reports(
+    intern_ids: List[str],
+    intern_names: Optional[Dict[str, str]] = None,
+    days: int = 7,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Weekly reports for many interns at once, yielded as each one completes.
+    1. Fetch every intern's window with a single aggregation.
+    2. Score all interns up front (cheap, no I/O) and yield the no-data reports immediately.
+    3. Run the Ollama analyses concurrently and yield each report as soon as it is ready.
+    """
+    intern_names = intern_names or {}
+    start_date, end_date = get_week_range(days=days)
+    entries_by_intern = fetch_cohort_logbook_entries(intern_ids, start_date, end_date)
+
+    pending: List[tuple[str, str, int, List[str]]] = []
+    for intern_id in intern_ids:
+        intern_name = intern_names.get(intern_id, f"Intern {intern_id}")
+        entries = entries_by_intern.get(intern_id) or []
+        if not entries:
+            yield _no_data_report(intern_id, intern_name)
+            continue
+
+        log_texts = _build_log_texts_from_entries(entries)
+        if not log_texts:
+            yield _insufficient_data_report(intern_id, intern_name)
+            continue
+
+        pending.append((intern_id, intern_name, _score_window(intern_id, start_date, end_date, log_texts), log_texts))
+
+    if not pending:
+        return
+
+    workers = getattr(settings, "COHORT_REPORT_WORKERS", 4)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cohort-report")
+    try:
+        futures = {
+            executor.submit(analyze_with_ollama, intern_name, log_texts, PRIORITY_BATCH): (intern_id, base_score)
+            for intern_id, intern_name, base_score, log_texts in pending
+        }
+        for future in as_completed(futures):
+            intern_id, base_score = futures[future]
+            try:
+                report = _build_report(intern_id, base_score, future.result())
+            except SchedulerQueueFull as e:
+                # Keep streaming the rest of the cohort; this intern's narrative can be retried.
+                report = _build_report(intern_id, base_score, {"error": str(e)})
+            yield report
+    finally:
+        # The client may disconnect mid-stream; don't keep generating reports nobody reads.
+        executor.shutdown(wait=False, cancel_futures=True)
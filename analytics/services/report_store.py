@@ -0,0 +1,81 @@
+from __future__ import annotations
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from .text_processing import OLLAMA_MODEL, PROMPT_VERSION
+
+# LogbookEntry fields (or dict keys) that feed the score and the prompt
+_FINGERPRINT_FIELDS = ("date", "status", "tech_stack", "todays_work", "challenges", "tomorrow_plan")
+
+
+def entries_fingerprint(entries: List[Any]) -> str:
+    """sha256 over the window's entries: any added, removed or edited entry changes it."""
+    digest = hashlib.sha256()
+    for entry in entries:
+        values = [str(entry.get(field) or "") for field in _FINGERPRINT_FIELDS]
+        digest.update(json.dumps(values, ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def persistence_enabled() -> bool:
+    return getattr(settings, "PERSIST_WEEKLY_REPORTS", True)
+
+
+def _stored(intern_id: str, start_date: str, end_date: str, fingerprint: str):
+    from ..models import WeeklyReport
+
+    # One row per (intern, window) through the unique index; the rest is compared on that row
+    return WeeklyReport.objects.filter(
+        intern_id=intern_id,
+        period_start=start_date,
+        period_end=end_date,
+        entries_fingerprint=fingerprint,
+        model=OLLAMA_MODEL,
+        prompt_version=PROMPT_VERSION,
+        analyzed=True,
+    ).values_list("report", flat=True)
+
+
+def load_report(intern_id: str, start_date: str, end_date: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """The stored report for this window if it was generated from the same entries, model and prompt."""
+    return _stored(intern_id, start_date, end_date, fingerprint).first()
+
+
+async def aload_report(intern_id: str, start_date: str, end_date: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    return await _stored(intern_id, start_date, end_date, fingerprint).afirst()
+
+
+def save_report(
+    intern_id: str,
+    intern_name: str,
+    start_date: str,
+    end_date: str,
+    days: int,
+    report: Dict[str, Any],
+    fingerprint: str = "",
+    analyzed: bool = True,
+) -> None:
+    """Insert or replace the report of (intern, window) with its version and fingerprint."""
+    from ..models import WeeklyReport
+
+    WeeklyReport.objects.update_or_create(
+        intern_id=intern_id,
+        period_start=start_date,
+        period_end=end_date,
+        defaults={
+            "intern_name": intern_name,
+            "days": days,
+            "score": report.get("score", 0),
+            "trajectory": str(report.get("trajectory") or "")[:32],
+            "milestones": report.get("milestones_achieved") or [],
+            "report": report,
+            "analyzed": analyzed,
+            "model": OLLAMA_MODEL,
+            "prompt_version": PROMPT_VERSION,
+            "entries_fingerprint": fingerprint,
+        },
+    )
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List
 # from collections import Counter
 
 
@@ -162,19 +162,50 @@ from typing import List, Dict, Any
 
 ################################################################################
 
-from textblob import TextBlob
+import math
 import statistics
 
+from .sentiment import get_sentiment_backend, scale_polarity, sentiment_components_sum
+from .tokenization import EntryTokenizer, TokenizedEntry
+from .tracing import stage
+
+EFFORT_KEYWORDS = ["completed", "developed", "tested", "debugged", "implemented", "fixed", "optimized"]
+
+_tokenizer = EntryTokenizer(EFFORT_KEYWORDS)
+
+
+def tokenize_entries(log_entries: List[str | TokenizedEntry]) -> List[TokenizedEntry]:
+    """Tokenize entries once (with EFFORT_KEYWORDS hits); already tokenized ones pass through."""
+    return [
+        entry if isinstance(entry, TokenizedEntry) else _tokenizer.tokenize(entry)
+        for entry in log_entries
+    ]
+
+
 def sentiment_score(text: str) -> float:
-    """Simple polarity-based sentiment scoring."""
-    blob = TextBlob(text)
-    polarity = (blob.sentiment.polarity + 1) / 2
-    return round(polarity * 100, 2)
+    """Simple polarity-based sentiment scoring (backend chosen by settings.SENTIMENT_BACKEND)."""
+    return get_sentiment_backend().score(text)
+
+
+def sentiment_components(text: str) -> tuple[float, int]:
+    """
+    (sum of polarities, number of assessments) for one text. Polarity is their
+    mean, so components of separate entries can be added up and divided later.
+    """
+    return get_sentiment_backend().polarity_components(text)
 
 
-def consistency_score(log_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+def batch_sentiment_score(log_entries: List[str | TokenizedEntry]) -> float:
+    """Sentiment of several entries together, scored in one batch by the backend."""
+    polarity_sum, count = sentiment_components_sum(
+        get_sentiment_backend().polarity_components_tokenized(tokenize_entries(log_entries))
+    )
+    return scale_polarity(polarity_sum / count if count else 0.0)
+
+
+def consistency_score(log_entries: List[str | TokenizedEntry]) -> float:
     """Check how consistent the intern is based on log entry lengths."""
-    lengths = [len(entry.split()) for entry in log_entries if entry.strip()]
+    lengths = [entry.word_count for entry in tokenize_entries(log_entries) if entry.word_count]
     if not lengths:
         return 0.0
     avg_len = statistics.mean(lengths)
@@ -183,28 +214,60 @@ def consistency_score(log_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
     return round(score, 2)
 
 
-def effort_score(log_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Keyword-based effort detection."""
-    keywords = ["completed", "developed", "tested", "debugged", "implemented", "fixed", "optimized"]
-    hits = sum(entry.lower().count(kw) for entry in log_entries for kw in keywords)
-    total_words = sum(len(entry.split()) for entry in log_entries)
+def effort_score(log_entries: List[str | TokenizedEntry]) -> float:
+    """Keyword-based effort detection (whole-word keyword matches per word)."""
+    entries = tokenize_entries(log_entries)
+    hits = sum(entry.keyword_total for entry in entries)
+    total_words = sum(entry.word_count for entry in entries)
     if total_words == 0:
         return 0.0
     return round((hits / total_words) * 100, 2)
 
 
-def compute_intern_score(log_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+def compute_intern_score(log_entries: List[str]) -> int:
     """Weighted scoring system combining all metrics."""
-    combined_text = " ".join(log_entries)
-    sentiment = sentiment_score(combined_text)
-    consistency = consistency_score(log_entries)
-    effort = effort_score(log_entries)
+    with stage("score_tokenize"):
+        entries = tokenize_entries(log_entries)
+    with stage("score_sentiment"):
+        sentiment = batch_sentiment_score(entries)
+    with stage("score_consistency"):
+        consistency = consistency_score(entries)
+    with stage("score_effort"):
+        effort = effort_score(entries)
+
+    return _weighted_score(sentiment, consistency, effort)
 
-    print()
 
+def _weighted_score(sentiment: float, consistency: float, effort: float) -> int:
     final = (sentiment * 0.3) + (consistency * 0.3) + (effort * 0.4)
     return int(round(final, 0))
 
+
+def score_from_aggregates(
+    entry_count: int,
+    word_count_sum: int,
+    word_count_sq_sum: int,
+    keyword_hits: int,
+    polarity_sum: float,
+    polarity_count: int,
+) -> int:
+    """
+    Same score as compute_intern_score, computed from summed per-entry features
+    (see analytics.services.feature_store) instead of the raw texts.
+    """
+    sentiment = scale_polarity(polarity_sum / polarity_count if polarity_count else 0.0)
+
+    if entry_count:
+        avg_len = word_count_sum / entry_count
+        variance = max(0.0, word_count_sq_sum / entry_count - avg_len ** 2)
+        consistency = round(max(0.0, 1.0 - (math.sqrt(variance) / (avg_len + 1e-5))) * 100, 2)
+    else:
+        consistency = 0.0
+
+    effort = round((keyword_hits / word_count_sum) * 100, 2) if word_count_sum else 0.0
+
+    return _weighted_score(sentiment, consistency, effort)
+
 def calculate_intern_score(insights: dict) -> int:
     """
     Simple scoring engine based on extracted insights.
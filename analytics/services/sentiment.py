@@ -0,0 +1,228 @@
+from __future__ import annotations
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from xml.etree import ElementTree
+
+from django.conf import settings
+
+from .tokenization import TokenizedEntry, tokenize
+
+NEGATIONS = frozenset({"no", "not", "n't", "never"})
+
+# Pattern's English sentiment lexicon (PDDL), the same file TextBlob ships as en/en-sentiment.xml
+DEFAULT_LEXICON_PATH = Path(__file__).resolve().parent.parent / "data" / "en-sentiment.xml"
+
+
+def scale_polarity(polarity: float) -> float:
+    """Map a -1..1 polarity onto the 0-100 scale used by the scoring engine."""
+    return round((polarity + 1) / 2 * 100, 2)
+
+
+class SentimentBackend:
+    """
+    Interface for sentiment scorers. Backends return polarity *components*
+    (sum of assessment polarities, number of assessments) so that entries can be
+    scored separately and combined afterwards by adding them up.
+    """
+
+    name = "base"
+
+    def polarity_components(self, text: str) -> Tuple[float, int]:
+        raise NotImplementedError
+
+    def polarity_components_batch(self, texts: Sequence[str]) -> List[Tuple[float, int]]:
+        return [self.polarity_components(text) for text in texts]
+
+    def polarity_components_tokenized(self, entries: Sequence[TokenizedEntry]) -> List[Tuple[float, int]]:
+        """Components of already tokenized entries; backends with their own tokenizer use the text."""
+        return self.polarity_components_batch([entry.text for entry in entries])
+
+    def score(self, text: str) -> float:
+        """0-100 sentiment score of one text."""
+        polarity_sum, count = self.polarity_components(text)
+        return scale_polarity(polarity_sum / count if count else 0.0)
+
+    def score_batch(self, texts: Sequence[str]) -> List[float]:
+        return [
+            scale_polarity(polarity_sum / count if count else 0.0)
+            for polarity_sum, count in self.polarity_components_batch(texts)
+        ]
+
+
+class TextBlobSentiment(SentimentBackend):
+    """The original scorer: TextBlob's pattern analyzer, one TextBlob per text."""
+
+    name = "textblob"
+
+    def __init__(self):
+        from textblob import TextBlob  # optional dependency, imported on first use
+
+        self._text_blob = TextBlob
+
+    def polarity_components(self, text: str) -> Tuple[float, int]:
+        assessments = self._text_blob(text).sentiment_assessments.assessments
+        return sum(assessment[1] for assessment in assessments), len(assessments)
+
+
+class LexiconSentiment(SentimentBackend):
+    """
+    Lexicon scorer reproducing the rules of TextBlob's pattern analyzer (known words,
+    "very good" modifiers, "not good" negations, "!" boosts) without building
+    TextBlob/sentence objects. Emoticons and "(!)" irony markers are not scored. The lexicon is compiled once into a word -> id map and
+    flat arrays; a batch of entries is scored in one pass with per-entry accumulators.
+    The per-token state machine itself is plain Python, not vectorized.
+    """
+
+    name = "lexicon"
+
+    def __init__(self, lexicon: Dict[str, Tuple[float, float, bool]]):
+        self._ids: Dict[str, int] = {}
+        self._polarity = array("d")
+        self._intensity = array("d")
+        self._modifier = array("b")
+        for word, (polarity, intensity, is_modifier) in lexicon.items():
+            self._ids[word] = len(self._polarity)
+            self._polarity.append(polarity)
+            self._intensity.append(intensity)
+            self._modifier.append(1 if is_modifier else 0)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def polarity_components(self, text: str) -> Tuple[float, int]:
+        return self.polarity_components_batch([text])[0]
+
+    def polarity_components_batch(self, texts: Sequence[str]) -> List[Tuple[float, int]]:
+        return self._score_token_lists([tokenize(text) for text in texts])
+
+    def polarity_components_tokenized(self, entries: Sequence[TokenizedEntry]) -> List[Tuple[float, int]]:
+        return self._score_token_lists([entry.tokens for entry in entries])
+
+    def _score_token_lists(self, token_lists: Sequence[Sequence[str]]) -> List[Tuple[float, int]]:
+        sums = array("d", bytes(8 * len(token_lists)))
+        counts = array("l", bytes(array("l").itemsize * len(token_lists)))
+        ids, polarities, intensities, modifiers = self._ids, self._polarity, self._intensity, self._modifier
+
+        for index, tokens in enumerate(token_lists):
+            # Each assessment is [polarity, intensity, negated]; mirrors pattern's state machine
+            assessments: List[list] = []
+            modifier = negation = None
+            for token in tokens:
+                word_id = ids.get(token)
+                if word_id is not None:
+                    polarity = polarities[word_id]
+                    if modifier is None:
+                        assessments.append([polarity, intensities[word_id], False])
+                    else:
+                        last = assessments[-1]
+                        last[0] = max(-1.0, min(polarity * last[1], 1.0))
+                        last[1] = intensities[word_id]
+                    if negation is not None:
+                        last = assessments[-1]
+                        last[1] = 1.0 / last[1]
+                        last[2] = True
+                    modifier = token if modifiers[word_id] else None
+                    negation = token if token in NEGATIONS else None
+                else:
+                    if token in NEGATIONS:
+                        negation = token
+                    elif negation and len(token.strip("'")) > 1:
+                        negation = None
+                    if negation is not None and modifier is not None and modifier.endswith("ly"):
+                        assessments[-1][2] = True
+                        negation = None
+                    elif modifier and len(token) > 2:
+                        modifier = None
+                    if token == "!" and assessments:
+                        assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+
+            total = 0.0
+            for polarity, _, negated in assessments:
+                total += polarity * -0.5 if negated else polarity
+            sums[index] = total
+            counts[index] = len(assessments)
+
+        return list(zip(sums, counts))
+
+
+def load_pattern_lexicon(path: str, derive_adverbs: bool = True) -> Dict[str, Tuple[float, float, bool]]:
+    """
+    Read a pattern-style sentiment XML (TextBlob's en-sentiment.xml) into
+    {word: (polarity, intensity, is_modifier)}, averaging senses per part of speech
+    and then across parts of speech, as pattern does for untagged text.
+    With `derive_adverbs`, adjectives also yield "-ly" adverbs ("terrible" -> "terribly"),
+    which TextBlob's English analyzer adds after loading the same file.
+    """
+    senses: Dict[str, Dict[Optional[str], List[Tuple[float, float]]]] = {}
+    for node in ElementTree.parse(path).getroot().findall("word"):
+        form = node.attrib.get("form")
+        if not form:
+            continue
+        senses.setdefault(form, {}).setdefault(node.attrib.get("pos"), []).append(
+            (float(node.attrib.get("polarity", 0.0)), float(node.attrib.get("intensity", 1.0)))
+        )
+
+    lexicon: Dict[str, Tuple[float, float, bool]] = {}
+    adjectives: List[Tuple[str, float, float]] = []
+    for form, by_pos in senses.items():
+        per_pos = {
+            pos: (sum(p for p, _ in values) / len(values), sum(i for _, i in values) / len(values))
+            for pos, values in by_pos.items()
+        }
+        polarity = sum(p for p, _ in per_pos.values()) / len(per_pos)
+        intensity = sum(i for _, i in per_pos.values()) / len(per_pos)
+        lexicon[form] = (polarity, intensity, "RB" in per_pos)
+        if "JJ" in per_pos:
+            adjectives.append((form, *per_pos["JJ"]))
+
+    if derive_adverbs:
+        for form, polarity, intensity in adjectives:
+            if form.endswith("y"):
+                form = form[:-1] + "i"
+            if form.endswith("le"):
+                form = form[:-2]
+            lexicon[form + "ly"] = (polarity, intensity, True)
+    return lexicon
+
+
+def build_lexicon_backend() -> LexiconSentiment:
+    """Lexicon backend over SENTIMENT_LEXICON_PATH, default: the bundled pattern lexicon."""
+    path = getattr(settings, "SENTIMENT_LEXICON_PATH", None) or DEFAULT_LEXICON_PATH
+    if not Path(path).is_file():
+        raise RuntimeError(f"Sentiment lexicon not found at {path}; check SENTIMENT_LEXICON_PATH.")
+    return LexiconSentiment(load_pattern_lexicon(str(path)))
+
+
+SENTIMENT_BACKENDS = {
+    "lexicon": build_lexicon_backend,
+    "textblob": TextBlobSentiment,
+}
+
+_backend: Optional[SentimentBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_sentiment_backend() -> SentimentBackend:
+    """Backend selected by settings.SENTIMENT_BACKEND, built (and its lexicon compiled) once."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, "SENTIMENT_BACKEND", "lexicon")
+                if name not in SENTIMENT_BACKENDS:
+                    raise RuntimeError(
+                        f"Unknown SENTIMENT_BACKEND {name!r}; expected one of {sorted(SENTIMENT_BACKENDS)}."
+                    )
+                _backend = SENTIMENT_BACKENDS[name]()
+    return _backend
+
+
+def sentiment_components_sum(components: Iterable[Tuple[float, int]]) -> Tuple[float, int]:
+    """Add up per-entry polarity components."""
+    total, count = 0.0, 0
+    for polarity_sum, polarity_count in components:
+        total += polarity_sum
+        count += polarity_count
+    return total, count
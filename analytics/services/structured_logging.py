@@ -0,0 +1,139 @@
+"""
+Logging helpers for the request path (wired up by settings.LOGGING).
+
+- queued_stream_handler(): request threads only put records on a bounded in-memory
+  queue; a listener thread does the formatting of the final line and the stream I/O.
+  When the queue is full records are dropped (and counted) instead of blocking.
+- SamplingFilter: keeps a fraction of the records of a logger, for payload dumps.
+- truncated(): lazy, size-capped rendering of large payloads in log arguments.
+- JSONFormatter: one JSON object per line, including the record's `extra` fields.
+
+Only the standard library is imported here: settings.LOGGING loads this module
+before the apps are ready.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, List, Optional, Tuple
+
+DEFAULT_MAX_CHARS = 2000
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class _Truncated:
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: Optional[int] = None):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        max_chars = self.max_chars
+        if max_chars is None:
+            from django.conf import settings
+
+            max_chars = getattr(settings, "LOG_PAYLOAD_MAX_CHARS", DEFAULT_MAX_CHARS)
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        if len(text) <= max_chars:
+            return text
+        return f"{text[:max_chars]}... ({len(text) - max_chars} more chars)"
+
+    __repr__ = __str__
+
+
+def truncated(value: Any, max_chars: Optional[int] = None) -> _Truncated:
+    """
+    Log argument that renders `value` cut to `max_chars` characters (default:
+    settings.LOG_PAYLOAD_MAX_CHARS), and only if the record is actually emitted:
+    logger.debug("Entries %s", truncated(entries)).
+    """
+    return _Truncated(value, max_chars)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass about `rate` of the records (0.0 = none, 1.0 = all)."""
+
+    def __init__(self, rate: float = 1.0, name: str = ""):
+        super().__init__(name)
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler over a bounded queue that drops records rather than wait for space."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listeners: List[Tuple[NonBlockingQueueHandler, QueueListener]] = []
+
+
+def queued_stream_handler(
+    stream: Any = None,
+    json_format: bool = False,
+    queue_size: int = 10000,
+    fmt: str = "%(asctime)s %(levelname)s %(name)s: %(message)s",
+) -> NonBlockingQueueHandler:
+    """
+    Handler for settings.LOGGING ("()": "analytics.services.structured_logging.queued_stream_handler"):
+    records go through a bounded queue to a StreamHandler running on a listener thread.
+    """
+    target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(JSONFormatter() if json_format else logging.Formatter(fmt))
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    listener = QueueListener(handler.queue, target, respect_handler_level=True)
+    listener.start()
+    _listeners.append((handler, listener))
+    return handler
+
+
+def _stop_listeners() -> None:
+    """Flush what is queued on exit."""
+    for _, listener in _listeners:
+        if listener._thread is not None:
+            listener.stop()
+
+
+def _restart_after_fork() -> None:
+    # Neither the listener threads nor the queues' locks survive a fork; the child gets fresh ones
+    for handler, listener in _listeners:
+        handler.queue = listener.queue = queue.Queue(maxsize=handler.queue.maxsize)
+        listener._thread = None
+        listener.start()
+
+
+atexit.register(_stop_listeners)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
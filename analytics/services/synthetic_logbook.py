@@ -0,0 +1,129 @@
+"""
+Synthetic `dailyrecords` data for benchmarks and load experiments.
+
+Documents are generated in the production Mongo shape (internId, date, status, stack,
+task, progress, blockers) and can be written as a mongodump-style snapshot directory
+(the field names of the backup in analytics/backup) for LOGBOOK_DATA_SOURCE=snapshot.
+Everything is driven by a seed, so a given configuration always yields the same data.
+"""
+from __future__ import annotations
+import os
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import bson
+from bson import ObjectId
+
+from .bson_snapshot import LOGBOOK_FILE, USERS_FILE
+
+VERBS = ["Completed", "Developed", "Tested", "Debugged", "Implemented", "Fixed", "Optimized", "Reviewed", "Refactored", "Documented"]
+
+# Default vocabulary: the nouns, adjectives and phrases intern logbooks are made of
+VOCABULARY = [
+    "login", "API", "endpoint", "dashboard", "report", "page", "form", "validation", "database", "query",
+    "index", "migration", "model", "schema", "cache", "session", "token", "auth", "service", "deployment",
+    "pipeline", "build", "docker", "container", "config", "environment", "server", "client", "request", "response",
+    "test", "unit", "integration", "coverage", "bug", "issue", "error", "exception", "log", "metric",
+    "component", "layout", "style", "button", "modal", "table", "chart", "filter", "search", "pagination",
+    "mentor", "meeting", "review", "feedback", "design", "documentation", "sprint", "ticket", "branch", "merge",
+    "good", "slow", "fast", "difficult", "easy", "confusing", "useful", "stable", "broken", "new",
+    "progress", "problem", "solution", "deadline", "task", "feature", "module", "library", "framework", "upgrade",
+]
+
+STATUSES = ["Working", "Working", "Working", "WFH", "Leave"]
+STACKS = ["Backend", "Frontend", "DevOps", "QA", "Mobile", "Data"]
+
+
+def generate_interns(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """`users` documents for `count` interns, numbered from 1 like the snapshot."""
+    rnd = random.Random(seed)
+    return [
+        {
+            "_id": ObjectId(f"{rnd.getrandbits(96):024x}"),
+            "id": number,
+            "name": f"Intern {number:04d}",
+            "email": f"intern{number:04d}@example.com",
+            "role": 0,
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def _sentence(rnd: random.Random, words: int, vocabulary: Sequence[str]) -> str:
+    return " ".join([rnd.choice(VERBS)] + [rnd.choice(vocabulary) for _ in range(max(words - 1, 0))]) + "."
+
+
+def _text(rnd: random.Random, words: int, vocabulary: Sequence[str]) -> str:
+    sentences, remaining = [], words
+    while remaining > 0:
+        length = min(remaining, rnd.randint(6, 14))
+        sentences.append(_sentence(rnd, length, vocabulary))
+        remaining -= length
+    return " ".join(sentences)
+
+
+def generate_dailyrecords(
+    interns: Sequence[Dict[str, Any]],
+    days: int,
+    end_date: Optional[str] = None,
+    entry_words: int = 30,
+    vocabulary: Optional[Sequence[str]] = None,
+    skip_rate: float = 0.15,
+    seed: int = 42,
+) -> Iterator[Dict[str, Any]]:
+    """
+    One `dailyrecords` document per intern and day over the `days` ending at `end_date`
+    (default: today), oldest first. `entry_words` is the average length of the work
+    description (challenges and plans are about half as long); `skip_rate` is the share
+    of days without an entry.
+    """
+    rnd = random.Random(seed)
+    vocabulary = list(vocabulary or VOCABULARY)
+    last = date.fromisoformat(end_date) if end_date else date.today()
+    for offset in range(days - 1, -1, -1):
+        day = (last - timedelta(days=offset)).isoformat()
+        for intern in interns:
+            if rnd.random() < skip_rate:
+                continue
+            words = max(int(rnd.gauss(entry_words, entry_words / 4)), 3)
+            yield {
+                "_id": ObjectId(f"{rnd.getrandbits(96):024x}"),
+                "internId": intern["_id"],
+                "date": day,
+                "status": rnd.choice(STATUSES),
+                "stack": rnd.choice(STACKS),
+                "task": _text(rnd, words, vocabulary),
+                "progress": _text(rnd, max(words // 2, 3), vocabulary),
+                "blockers": _text(rnd, max(words // 2, 3), vocabulary),
+            }
+
+
+def to_snapshot_document(record: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    """A `dailyrecords` document with the snapshot's field names (see bson_snapshot)."""
+    return {
+        "_id": record["_id"],
+        "intern_id": user_id,
+        "date": record["date"],
+        "status": record["status"],
+        "task_stack": record["stack"],
+        "todays_work": record["task"],
+        "challenges": record["progress"],
+        "tomorrow_plan": record["blockers"],
+    }
+
+
+def write_snapshot(directory: str, interns: Sequence[Dict[str, Any]], records: Iterator[Dict[str, Any]]) -> int:
+    """Write users.bson and logbook_entries.bson into `directory`; returns the number of entries."""
+    os.makedirs(directory, exist_ok=True)
+    user_ids = {intern["_id"]: intern["id"] for intern in interns}
+    with open(os.path.join(directory, USERS_FILE), "wb") as users:
+        for intern in interns:
+            users.write(bson.encode(intern))
+    count = 0
+    with open(os.path.join(directory, LOGBOOK_FILE), "wb") as logbook:
+        for number, record in enumerate(records, 1):
+            document = to_snapshot_document(record, user_ids[record["internId"]])
+            logbook.write(bson.encode({**document, "id": number}))
+            count = number
+    return count
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+
+# Punctuation kept in prompts; everything else that is not a letter or digit is dropped
+PUNCTUATION = ".,;:!?()-"
+
+# Separates entries while a batch is translated as one string; the tables keep it as is
+_BATCH_SEPARATOR = "\x00"
+
+
+class _TranslationTable(Dict[int, Optional[str]]):
+    """
+    str.translate table: whitespace -> " ", kept characters -> themselves, the rest deleted.
+    ASCII is filled in up front; other code points are classified on first sight and
+    cached, so the table only ever holds characters that actually occur.
+    """
+
+    def __init__(self, unicode: bool):
+        super().__init__()
+        self.unicode = unicode
+        for code in range(128):
+            self[code] = self._classify(code)
+        self[ord(_BATCH_SEPARATOR)] = _BATCH_SEPARATOR
+
+    def _classify(self, code: int) -> Optional[str]:
+        char = chr(code)
+        if char.isspace():
+            return " "
+        if char in PUNCTUATION:
+            return char
+        if code < 128:
+            return char if char.isalnum() else None
+        # Letters, digits and combining marks of every script (accents, Sinhala/Tamil vowel signs)
+        if self.unicode and unicodedata.category(char)[0] in "LMN":
+            return char
+        return None
+
+    def __missing__(self, code: int) -> Optional[str]:
+        result = self[code] = self._classify(code)
+        return result
+
+
+_ASCII_TABLE = _TranslationTable(unicode=False)
+_UNICODE_TABLE = _TranslationTable(unicode=True)
+
+
+def unicode_enabled() -> bool:
+    return getattr(settings, "TEXT_NORMALIZE_UNICODE", False)
+
+
+def _prepare(text: str, unicode: bool) -> tuple:
+    if unicode:
+        # Composed form, so an accented letter is one kept character rather than letter + mark
+        return unicodedata.normalize("NFC", text), _UNICODE_TABLE
+    return text, _ASCII_TABLE
+
+
+def normalize_text(text: str, unicode: Optional[bool] = None) -> str:
+    """
+    Prompt-safe text: characters other than letters, digits and PUNCTUATION removed and
+    whitespace runs collapsed to single spaces, in one str.translate pass plus a split/join.
+    Only ASCII letters and digits are kept unless `unicode` (default: TEXT_NORMALIZE_UNICODE).
+    """
+    text, table = _prepare(text, unicode_enabled() if unicode is None else unicode)
+    return " ".join(text.translate(table).replace(_BATCH_SEPARATOR, "").split())
+
+
+def normalize_batch(texts: Sequence[str], unicode: Optional[bool] = None) -> List[str]:
+    """
+    normalize_text over many entries at once: the entries are joined and translated as a
+    single string, so the per-entry cost is one split/join.
+    """
+    if not texts:
+        return []
+    unicode = unicode_enabled() if unicode is None else unicode
+    joined = _BATCH_SEPARATOR.join(texts)
+    if joined.count(_BATCH_SEPARATOR) != len(texts) - 1:
+        # An entry contains the separator itself; fall back to one call per entry
+        return [normalize_text(text, unicode) for text in texts]
+    joined, table = _prepare(joined, unicode)
+    return [" ".join(part.split()) for part in joined.translate(table).split(_BATCH_SEPARATOR)]
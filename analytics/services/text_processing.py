@@ -58,20 +58,35 @@
 #         return text
 #     return shorten(text, width=max_chars, placeholder=" ... [TRUNCATED]")
 
-import re
-import json
+import asyncio
+import logging
+import queue
+import threading
+import weakref
+from typing import Any, Iterable, Iterator
+from asgiref.sync import sync_to_async
 from django.conf import settings
-import requests
+from .inference_scheduler import PRIORITY_INTERACTIVE, SchedulerQueueFull, get_async_limiter, get_scheduler
+from .analysis_schema import ANALYSIS_SCHEMA, SchemaViolation, StreamingAnalysisValidator
+from .llm_cache import get_llm_cache, make_cache_key
+from .ollama_router import get_router
+from .prompt_budget import compress_entries, estimate_entries_tokens, fit_entries
+from .structured_logging import truncated
+from .text_normalization import normalize_batch, normalize_text
+from .tracing import stage
+
+payload_logger = logging.getLogger("analytics.payloads")
 
 OLLAMA_API_URL = getattr(settings, "OLLAMA_API_URL", "http://localhost:11434")
 OLLAMA_MODEL = getattr(settings, "OLLAMA_MODEL", "gemma3:1b")
+# Bump when build_analysis_prompt or the generation options change: stored reports
+# generated by an older prompt are then regenerated instead of being served.
+PROMPT_VERSION = "5"
 
 
 def clean_text(text: str) -> str:
-    """Remove unnecessary symbols and extra spaces."""
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^A-Za-z0-9.,;:!?()\-\n ]', '', text)
-    return text.strip()
+    """Remove unnecessary symbols and extra spaces (see text_normalization)."""
+    return normalize_text(text)
 
 
 def build_analysis_prompt(intern_name: str, log_text: str) -> str:
@@ -116,11 +131,82 @@ def extract_insights_from_logbook(log_text: str) -> dict:
     return insights
 
 
-def analyze_with_ollama(intern_name: str, log_entries: list[str]) -> dict:
-    """Send cleaned text to Ollama (gemma3:1b) and return structured JSON response."""
-    log_text = "\n".join(clean_text(entry) for entry in log_entries)
-    prompt = build_analysis_prompt(intern_name, log_text)
-    url = OLLAMA_API_URL.rstrip("/") + "/api/generate"
+def build_summary_prompt(log_text: str, max_words: int) -> str:
+    return f"""
+Summarize the following intern logbook entries in at most {max_words} words.
+Keep concrete accomplishments, milestones, recurring blockers and how they changed over time.
+Answer with the summary only, as plain text.
+
+Logbook entries:
+---
+{log_text}
+---
+"""
+
+
+def summarize_with_ollama(log_text: str, max_words: int, priority: int = PRIORITY_INTERACTIVE) -> str | None:
+    """
+    Plain-text summary of a chunk of older entries, used by the prompt budget to condense
+    long windows. Cached like the analyses; None when the call fails.
+    """
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": build_summary_prompt(clean_text(log_text), max_words),
+        "stream": False,
+        "options": {"temperature": 0.2},
+    }
+    cache = get_llm_cache()
+    cache_key = make_cache_key(payload["model"], payload["options"], payload["prompt"])
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached["summary"]
+
+    timeout = getattr(settings, "OLLAMA_REQUEST_TIMEOUT", 120)
+    try:
+        result = get_scheduler().run(
+            _post_generate, _backend_urls(), payload, timeout,
+            priority=priority,
+            timeout=timeout,
+        )
+    except SchedulerQueueFull:
+        raise
+    except Exception:
+        return None
+    summary = " ".join(result.get("response", "").split())
+    if summary and cache is not None and result.get("model", payload["model"]) == payload["model"]:
+        cache.set(cache_key, {"summary": summary})
+    return summary or None
+
+
+def prompt_token_budget() -> int:
+    return getattr(settings, "OLLAMA_PROMPT_TOKEN_BUDGET", 3000)
+
+
+def budget_log_entries(log_entries: list[str], priority: int = PRIORITY_INTERACTIVE) -> list[str]:
+    """
+    Entries that fit the prompt token budget (OLLAMA_PROMPT_TOKEN_BUDGET): repeated lines
+    compressed, recent entries kept verbatim and, with PROMPT_SUMMARIZE_OLDER, older ones
+    replaced by a parallel map-reduce summary (otherwise dropped, oldest first).
+    """
+    summarize = None
+    if getattr(settings, "PROMPT_SUMMARIZE_OLDER", True):
+        summarize = lambda text, max_words: summarize_with_ollama(text, max_words, priority)  # noqa: E731
+    with stage("prompt_budget"):
+        return fit_entries(
+            log_entries,
+            prompt_token_budget(),
+            summarize=summarize,
+            chunk_tokens=getattr(settings, "PROMPT_SUMMARY_CHUNK_TOKENS", 1500),
+            workers=getattr(settings, "OLLAMA_MAX_IN_FLIGHT", 2),
+        )
+
+
+def _build_generate_payload(intern_name: str, log_entries: list[str]) -> dict:
+    """Prompt plus generation options for one weekly analysis."""
+    with stage("prompt_build"):
+        log_text = "\n".join(normalize_batch(log_entries))
+        prompt = build_analysis_prompt(intern_name, log_text)
 
     payload = {
         "model": OLLAMA_MODEL,
@@ -130,24 +216,392 @@ def analyze_with_ollama(intern_name: str, log_entries: list[str]) -> dict:
             "temperature": 0.3,
             "top_k": 50,
             "top_p": 0.95
-  }
+        }
+    }
+    if getattr(settings, "OLLAMA_STRUCTURED_OUTPUT", True):
+        # Ollama constrains generation to this JSON schema
+        payload["format"] = ANALYSIS_SCHEMA
+    return payload
+
+
+def _retry_payload(payload: dict, error: str) -> dict:
+    """Repair attempt: same prompt, the reason the last answer was rejected, greedy decoding."""
+    return {
+        **payload,
+        "prompt": payload["prompt"] + (
+            f"\nYour previous answer was rejected ({error}). "
+            "Reply again with only the JSON object described above, with every field present."
+        ),
+        "options": {**payload["options"], "temperature": 0.0},
+    }
+
+
+def _max_attempts() -> int:
+    return max(getattr(settings, "OLLAMA_JSON_MAX_ATTEMPTS", 2), 1)
+
+
+def _backend_urls() -> tuple:
+    """Ollama servers the router balances over: settings.OLLAMA_BACKENDS, else OLLAMA_API_URL."""
+    return tuple(getattr(settings, "OLLAMA_BACKENDS", None) or [OLLAMA_API_URL])
+
+
+def _post_generate(urls: tuple, payload: dict, timeout: float) -> dict:
+    """
+    Blocking call to Ollama's /api/generate through the backend router (pooled clients,
+    least-outstanding balancing, failover); runs on an inference scheduler worker.
+    """
+    return get_router(urls).generate(payload, timeout)
+
+
+def analyze_with_ollama(
+    intern_name: str,
+    log_entries: list[str],
+    priority: int = PRIORITY_INTERACTIVE,
+) -> dict:
+    """
+    Send cleaned text to Ollama (gemma3:1b) and return structured JSON response.
+    The entries are first fitted to the prompt token budget (budget_log_entries).
+    Results are cached by (model, options, prompt), so an unchanged logbook is
+    answered without calling the model. Cache misses go through the shared
+    inference scheduler; SchedulerQueueFull is re-raised so the view can answer 429.
+    """
+    payload = _build_generate_payload(intern_name, budget_log_entries(log_entries, priority))
+    return _run_analysis(payload, priority)
+
+
+def _mark_fallback_model(analysis: dict, payload: dict, result: dict) -> None:
+    """
+    Flag analyses the router answered with OLLAMA_FALLBACK_MODEL: they are returned but
+    neither cached nor stored under the primary model's key.
+    """
+    if result.get("model") and result["model"] != payload["model"]:
+        analysis["fallback_model"] = result["model"]
+
+
+def _generate_validated(urls: tuple, payload: dict, timeout: float) -> dict:
+    """
+    Stream one generation through the router and validate it as it arrives. On the first
+    schema violation the stream is closed, which stops the generation on the Ollama side.
+    Runs on an inference scheduler worker. Returns {"analysis" | "error", "response", "model"}.
+    """
+    chunks = get_router(urls).stream_generate(payload, timeout)
+    try:
+        return _validate_generation(chunks, payload["model"])
+    finally:
+        chunks.close()
+
+
+def _validate_generation(chunks: Iterable[dict], model: str) -> dict:
+    """
+    Feed Ollama's generate chunks (one for a non-streamed answer) to the schema validator,
+    stopping at the first violation. Returns {"analysis" | "error", "response", "model"}.
+    """
+    validator = StreamingAnalysisValidator()
+    try:
+        for data in chunks:
+            model = data.get("model") or model
+            if data.get("response"):
+                validator.feed(data["response"])
+        with stage("json_parse"):
+            analysis = validator.finish()
+        return {"analysis": analysis, "response": validator.text, "model": model}
+    except SchemaViolation as e:
+        return {"error": str(e), "response": validator.text, "model": model}
+
+
+def _invalid_response(attempts: int, result: dict) -> dict:
+    """The analysis returned once every attempt produced an invalid answer."""
+    return {
+        "error": f"Invalid model response after {attempts} attempts: {result['error']}",
+        "raw_output": result["response"],
     }
 
+
+def _run_analysis(payload: dict, priority: int, first_error: str | None = None, first_output: str = "") -> dict:
+    """
+    Cached, scheduled generation of the analysis JSON, validated while it streams.
+    An invalid answer is retried with a repair prompt, up to OLLAMA_JSON_MAX_ATTEMPTS
+    generations in total; after that the error is returned (and shown in the report).
+    `first_error` means a first attempt was already made elsewhere and failed that way.
+    """
+    timeout = getattr(settings, "OLLAMA_REQUEST_TIMEOUT", 120)
+
+    cache = get_llm_cache()
+    cache_key = make_cache_key(payload["model"], payload["options"], payload["prompt"])
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    result = {"error": first_error, "response": first_output}
+    attempt = 1 if first_error is not None else 0
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        # print("\nOLLAMA RAW RESPONSE:", response.text)
+        while attempt < _max_attempts():
+            attempt += 1
+            with stage("llm"):
+                result = get_scheduler().run(
+                    _generate_validated,
+                    _backend_urls(),
+                    _retry_payload(payload, result["error"]) if attempt > 1 else payload,
+                    timeout,
+                    priority=priority,
+                    timeout=timeout,
+                )
+            payload_logger.debug("Ollama response (attempt %d): %s", attempt, truncated(result["response"]))
+
+            if "error" not in result:
+                analysis = result["analysis"]
+                _mark_fallback_model(analysis, payload, result)
+                if cache is not None and "fallback_model" not in analysis:
+                    cache.set(cache_key, analysis)
+                return analysis
+
+        return _invalid_response(attempt, result)
+
+    except SchedulerQueueFull:
+        raise
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def build_reduce_prompt(intern_name: str, weekly_text: str) -> str:
+    """Reduce step of the long-window analysis: one review from the per-week analyses."""
+    return f"""
+You are an AI system reviewing an intern's progress over several weeks.
+
+Intern Name: {intern_name}
+
+Below is one analysis per week, oldest first. Combine them into a single review:
+1. Summarize the whole period.
+2. List the most significant milestones achieved across the weeks.
+3. List the challenges that persisted or mattered most.
+4. Evaluate the overall trajectory across the weeks (improving / stagnant / declining).
+5. Suggest personalized recommendations.
+
+Return **strictly JSON output** as:
+{{
+  "trajectory": "<string>",
+  "milestones_achieved": ["<string>", "..."],
+  "summary": "<short paragraph>",
+  "challenges": ["<string>", "..."],
+  "recommendations": ["<string>", "..."]
+}}
+
+Weekly analyses:
+---
+{weekly_text}
+---
+"""
+
+
+def reduce_weekly_analyses(
+    intern_name: str,
+    weeks: list[tuple[str, dict]],
+    priority: int = PRIORITY_INTERACTIVE,
+) -> dict:
+    """Final analysis of a long window from its (week_start, analysis) pairs, in one call."""
+    lines = []
+    for week_start, analysis in weeks:
+        lines.append(
+            f"Week of {week_start}: trajectory {analysis.get('trajectory', 'unknown')}. "
+            f"Summary: {analysis.get('summary', '')} "
+            f"Milestones: {'; '.join(map(str, analysis.get('milestones_achieved') or [])) or 'none'}. "
+            f"Challenges: {'; '.join(map(str, analysis.get('challenges') or [])) or 'none'}."
+        )
+    payload = _build_generate_payload(intern_name, [])
+    payload["prompt"] = build_reduce_prompt(intern_name, "\n".join(normalize_batch(lines)))
+    return _run_analysis(payload, priority)
+
+
+_STREAM_END = object()
+
+
+def _stream_generate(urls: tuple, payload: dict, timeout: float, chunks: queue.Queue, cancelled: threading.Event) -> None:
+    """
+    Streaming call to Ollama's /api/generate; runs on an inference scheduler worker and
+    hands every token, with the model that produced it, to the request thread through
+    `chunks`. Stops early (closing the connection, which stops the generation) once the
+    client has gone away.
+    """
+    try:
+        for data in get_router(urls).stream_generate(payload, timeout, cancelled):
+            if data.get("response"):
+                chunks.put((data["response"], data.get("model")))
+    finally:
+        chunks.put(_STREAM_END)
+
+
+def stream_analysis_with_ollama(
+    intern_name: str,
+    log_entries: list[str],
+    priority: int = PRIORITY_INTERACTIVE,
+) -> Iterator[dict]:
+    """
+    Streaming variant of analyze_with_ollama. The generation is queued immediately
+    (so SchedulerQueueFull is raised here, before any response is sent); the returned
+    iterator then yields events as the model produces text:
+      {"event": "token", "text": ...}                  every streamed piece
+      {"event": "field", "name": ..., "value": ...}    each top-level JSON field once complete
+      {"event": "retry", "error": ...}                 the output broke the schema; the generation
+                                                       was stopped and is retried (the retry's fields follow)
+      {"event": "analysis", "analysis": {...}}         the full validated result, last
+    A cached analysis is replayed as field events without calling the model.
+    """
+    payload = _build_generate_payload(intern_name, budget_log_entries(log_entries, priority))
+    payload["stream"] = True
+    timeout = getattr(settings, "OLLAMA_REQUEST_TIMEOUT", 120)
 
-        result = response.json()
-        output_text = result.get("response", "")
+    cache = get_llm_cache()
+    cache_key = make_cache_key(payload["model"], payload["options"], payload["prompt"])
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached is not None:
+        return _replay_cached_analysis(cached)
 
-        print("\nOLLAMA response field:", output_text)
-        
-        json_match = re.search(r"\{.*\}", output_text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(0))
+    chunks: queue.Queue = queue.Queue()
+    cancelled = threading.Event()
+    future = get_scheduler().submit(
+        _stream_generate, _backend_urls(), payload, timeout, chunks, cancelled,
+        priority=priority,
+    )
+    return _relay_stream(chunks, cancelled, future, timeout, cache, cache_key, payload, priority)
+
+
+def _replay_cached_analysis(analysis: dict) -> Iterator[dict]:
+    for name, value in analysis.items():
+        yield {"event": "field", "name": name, "value": value}
+    yield {"event": "analysis", "analysis": analysis}
+
+
+def _relay_stream(chunks, cancelled, future, timeout, cache, cache_key, payload, priority) -> Iterator[dict]:
+    validator = StreamingAnalysisValidator()
+    model = None
+    try:
+        while True:
+            try:
+                chunk = chunks.get(timeout=timeout)
+            except queue.Empty:
+                future.cancel()
+                yield {"event": "analysis", "analysis": {"error": f"Inference did not complete within {timeout}s"}}
+                return
+            if chunk is _STREAM_END:
+                break
+            piece, model = chunk
+
+            yield {"event": "token", "text": piece}
+            try:
+                fields = validator.feed(piece)
+            except SchemaViolation as e:
+                # Stop the generation now and retry non-streaming with the repair prompt
+                cancelled.set()
+                yield {"event": "retry", "error": str(e)}
+                yield from _replay_cached_analysis(
+                    _run_analysis(payload, priority, first_error=str(e), first_output=validator.text)
+                )
+                return
+            for name, value in fields:
+                yield {"event": "field", "name": name, "value": value}
+
+        error = future.exception(timeout=timeout)
+        if error is not None:
+            analysis = {"error": str(error)}
         else:
-            return {"error": "Invalid model response", "raw_output": output_text}
+            try:
+                analysis = validator.finish()
+            except SchemaViolation as e:
+                analysis = {"error": f"Invalid model response: {e}", "raw_output": validator.text}
+            _mark_fallback_model(analysis, payload, {"model": model})
+            if cache is not None and not ({"error", "fallback_model"} & analysis.keys()):
+                cache.set(cache_key, analysis)
+        yield {"event": "analysis", "analysis": analysis}
+    finally:
+        # Runs on normal completion and when the client disconnects (generator closed)
+        cancelled.set()
+
+# httpx.AsyncClient instances are tied to the event loop that created them.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+def _get_async_client():
+    import httpx  # only the ASGI code path needs httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        # Concurrency is already bounded by the async limiter; don't add a second cap here.
+        client = _async_clients[loop] = httpx.AsyncClient(limits=httpx.Limits(max_connections=None))
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Close the running event loop's httpx client (called on ASGI lifespan shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _agenerate_validated(urls: tuple, payload: dict, timeout: float) -> dict:
+    """Async twin of _generate_validated: one non-streamed generation, validated the same way."""
+    result = await _apost_generate(urls, payload, timeout)
+    return _validate_generation([result], payload["model"])
+
+
+async def _apost_generate(urls: tuple, payload: dict, timeout: float) -> dict:
+    """Non-blocking call to Ollama's /api/generate, on the backend picked by the router."""
+    keep_alive = getattr(settings, "OLLAMA_KEEP_ALIVE", "30m")
+    if keep_alive is not None:
+        payload = {**payload, "keep_alive": keep_alive}
+
+    async def post(base_url: str, body: dict) -> dict:
+        response = await _get_async_client().post(base_url + "/api/generate", json=body, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    return await get_router(urls).agenerate(payload, post)
+
+
+async def analyze_with_ollama_async(intern_name: str, log_entries: list[str]) -> dict:
+    """
+    Async version of analyze_with_ollama for the ASGI code path. The event loop is
+    never blocked: cache I/O runs in a worker thread and the HTTP call uses httpx.
+    """
+    log_entries = compress_entries(log_entries)
+    if estimate_entries_tokens(log_entries) > prompt_token_budget():
+        # Over budget: summarizing the older entries blocks on Ollama, keep it off the event loop
+        log_entries = await sync_to_async(budget_log_entries, thread_sensitive=False)(log_entries)
+    payload = _build_generate_payload(intern_name, log_entries)
+    timeout = getattr(settings, "OLLAMA_REQUEST_TIMEOUT", 120)
+
+    cache = get_llm_cache()
+    cache_key = make_cache_key(payload["model"], payload["options"], payload["prompt"])
+    if cache is not None:
+        cached = await sync_to_async(cache.get, thread_sensitive=False)(cache_key)
+        if cached is not None:
+            return cached
+
+    # Same validation, repair prompt and attempt limit as _run_analysis
+    result = {"error": None, "response": ""}
+    try:
+        for attempt in range(1, _max_attempts() + 1):
+            with stage("llm"):
+                result = await get_async_limiter().run(
+                    _agenerate_validated,
+                    _backend_urls(),
+                    _retry_payload(payload, result["error"]) if attempt > 1 else payload,
+                    timeout,
+                    timeout=timeout,
+                )
+            payload_logger.debug("Ollama response (attempt %d): %s", attempt, truncated(result["response"]))
+
+            if "error" not in result:
+                analysis = result["analysis"]
+                _mark_fallback_model(analysis, payload, result)
+                if cache is not None and "fallback_model" not in analysis:
+                    await sync_to_async(cache.set, thread_sensitive=False)(cache_key, analysis)
+                return analysis
+
+        return _invalid_response(attempt, result)
 
+    except SchedulerQueueFull:
+        raise
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
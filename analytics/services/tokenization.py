@@ -0,0 +1,72 @@
+from __future__ import annotations
+import re
+import sys
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# One regex pass over the lowercased text. Leading whitespace is captured so that the
+# number of whitespace-separated words (what str.split() would count) falls out of the
+# same pass. Token rules approximate pattern/TextBlob's tokenizer, which the lexicon
+# sentiment scorer relies on: quotes/apostrophes and leading/trailing punctuation become
+# their own tokens, inner punctuation ("auth-service", "v2.0") stays in the word, "..." is one token.
+_TOKEN_RE = re.compile(r"(\s*)(\.\.\.|[^\W_](?:[^\s'\"“”‘’]*[^\W_])?|[^\w\s]|_+)")
+
+
+class TokenizedEntry:
+    """
+    One log entry, tokenized once and consumed by every scoring metric.
+
+    tokens       -- lowercased tokens (interned strings, so equal tokens share memory)
+    word_count   -- whitespace-separated words, same as len(text.split())
+    keyword_hits -- per-keyword counts of whole-token matches, in the tokenizer's keyword order
+    """
+
+    __slots__ = ("text", "tokens", "word_count", "keyword_hits")
+
+    def __init__(self, text: str, tokens: Tuple[str, ...], word_count: int, keyword_hits: Tuple[int, ...]):
+        self.text = text
+        self.tokens = tokens
+        self.word_count = word_count
+        self.keyword_hits = keyword_hits
+
+    @property
+    def keyword_total(self) -> int:
+        return sum(self.keyword_hits)
+
+    def __repr__(self) -> str:
+        return f"TokenizedEntry(words={self.word_count}, tokens={len(self.tokens)}, keyword_hits={self.keyword_hits})"
+
+
+class EntryTokenizer:
+    """
+    Tokenizes entries and counts keyword hits in the same pass: each token is looked up
+    once in a keyword -> index dict, so matching is O(tokens) regardless of the number of
+    keywords and only whole tokens match ("fixed" does not match inside "prefixed").
+    """
+
+    def __init__(self, keywords: Sequence[str] = ()):
+        self.keywords = tuple(kw.lower() for kw in keywords)
+        self._keyword_index: Dict[str, int] = {kw: i for i, kw in enumerate(self.keywords)}
+
+    def tokenize(self, text: str) -> TokenizedEntry:
+        keyword_index = self._keyword_index
+        hits = [0] * len(self.keywords)
+        tokens = []
+        word_count = 0
+        intern = sys.intern
+        for position, (space, token) in enumerate(_TOKEN_RE.findall(text.lower())):
+            # A token starts a new word when whitespace (or the start of text) precedes it
+            if space or position == 0:
+                word_count += 1
+            index = keyword_index.get(token)
+            if index is not None:
+                hits[index] += 1
+            tokens.append(intern(token))
+        return TokenizedEntry(text, tuple(tokens), word_count, tuple(hits))
+
+    def tokenize_all(self, texts: Iterable[str]) -> List[TokenizedEntry]:
+        return [self.tokenize(text) for text in texts]
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Lowercased tokens of `text` (no keyword counting)."""
+    return tuple(token for _, token in _TOKEN_RE.findall(text.lower()))
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import contextlib
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .inference_scheduler import _percentile
+
+QUANTILES = (50, 95, 99)
+
+_SERVER_TIMING_TOKEN_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class Trace:
+    """Stage timings of one request, in the order the stages finished."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []  # (stage, seconds); list.append is thread-safe
+
+    def durations(self) -> Dict[str, float]:
+        """Seconds per stage; a stage that ran several times (retries, weeks) is summed."""
+        totals: Dict[str, float] = {}
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: `stage;dur=<ms>` per stage, then the total."""
+        parts = [
+            f"{_SERVER_TIMING_TOKEN_RE.sub('_', name)};dur={seconds * 1000:.1f}"
+            for name, seconds in self.durations().items()
+        ]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class StageStats:
+    """Count, sum and a window of recent samples (for quantiles) of one stage."""
+
+    def __init__(self, sample_size: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("pipeline_trace", default=None)
+_stats: Dict[str, StageStats] = {}
+_stats_lock = threading.Lock()
+_noop = contextlib.nullcontext()
+
+
+def tracing_enabled() -> bool:
+    return getattr(settings, "PIPELINE_TRACING", True)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add one timing of `name` to the current request's trace and the process-wide stats."""
+    trace = _current.get()
+    if trace is not None:
+        trace.stages.append((name, seconds))
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = StageStats()
+        stats.add(seconds)
+
+
+@contextlib.contextmanager
+def _timed(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def stage(name: str):
+    """
+    Context manager timing one pipeline stage. Disabled tracing returns a shared no-op
+    context, so instrumented code costs one settings lookup.
+    """
+    return _timed(name) if tracing_enabled() else _noop
+
+
+@contextlib.contextmanager
+def trace() -> Iterator[Trace]:
+    """Collect the stages timed inside this block (and the threads it hands work to) into one Trace."""
+    current = Trace()
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def stage_metrics() -> Dict[str, Dict[str, Any]]:
+    """Per-stage count, total seconds and p50/p95/p99 over the recent samples (ms)."""
+    with _stats_lock:
+        snapshot = {name: (stats.count, stats.total, sorted(stats.samples)) for name, stats in _stats.items()}
+    return {
+        name: {
+            "count": count,
+            "sum_seconds": round(total, 6),
+            **{f"p{q}_ms": round(_percentile(samples, q) * 1000, 3) for q in QUANTILES},
+        }
+        for name, (count, total, samples) in sorted(snapshot.items())
+    }
+
+
+def prometheus_text() -> str:
+    """The stage stats as a Prometheus summary (text exposition format 0.0.4)."""
+    lines = [
+        "# HELP report_stage_duration_seconds Time spent in each report pipeline stage.",
+        "# TYPE report_stage_duration_seconds summary",
+    ]
+    for name, stats in stage_metrics().items():
+        for q in QUANTILES:
+            lines.append(f'report_stage_duration_seconds{{stage="{name}",quantile="{q / 100}"}} {stats[f"p{q}_ms"] / 1000}')
+        lines.append(f'report_stage_duration_seconds_sum{{stage="{name}"}} {stats["sum_seconds"]}')
+        lines.append(f'report_stage_duration_seconds_count{{stage="{name}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _reset_after_fork() -> None:
+    global _stats_lock
+    _stats.clear()
+    _stats_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
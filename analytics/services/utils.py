@@ -1,20 +1,27 @@
 from __future__ import annotations
+import logging
 import os
 from datetime import date, datetime, timedelta
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, NamedTuple
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from pymongo import MongoClient
 from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from .mongo_client import get_shared_client
+from .mongo_indexes import explain_once
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+
+logger = logging.getLogger(__name__)
 
 
 def get_mongo_client() -> MongoClient:
     """
-    Create a MongoDB client using Django settings or env vars.
+    Return the shared, pooled MongoDB client configured from Django settings or env vars.
     """
-    uri = getattr(settings, "MONGODB_URI", None) or os.environ.get("MONGODB_URI")
-    if not uri:
-        raise RuntimeError("MONGODB_URI not configured in settings or environment.")
-    return MongoClient(uri)
+    return get_shared_client()
 
 
 def get_logbook_collection():
@@ -23,7 +30,7 @@ def get_logbook_collection():
     """
     db_name = getattr(settings, "MONGODB_DB_NAME", None) or os.environ.get("MONGODB_DB_NAME")
     collection_name = getattr(settings, "MONGODB_LOGBOOK_COLLECTION", "dailyrecords")
-    print(f"Using MongoDB Database: {db_name}, Collection: {collection_name}")
+    logger.debug("Using MongoDB database %s, collection %s", db_name, collection_name)
     if not db_name:
         raise RuntimeError("MONGODB_DB_NAME not configured in settings or environment.")
     client = get_mongo_client()
@@ -43,12 +50,26 @@ def get_logbook_collection():
 #     end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
 #     return start_date, end_date
 
+def _snapshot_source():
+    """The BSON snapshot when settings.LOGBOOK_DATA_SOURCE == "snapshot", else None."""
+    from .bson_snapshot import get_snapshot, snapshot_enabled  # bson_snapshot imports this module
+
+    return get_snapshot() if snapshot_enabled() else None
+
+
 def get_week_range(days: int = 7):
     """
     Returns start_date_str, end_date_str in 'YYYY-MM-DD' format,
     without time components.
+    With the snapshot data source the window ends at LOGBOOK_SNAPSHOT_AS_OF
+    (default: the snapshot's latest entry) so reports are reproducible.
     """
     today = date.today()
+    snapshot = _snapshot_source()
+    if snapshot is not None:
+        as_of = getattr(settings, "LOGBOOK_SNAPSHOT_AS_OF", None) or snapshot.latest_date
+        if as_of:
+            today = date.fromisoformat(as_of)
     start_date = today - timedelta(days=days - 1)
    
     return (
@@ -57,11 +78,57 @@ def get_week_range(days: int = 7):
     )
 
 
+# Only the fields _entry_from_doc maps; attachments and other wide fields stay on the server
+LOGBOOK_PROJECTION = {"_id": 0, "date": 1, "status": 1, "stack": 1, "task": 1, "progress": 1, "blockers": 1}
+
+# Documents arrive as undecoded BSON bytes; only the projected fields we read get decoded
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+class LogbookEntry(NamedTuple):
+    """
+    One logbook entry as used by the report pipeline. A tuple instead of a dict;
+    `.get()` keeps the dict-style access used by the report code working.
+    """
+
+    date: Any
+    status: str
+    tech_stack: str
+    todays_work: str
+    challenges: str
+    tomorrow_plan: str
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self._fields else default
+
+
+def _text_field(doc, name: str) -> str:
+    return (doc.get(name) or "").strip()
+
+
+def _entry_from_doc(doc) -> LogbookEntry:
+    """
+    Map a `dailyrecords` document (dict or RawBSONDocument) onto a LogbookEntry.
+    """
+    return LogbookEntry(
+        date=doc.get("date"),
+        status=_text_field(doc, "status"),
+        tech_stack=_text_field(doc, "stack"),
+        todays_work=_text_field(doc, "task"),
+        challenges=_text_field(doc, "progress"),
+        tomorrow_plan=_text_field(doc, "blockers"),
+    )
+
+
+def _lean_collection(collection):
+    return collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+
+
 def fetch_logbook_entries(
     intern_id: str,
     start_date: str,
     end_date: str,
-) -> List[Dict[str, Any]]:
+) -> List[LogbookEntry]:
     """
     Fetch logbook entries for a single intern within a date range.
     Expected logbook schema:
@@ -72,29 +139,88 @@ def fetch_logbook_entries(
       - todays_work
       - challenges
       - tomorrow_plan
+    Only those fields are requested (LOGBOOK_PROJECTION) and returned as LogbookEntry tuples.
     """
+    snapshot = _snapshot_source()
+    if snapshot is not None:
+        return snapshot.fetch_logbook_entries(intern_id, start_date, end_date)
+
     collection = get_logbook_collection()   
     query = {
         "internId": ObjectId(intern_id),
         "date": {
-            "$gte": '2025-11-18',
-            "$lte": '2025-11-20',
+            "$gte": start_date,
+            "$lte": end_date,
         },
     }
 
-    cursor = collection.find(query).sort("date", 1)
-    entries: List[Dict[str, Any]] = []
-
-    for doc in cursor:
-        # Convert Mongo datetime to python datetime, normalize keys
-        entries.append(
-            {
-                "date": doc.get("date"),
-                "status": (doc.get("status") or "").strip(),
-                "tech_stack": (doc.get("stack") or "").strip(),
-                "todays_work": (doc.get("task") or "").strip(),
-                "challenges": (doc.get("progress") or "").strip(),
-                "tomorrow_plan": (doc.get("blockers") or "").strip(),
+    explain_once(collection, "fetch_logbook_entries", query, [("date", 1)])
+    cursor = _lean_collection(collection).find(query, LOGBOOK_PROJECTION).sort("date", 1)
+    return [_entry_from_doc(doc) for doc in cursor]
+
+
+async def fetch_logbook_entries_async(
+    intern_id: str,
+    start_date: str,
+    end_date: str,
+) -> List[LogbookEntry]:
+    """
+    Async wrapper around fetch_logbook_entries for the ASGI code path.
+    The pymongo query runs on a worker thread so the event loop stays free.
+    """
+    return await sync_to_async(fetch_logbook_entries, thread_sensitive=False)(intern_id, start_date, end_date)
+
+
+def fetch_cohort_logbook_entries(
+    intern_ids: List[str],
+    start_date: str,
+    end_date: str,
+) -> Dict[str, List[LogbookEntry]]:
+    """
+    Fetch logbook entries for many interns within a date range in a single aggregation.
+    Returns {intern_id: [entries sorted by date]}; interns without entries map to [].
+    """
+    snapshot = _snapshot_source()
+    if snapshot is not None:
+        return snapshot.fetch_cohort_logbook_entries(intern_ids, start_date, end_date)
+
+    collection = get_logbook_collection()
+    ids_by_object_id = {ObjectId(intern_id): intern_id for intern_id in intern_ids}
+    pipeline = [
+        {
+            "$match": {
+                "internId": {"$in": list(ids_by_object_id)},
+                "date": {"$gte": start_date, "$lte": end_date},
             }
-        )
-    return entries
+        },
+        {"$sort": {"internId": 1, "date": 1}},
+        {
+            "$group": {
+                "_id": "$internId",
+                "docs": {
+                    "$push": {
+                        "date": "$date",
+                        "status": "$status",
+                        "stack": "$stack",
+                        "task": "$task",
+                        "progress": "$progress",
+                        "blockers": "$blockers",
+                    }
+                },
+            }
+        },
+    ]
+
+    explain_once(collection, "fetch_cohort_logbook_entries", pipeline[0]["$match"])
+    entries_by_intern: Dict[str, List[LogbookEntry]] = {intern_id: [] for intern_id in intern_ids}
+    for group in _lean_collection(collection).aggregate(pipeline, allowDiskUse=True):
+        entries_by_intern[ids_by_object_id[group["_id"]]] = [_entry_from_doc(doc) for doc in group["docs"]]
+    return entries_by_intern
+
+
+def is_valid_intern_id(intern_id: str) -> bool:
+    """ObjectId strings for Mongo; the snapshot also accepts its numeric user ids."""
+    if ObjectId.is_valid(intern_id):
+        return True
+    snapshot = _snapshot_source()
+    return snapshot is not None and snapshot.resolve_intern(intern_id) is not None
@@ -1,3 +1,1057 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import os
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from bson import ObjectId, encode
+from bson.raw_bson import RawBSONDocument
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .models import FeatureSyncState, WeeklyReport
+from .services.analysis_schema import ANALYSIS_SCHEMA, SchemaViolation, StreamingAnalysisValidator, repair_json
+from .services import batch_scoring, feature_store, long_window, mongo_client, report_generator, text_processing, tracing, utils
+from .services.scoring_engine import compute_intern_score, effort_score
+from .services.logbook_store import LogbookStore, export_to_store, rows_from_entries
+from .services.bson_snapshot import BSONSnapshot, iter_bson_file
+from .services.structured_logging import NonBlockingQueueHandler, SamplingFilter, truncated
+from .services.text_normalization import normalize_batch, normalize_text
+from .services.synthetic_logbook import generate_dailyrecords, generate_interns, write_snapshot
+from .services.fake_ollama import DEFAULT_ANALYSIS, FakeOllamaServer
+from .services.json_stream import IncrementalJSONObjectParser
+from .services.inference_scheduler import AsyncInferenceLimiter, InferenceScheduler, InferenceTimeout, SchedulerQueueFull
+from .services.ollama_client import OllamaClient
+from .services.ollama_router import OllamaRouter, _is_failover_error
+from .services.mongo_indexes import ensure_indexes, winning_plan_stages
+from .services.llm_cache import DjangoCacheLLMCache, InMemoryLLMCache, SQLiteLLMCache
+from .services.prompt_budget import compress_entries, estimate_entries_tokens, fit_entries
+from .services.sentiment import LexiconSentiment, TextBlobSentiment, build_lexicon_backend
+
+
+class InferenceSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = InferenceScheduler(max_in_flight=2, max_queue_size=2)
+        self.addCleanup(self.scheduler.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        patcher = mock.patch.object(text_processing, "get_llm_cache", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bounds_calls_in_flight_against_ollama(self):
+        with FakeOllamaServer(latency=0.2) as fake:
+            scheduler = InferenceScheduler(max_in_flight=2, max_queue_size=10)
+            self.addCleanup(scheduler.shutdown)
+            with mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url), \
+                    mock.patch.object(text_processing, "get_scheduler", return_value=scheduler):
+                threads = [
+                    threading.Thread(target=text_processing.analyze_with_ollama, args=("Intern", ["did work"]))
+                    for _ in range(5)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+        self.assertEqual(len(fake.requests), 5)
+        self.assertEqual(fake.max_in_flight, 2)
+        self.assertEqual(scheduler.metrics()["completed"], 5)
+
+    def test_analyze_with_ollama_returns_model_json(self):
+        with FakeOllamaServer() as fake:
+            with mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url), \
+                    mock.patch.object(text_processing, "get_scheduler", return_value=self.scheduler):
+                result = text_processing.analyze_with_ollama("Intern", ["Completed the login page"])
+
+        self.assertEqual(result, DEFAULT_ANALYSIS)
+        self.assertEqual(fake.requests[0]["format"], ANALYSIS_SCHEMA)
+
+    def test_rejects_with_retry_after_when_queue_is_full(self):
+        for _ in range(4):  # 2 running + 2 queued
+            self.scheduler.submit(self.release.wait)
+
+        with self.assertRaises(SchedulerQueueFull) as ctx:
+            self.scheduler.submit(self.release.wait)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        self.assertEqual(self.scheduler.metrics()["rejected"], 1)
+
+    def test_timed_out_call_is_never_started(self):
+        started = []
+        self.scheduler.submit(self.release.wait)
+        self.scheduler.submit(self.release.wait)
+
+        with self.assertRaises(InferenceTimeout):
+            self.scheduler.run(started.append, 1, timeout=0.05)
+        self.release.set()
+        time.sleep(0.05)
+        self.assertEqual(started, [])
+        self.assertEqual(self.scheduler.metrics()["queue_depth"], 0)
+
+
+class AsyncInferenceTests(SimpleTestCase):
+    async def test_limiter_bounds_calls_in_flight(self):
+        limiter = AsyncInferenceLimiter(max_in_flight=2, max_queue_size=10)
+        running, peak = 0, 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(limiter.run(call) for _ in range(6)))
+        self.assertEqual(peak, 2)
+        self.assertEqual(limiter.metrics()["completed"], 6)
+
+    async def test_limiter_rejects_when_queue_is_full(self):
+        limiter = AsyncInferenceLimiter(max_in_flight=1, max_queue_size=1)
+        release = asyncio.Event()
+        waiting = [asyncio.ensure_future(limiter.run(release.wait)) for _ in range(2)]  # 1 running + 1 queued
+        await asyncio.sleep(0)
+
+        with self.assertRaises(SchedulerQueueFull):
+            await limiter.run(release.wait)
+        release.set()
+        await asyncio.gather(*waiting)
+        self.assertEqual(limiter.metrics()["rejected"], 1)
+
+    @override_settings(PERSIST_WEEKLY_REPORTS=False, SERVE_PRECOMPUTED_REPORTS=False)
+    async def test_async_view_returns_the_report(self):
+        entries = [utils.LogbookEntry("2025-11-03", "Working", "Backend", "Completed the login page", "", "")]
+        with FakeOllamaServer() as fake:
+            with override_settings(OLLAMA_BACKENDS=[fake.url]), \
+                    mock.patch.object(report_generator, "fetch_logbook_entries_async", return_value=entries), \
+                    mock.patch.object(text_processing, "get_llm_cache", return_value=None):
+                response = await self.async_client.get("/api/interns/intern-1/weekly-report/async/?name=Ada")
+                await text_processing.aclose_async_client()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"], DEFAULT_ANALYSIS["summary"])
+        self.assertEqual(len(fake.requests), 1)
+
+
+class LLMCacheTests(SimpleTestCase):
+    def test_memory_cache_evicts_least_recently_used(self):
+        cache = InMemoryLLMCache(ttl=60, max_entries=2)
+        cache.set("a", {"summary": "a"})
+        cache.set("b", {"summary": "b"})
+        cache.get("a")
+        cache.set("c", {"summary": "c"})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"summary": "a"})
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_sqlite_cache_expires_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SQLiteLLMCache(ttl=60, path=Path(tmp) / "cache.sqlite3")
+            cache.set("key", {"trajectory": "improving"})
+            self.assertEqual(cache.get("key"), {"trajectory": "improving"})
+
+            with mock.patch("analytics.services.llm_cache.time.time", return_value=time.time() + 120):
+                self.assertIsNone(cache.get("key"))
+            stats = cache.stats()
+            cache._local.conn.close()
+
+        self.assertEqual((stats["hits"], stats["misses"], stats["expired"]), (1, 1, 1))
+
+    def test_django_cache_clear_keeps_other_keys_of_the_alias(self):
+        from django.core.cache import cache as default_cache
+
+        self.addCleanup(default_cache.clear)
+        default_cache.set("session:abc", "logged in")
+        cache = DjangoCacheLLMCache()
+        cache.set("key", {"trajectory": "improving"})
+        cache.clear()
+
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(default_cache.get("session:abc"), "logged in")
+        cache.set("key", {"trajectory": "steady"})
+        self.assertEqual(cache.get("key"), {"trajectory": "steady"})
+
+    def test_repeat_analysis_is_served_from_cache(self):
+        scheduler = InferenceScheduler(max_in_flight=1, max_queue_size=1)
+        self.addCleanup(scheduler.shutdown)
+        with FakeOllamaServer() as fake:
+            with mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url), \
+                    mock.patch.object(text_processing, "get_scheduler", return_value=scheduler), \
+                    mock.patch.object(text_processing, "get_llm_cache", return_value=InMemoryLLMCache()):
+                first = text_processing.analyze_with_ollama("Intern", ["Completed the login page"])
+                second = text_processing.analyze_with_ollama("Intern", ["Completed the login page"])
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(fake.requests), 1)
+
+
+class StreamingReportTests(SimpleTestCase):
+    def test_parser_emits_fields_as_they_complete(self):
+        parser = IncrementalJSONObjectParser()
+        self.assertEqual(parser.feed('Sure! {"trajectory": "impro'), [])
+        self.assertEqual(parser.feed('ving", "challenges": ["a, b"'), [("trajectory", "improving")])
+        self.assertEqual(parser.feed("]}"), [("challenges", ["a, b"])])
+        self.assertTrue(parser.done)
+
+    def test_score_is_sent_before_streamed_fields(self):
+        scheduler = InferenceScheduler(max_in_flight=1, max_queue_size=1)
+        self.addCleanup(scheduler.shutdown)
+        entries = [{"date": "2025-11-18", "todays_work": "Completed the login page"}]
+
+        with FakeOllamaServer() as fake:
+            with mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url), \
+                    mock.patch.object(text_processing, "get_scheduler", return_value=scheduler), \
+                    mock.patch.object(text_processing, "get_llm_cache", return_value=None), \
+                    mock.patch.object(report_generator, "fetch_logbook_entries", return_value=entries):
+                events = list(report_generator.stream_weekly_report("intern-1", "Intern"))
+
+        self.assertEqual(events[0]["event"], "score")
+        fields = [event["name"] for event in events if event["event"] == "field"]
+        self.assertEqual(fields, list(DEFAULT_ANALYSIS))
+        self.assertEqual(events[-1]["event"], "report")
+        self.assertEqual(events[-1]["report"]["trajectory"], DEFAULT_ANALYSIS["trajectory"])
+        self.assertTrue(fake.requests[0]["stream"])
+
+
+class FeatureStoreTests(TestCase):
+    def setUp(self):
+        FeatureSyncState.objects.create(name=feature_store.SYNC_STATE_NAME)
+
+    def _doc(self, date, task, progress="", blockers=""):
+        return {"_id": ObjectId(), "internId": "intern-1", "date": date, "task": task, "progress": progress, "blockers": blockers}
+
+    def test_window_score_matches_scoring_from_raw_text(self):
+        docs = [
+            self._doc("2025-11-17", "Completed the login page", "Great progress on tests"),
+            self._doc("2025-11-18", "Debugged the failing build and fixed it", blockers="Implement review comments"),
+            self._doc("2025-11-18", "Bad day, nothing worked"),
+            self._doc("2025-11-25", "Outside of the window"),
+        ]
+        touched, _ = feature_store._apply_documents(docs, "internId")
+        feature_store._refresh_daily_rows(touched)
+
+        texts = report_generator._build_log_texts_from_entries(
+            [feature_store._entry_from_doc(doc) for doc in docs[:3]]
+        )
+        self.assertEqual(
+            feature_store.score_window("intern-1", "2025-11-17", "2025-11-19"),
+            compute_intern_score(texts),
+        )
+        self.assertIsNone(feature_store.score_window("intern-1", "2025-12-01", "2025-12-07"))
+
+    def test_edited_entry_replaces_its_previous_features(self):
+        doc = self._doc("2025-11-17", "Completed the login page")
+        feature_store._refresh_daily_rows(feature_store._apply_documents([doc], "internId")[0])
+        doc["task"] = ""
+        feature_store._refresh_daily_rows(feature_store._apply_documents([doc], "internId")[0])
+
+        self.assertIsNone(feature_store.score_window("intern-1", "2025-11-17", "2025-11-17"))
+
+    @override_settings(FEATURE_STORE_ENABLED=True)
+    def test_window_missing_from_the_store_is_scored_from_the_texts(self):
+        docs = [self._doc("2025-11-17", "Completed the login page"), self._doc("2025-11-18", "Bad day, nothing worked")]
+        feature_store._refresh_daily_rows(feature_store._apply_documents(docs[:1], "internId")[0])
+        texts = report_generator._build_log_texts_from_entries([feature_store._entry_from_doc(doc) for doc in docs])
+
+        # The 2025-11-18 entry was written after the last sync
+        self.assertIsNone(feature_store.score_window("intern-1", "2025-11-17", "2025-11-19", expected_entries=2))
+        self.assertEqual(
+            report_generator._score_window("intern-1", "2025-11-17", "2025-11-19", texts), compute_intern_score(texts)
+        )
+        self.assertNotEqual(compute_intern_score(texts), compute_intern_score(texts[:1]))
+
+        # A store last synced before the window ended is not trusted either
+        feature_store._refresh_daily_rows(feature_store._apply_documents(docs[1:], "internId")[0])
+        FeatureSyncState.objects.update(synced_at=timezone.make_aware(datetime(2025, 11, 18, 12)))
+        self.assertIsNone(feature_store.score_window("intern-1", "2025-11-17", "2025-11-19", expected_entries=2))
+        self.assertIsNotNone(feature_store.score_window("intern-1", "2025-11-17", "2025-11-18", expected_entries=2))
+
+
+class SentimentBackendTests(SimpleTestCase):
+    TEXTS = [
+        "Completed the login page, great progress!",
+        "The deployment was not easy and the docs are very confusing.",
+        "Really not good... extremely slow build",
+        "Nothing special today",
+    ]
+
+    def test_lexicon_matches_textblob_scores(self):
+        try:
+            textblob = TextBlobSentiment()
+        except ImportError:
+            self.skipTest("textblob is not installed")
+        self.assertEqual(build_lexicon_backend().score_batch(self.TEXTS), [textblob.score(t) for t in self.TEXTS])
+
+    def test_lexicon_is_bundled_and_a_missing_one_is_an_error(self):
+        with mock.patch.dict(sys.modules, {"textblob": None}):
+            self.assertGreater(len(build_lexicon_backend()), 2000)
+        with override_settings(SENTIMENT_LEXICON_PATH="/nonexistent/en-sentiment.xml"):
+            with self.assertRaisesRegex(RuntimeError, "Sentiment lexicon not found"):
+                build_lexicon_backend()
+
+    def test_negation_and_modifier_rules(self):
+        lexicon = LexiconSentiment({"good": (0.7, 1.0, False), "very": (0.2, 1.3, True)})
+        self.assertEqual(lexicon.polarity_components("good"), (0.7, 1))
+        self.assertEqual(lexicon.polarity_components("not good"), (-0.35, 1))
+        self.assertAlmostEqual(lexicon.polarity_components("very good!")[0], 1.0)
+        self.assertEqual(lexicon.score_batch(["", "nothing known"]), [50.0, 50.0])
+
+
+class ScoringEngineTests(SimpleTestCase):
+    def test_keywords_match_whole_words_only(self):
+        self.assertEqual(effort_score(["Prefixed the config", "Fixed it, then TESTED."]), 28.57)
+
+
+class SharedMongoClientTests(SimpleTestCase):
+    URI = "mongodb://unreachable.invalid:27017"  # clients are created with connect=False
+
+    def setUp(self):
+        self.addCleanup(mongo_client.close_shared_clients)
+
+    def test_one_client_per_process_and_uri(self):
+        client = mongo_client.get_shared_client(self.URI)
+        self.assertIs(mongo_client.get_shared_client(self.URI), client)
+        self.assertIsNot(mongo_client.get_shared_client(f"{self.URI}/other"), client)
+        self.assertEqual(len(mongo_client._clients), 2)
+
+    def test_child_process_builds_its_own_client(self):
+        inherited = mongo_client.get_shared_client(self.URI)
+        mongo_client._reset_after_fork()
+        self.addCleanup(inherited.close)
+
+        self.assertEqual(mongo_client._clients, {})
+        self.assertIsNot(mongo_client.get_shared_client(self.URI), inherited)
+
+    def test_close_empties_the_registry(self):
+        client = mongo_client.get_shared_client(self.URI)
+        with mock.patch.object(client, "close", wraps=client.close) as close:
+            mongo_client.close_shared_clients()
+        close.assert_called_once_with()
+        self.assertEqual(mongo_client._clients, {})
+
+    def test_closing_one_service_keeps_the_shared_pool_open(self):
+        from .mongo_service import TalentHubMongoService
+
+        client = mongo_client.get_shared_client(self.URI)
+        service = TalentHubMongoService()
+        service._client, service._db = client, client.get_database("talenthub")
+        with mock.patch.object(client, "close") as close:
+            service.close_connection()
+
+        close.assert_not_called()
+        self.assertIsNone(service._db)
+        self.assertIs(mongo_client.get_shared_client(self.URI), client)
+
+
+class MongoIndexTests(SimpleTestCase):
+    class _Collection:
+        def __init__(self, indexes):
+            self.indexes = indexes
+
+        def index_information(self):
+            return {name: {"key": keys} for name, keys in self.indexes.items()}
+
+        def create_index(self, keys, name):
+            self.indexes[name] = keys
+
+    def test_creates_missing_indexes_and_accepts_equivalent_ones(self):
+        records = self._Collection({"_id_": [("_id", 1)], "by_intern": [("internId", 1), ("date", 1)]})
+        db = mock.MagicMock(name="db")
+        db.__getitem__.return_value = records
+
+        with mock.patch("analytics.services.mongo_indexes.resolve_logbook_source", return_value=("dailyrecords", "internId")):
+            self.assertEqual(
+                ensure_indexes(db, create=False),
+                {"dailyrecords": {"internId_1_date_1": "ok", "updatedAt_1__id_1": "missing"}},
+            )
+            self.assertEqual(ensure_indexes(db)["dailyrecords"]["updatedAt_1__id_1"], "created")
+        self.assertIn("updatedAt_1__id_1", records.indexes)
+
+    def test_finds_collscan_in_winning_plan(self):
+        explain = {"queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}
+        self.assertEqual(winning_plan_stages(explain), ["SORT", "COLLSCAN"])
+
+
+class LeanFetchTests(SimpleTestCase):
+    def test_fetch_projects_mapped_fields_and_returns_tuples(self):
+        raw = RawBSONDocument(encode({"date": "2025-11-17", "task": " Completed the API ", "progress": "Tested it"}))
+        collection = mock.MagicMock()
+        lean = collection.with_options.return_value
+        lean.find.return_value.sort.return_value = iter([raw])
+
+        with mock.patch.object(utils, "get_logbook_collection", return_value=collection):
+            entries = utils.fetch_logbook_entries(str(ObjectId()), "2025-11-17", "2025-11-23")
+
+        self.assertEqual(lean.find.call_args.args[1], utils.LOGBOOK_PROJECTION)
+        self.assertIsInstance(entries[0], utils.LogbookEntry)
+        self.assertEqual(entries[0].todays_work, "Completed the API")
+        self.assertEqual(report_generator._build_log_texts_from_entries(entries), ["Completed the API Tested it"])
+
+
+class CohortReportTests(SimpleTestCase):
+    def test_cohort_fetch_queries_the_requested_window(self):
+        first, second = ObjectId(), ObjectId()
+        collection = mock.MagicMock()
+        lean = collection.with_options.return_value
+        lean.aggregate.return_value = iter([{"_id": second, "docs": [{"date": "2025-11-03", "task": "Wrote docs"}]}])
+
+        with mock.patch.object(utils, "get_logbook_collection", return_value=collection):
+            entries = utils.fetch_cohort_logbook_entries([str(first), str(second)], "2025-11-01", "2025-11-07")
+
+        match = lean.aggregate.call_args.args[0][0]["$match"]
+        self.assertEqual(match["date"], {"$gte": "2025-11-01", "$lte": "2025-11-07"})
+        self.assertEqual(match["internId"], {"$in": [first, second]})
+        self.assertEqual(entries[str(first)], [])
+        self.assertEqual([entry.todays_work for entry in entries[str(second)]], ["Wrote docs"])
+
+    def test_cohort_endpoint_streams_one_report_per_intern(self):
+        with_entries, without_entries = str(ObjectId()), str(ObjectId())
+        entries = {with_entries: [utils.LogbookEntry("2025-11-03", "Working", "", "Completed the API", "", "")]}
+        with mock.patch.object(report_generator, "fetch_cohort_logbook_entries", return_value=entries) as fetch, \
+                mock.patch.object(report_generator, "analyze_with_ollama", return_value={"summary": "Good week"}):
+            response = self.client.get(f"/api/interns/weekly-reports/?ids={with_entries},{without_entries},{with_entries}&days=7")
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(fetch.call_args.args, ([with_entries, without_entries], *utils.get_week_range(days=7)))
+        reports = {report["intern_id"]: report for report in lines}
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(reports[with_entries]["summary"], "Good week")
+        self.assertEqual(reports[without_entries]["trajectory"], "no-data")
+
+    @override_settings(MAX_COHORT_SIZE=2)
+    def test_cohort_endpoint_rejects_oversized_cohorts(self):
+        ids = ",".join(str(ObjectId()) for _ in range(3))
+        with mock.patch.object(report_generator, "fetch_cohort_logbook_entries") as fetch:
+            response = self.client.get(f"/api/interns/weekly-reports/?ids={ids}")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("At most 2 interns", response.json()["error"])
+        fetch.assert_not_called()
+
+
+class BSONSnapshotTests(SimpleTestCase):
+    SNAPSHOT_DIR = Path(__file__).resolve().parent / "backup" / "intern_logbook"
+
+    def test_fetch_matches_a_full_scan_of_the_dump(self):
+        snapshot = BSONSnapshot(self.SNAPSHOT_DIR)
+        self.addCleanup(snapshot.close)
+        expected = sorted(
+            doc["date"]
+            for doc in iter_bson_file(str(self.SNAPSHOT_DIR / "logbook_entries.bson"), chunk_size=64)
+            if doc["intern_id"] == 8 and "2025-09-01" <= doc["date"] <= "2025-09-30"
+        )
+
+        entries = snapshot.fetch_logbook_entries("8", "2025-09-01", "2025-09-30")
+
+        self.assertEqual([entry.date for entry in entries], expected)
+        self.assertTrue(all(entry.todays_work for entry in entries))
+        user = snapshot.get_intern_by_id(snapshot.get_all_interns()[0]["_id"])
+        self.assertEqual(snapshot.resolve_intern(user["_id"]), user["id"])
+
+    def test_reads_a_synthetic_snapshot(self):
+        interns = generate_interns(3, seed=7)
+        records = list(generate_dailyrecords(interns, days=10, end_date="2025-12-31", skip_rate=0.0, seed=7))
+        self.assertEqual(records, list(generate_dailyrecords(interns, days=10, end_date="2025-12-31", skip_rate=0.0, seed=7)))
+        directory = tempfile.mkdtemp()
+        self.assertEqual(write_snapshot(directory, interns, iter(records)), 30)
+
+        snapshot = BSONSnapshot(directory)
+        self.addCleanup(snapshot.close)
+        entries = snapshot.fetch_logbook_entries(str(interns[1]["_id"]), "2025-12-25", "2025-12-31")
+
+        self.assertEqual([entry.date for entry in entries], [f"2025-12-{day}" for day in range(25, 32)])
+        self.assertEqual(entries[-1].todays_work, records[-2]["task"])
+
+
+class LogbookStoreTests(SimpleTestCase):
+    def test_cohort_scores_match_scoring_from_raw_text(self):
+        store = LogbookStore(Path(tempfile.mkdtemp()) / "store.sqlite3")
+        self.addCleanup(store.close)
+        entries = [
+            utils.LogbookEntry("2025-09-29", "Working", "Backend", "Completed the login API", "Great progress", ""),
+            utils.LogbookEntry("2025-10-01", "WFH", "Frontend", "Debugged a bad build", "", "Fix the tests"),
+            utils.LogbookEntry("2025-10-02", "Working", "Backend", "", "", ""),
+        ]
+        store.write_rows(rows_from_entries([("a", "intern-1", entries[0]), ("b", "intern-1", entries[1]), ("c", "intern-1", entries[2])]))
+        store.write_rows(rows_from_entries([("z", "intern-2", entries[0]._replace(date="2025-11-15"))]))
+        # Re-exporting an entry that moved to another month replaces it
+        store.write_rows(rows_from_entries([("z", "intern-2", entries[0]._replace(date="2025-10-15"))]))
+
+        texts = report_generator._build_log_texts_from_entries(entries)
+        self.assertEqual(
+            store.cohort_scores("2025-09-01", "2025-10-31"),
+            {"intern-1": compute_intern_score(texts), "intern-2": compute_intern_score(texts[:1])},
+        )
+        self.assertEqual(store.partitions(), ["entries_2025_09", "entries_2025_10", "entries_2025_11"])
+        self.assertEqual(store.count(), 3)
+
+    def test_mongo_export_picks_up_edited_entries(self):
+        class Collection:
+            """find() over a list, with the $gt/$gte/$lte filters and the sort/limit the export uses."""
+
+            OPERATORS = {"$gt": lambda a, b: a > b, "$gte": lambda a, b: a >= b, "$lte": lambda a, b: a <= b}
+
+            def __init__(self, docs):
+                self.docs = docs
+
+            def find(self, query, projection):
+                found = [
+                    dict(doc) for doc in self.docs
+                    if all(self.OPERATORS[op](doc[field], value) for field, cond in query.items() for op, value in cond.items())
+                ]
+                cursor = mock.MagicMock()
+                cursor.__iter__.side_effect = lambda: iter(found)
+                cursor.sort.return_value.limit.side_effect = lambda n: sorted(found, key=lambda doc: doc["_id"])[:n]
+                return cursor
+
+        store = LogbookStore(Path(tempfile.mkdtemp()) / "store.sqlite3")
+        self.addCleanup(store.close)
+        docs = [
+            {"_id": ObjectId(), "internId": "intern-1", "date": "2025-10-01", "task": "Completed the login API", "updatedAt": "2025-10-01T10:00"},
+            {"_id": ObjectId(), "internId": "intern-1", "date": "2025-10-02", "task": "Wrote the docs", "updatedAt": "2025-10-02T10:00"},
+        ]
+        with mock.patch("analytics.services.logbook_store.get_logbook_collection", return_value=Collection(docs)), \
+                override_settings(LOGBOOK_DATA_SOURCE="mongo"):
+            export_to_store(store, batch_size=1)
+            docs[0].update(task="Completed the login API and fixed the failing tests", updatedAt="2025-10-03T09:00")
+            docs[1].update(task="", updatedAt="2025-10-03T09:30")
+            stats = export_to_store(store)
+
+        self.assertEqual(stats["read"], 2)
+        self.assertEqual(store.count(), 1)
+        self.assertEqual(store.get_meta("last_updated_at"), "2025-10-03T09:30")
+        texts = report_generator._build_log_texts_from_entries([utils._entry_from_doc(docs[0])])
+        self.assertEqual(store.cohort_scores("2025-10-01", "2025-10-31"), {"intern-1": compute_intern_score(texts)})
+
+
+@override_settings(LOGBOOK_DATA_SOURCE="snapshot", LOGBOOK_SNAPSHOT_AS_OF="2025-12-31")
+class BatchScoringTests(TestCase):
+    def test_batch_fans_out_resumes_and_feeds_the_api(self):
+        checkpoint = Path(tempfile.mkdtemp()) / "checkpoint.json"
+        interns = [(str(i), f"Intern {i}") for i in range(1, 11)]
+        start, end = utils.get_week_range(days=120)
+
+        # An interrupted run of the same window already did intern 1
+        partial = batch_scoring.Checkpoint(checkpoint, start, end)
+        partial.done = {"1"}
+        partial.save()
+        stats = batch_scoring.run_batch_scoring(
+            interns, days=120, workers=2, chunk_size=3, analyze=False, checkpoint_path=str(checkpoint), resume=True,
+        )
+
+        self.assertEqual((stats["skipped"], stats["scored"], stats["failed"]), (1, 9, 0))
+        self.assertFalse(checkpoint.exists())
+        entries = utils.fetch_logbook_entries("8", start, end)
+        stored = WeeklyReport.objects.get(intern_id="8", period_start=start, period_end=end)
+        self.assertEqual(stored.score, compute_intern_score(report_generator._build_log_texts_from_entries(entries)))
+        self.assertFalse(stored.analyzed)
+
+        # Only reports with the Ollama narrative are served in place of a fresh one
+        stored.report = {**stored.report, "summary": "Precomputed"}
+        stored.analyzed = True
+        stored.save()
+        response = self.client.get("/api/interns/8/weekly-report/?days=120")
+        self.assertEqual(response["X-Report-Source"], "precomputed")
+        self.assertEqual(response.json()["summary"], "Precomputed")
+
+    @override_settings(OLLAMA_MAX_IN_FLIGHT=5)
+    def test_workers_split_the_ollama_in_flight_budget(self):
+        pool = batch_scoring.ProcessPoolExecutor
+        with mock.patch.object(batch_scoring, "ProcessPoolExecutor", side_effect=pool) as executor:
+            batch_scoring.run_batch_scoring(
+                [("8", "Intern 8"), ("9", "Intern 9")], workers=2, chunk_size=1, analyze=False,
+                checkpoint_path=str(Path(tempfile.mkdtemp()) / "checkpoint.json"),
+            )
+        self.assertEqual(executor.call_args.kwargs["initargs"], (2,))
+
+        with override_settings():
+            batch_scoring._init_worker(2)
+            self.assertEqual(batch_scoring.settings.OLLAMA_MAX_IN_FLIGHT, 2)
+
+    @override_settings(OLLAMA_MAX_IN_FLIGHT=2)
+    def test_analyzing_workers_never_exceed_the_ollama_budget(self):
+        thread_pool = batch_scoring.ThreadPoolExecutor
+
+        def process_pool(max_workers, initializer, initargs):
+            return thread_pool(max_workers)  # in-process, so the Ollama call can be patched
+
+        with mock.patch.object(batch_scoring, "ProcessPoolExecutor", side_effect=process_pool) as executor, \
+                mock.patch.object(batch_scoring, "ThreadPoolExecutor", side_effect=thread_pool) as chunk_pool, \
+                mock.patch.object(batch_scoring, "analyze_long_window", return_value={"trajectory": "steady"}):
+            stats = batch_scoring.run_batch_scoring(
+                [(str(i), f"Intern {i}") for i in range(1, 9)], days=120, workers=8, chunk_size=2,
+                checkpoint_path=str(Path(tempfile.mkdtemp()) / "checkpoint.json"),
+            )
+
+        self.assertEqual((stats["failed"], stats["analyzed"]), (0, 8))
+        self.assertEqual(executor.call_args.kwargs["max_workers"], 2)
+        self.assertEqual(executor.call_args.kwargs["initargs"], (1,))
+        self.assertTrue(chunk_pool.called)
+        self.assertTrue(all(call.args[0] <= 2 for call in chunk_pool.call_args_list))
+
+
+class ReportPersistenceTests(TestCase):
+    def test_stored_report_is_served_until_the_entries_change(self):
+        entries = [utils.LogbookEntry("2025-10-01", "Working", "Backend", "Completed the login API", "", "")]
+        analysis = {"trajectory": "improving", "summary": "Good week"}
+        with mock.patch.object(report_generator, "fetch_logbook_entries", side_effect=lambda *a: list(entries)), \
+                mock.patch.object(report_generator, "analyze_with_ollama", return_value=analysis) as analyze:
+            first = report_generator.generate_weekly_report("intern-1", "Ada")
+            self.assertEqual(report_generator.generate_weekly_report("intern-1", "Ada"), first)
+            self.assertEqual(analyze.call_count, 1)
+
+            entries.append(utils.LogbookEntry("2025-10-02", "Working", "Backend", "Fixed the tests", "", ""))
+            report_generator.generate_weekly_report("intern-1", "Ada")
+            self.assertEqual(analyze.call_count, 2)
+
+            # A new prompt version invalidates what the old prompt generated
+            with mock.patch("analytics.services.report_store.PROMPT_VERSION", "next"):
+                report_generator.generate_weekly_report("intern-1", "Ada")
+            self.assertEqual(analyze.call_count, 3)
+
+        stored = WeeklyReport.objects.get(intern_id="intern-1")
+        self.assertEqual((stored.trajectory, stored.prompt_version), ("improving", "next"))
+
+    def test_view_does_not_serve_a_stored_report_of_older_entries(self):
+        entries = [utils.LogbookEntry("2025-10-01", "Working", "Backend", "Completed the login API", "", "")]
+
+        def fetch(*args):
+            return list(entries)
+
+        analyses = [{"trajectory": "steady", "summary": "First week"}, {"trajectory": "improving", "summary": "More done"}]
+        analyses.append({"trajectory": "improving", "summary": "Regenerated"})
+        with mock.patch.object(report_generator, "fetch_logbook_entries", side_effect=fetch) as fetch_entries, \
+                mock.patch.object(report_generator, "analyze_with_ollama", side_effect=analyses) as analyze:
+            self.assertEqual(self.client.get("/api/interns/intern-1/weekly-report/").json()["summary"], "First week")
+            self.assertEqual(self.client.get("/api/interns/intern-1/weekly-report/")["X-Report-Source"], "precomputed")
+            self.assertEqual(fetch_entries.call_count, 2)
+
+            entries.append(utils.LogbookEntry("2025-10-02", "Working", "Backend", "Fixed the tests", "", ""))
+            response = self.client.get("/api/interns/intern-1/weekly-report/")
+            self.assertEqual(analyze.call_count, 2)
+            self.assertFalse(response.has_header("X-Report-Source"))
+            self.assertEqual(response.json()["summary"], "More done")
+
+            # ?fresh=1 regenerates even though a stored report of these entries exists
+            response = self.client.get("/api/interns/intern-1/weekly-report/?fresh=1")
+        self.assertEqual(analyze.call_count, 3)
+        self.assertFalse(response.has_header("X-Report-Source"))
+        self.assertEqual(response.json()["summary"], "Regenerated")
+
+
+class PromptBudgetTests(SimpleTestCase):
+    def test_repeated_lines_are_compressed_into_the_latest_entry(self):
+        entries = ["Set up Django. Same plan as yesterday.", "Wrote the models. Same plan as yesterday.", "Same plan as yesterday"]
+        self.assertEqual(
+            compress_entries(entries),
+            ["Set up Django.", "Wrote the models.", "Same plan as yesterday (x3 days)"],
+        )
+        # A sentence repeated inside one entry is one day, not several
+        self.assertEqual(compress_entries(["Fixed CSS. Fixed CSS!", "Fixed CSS."]), ["Fixed CSS. (x2 days)"])
+
+    def test_older_entries_are_summarized_in_parallel_chunks_within_budget(self):
+        entries = [f"Day {day}: implemented endpoint number {day} and reviewed pull request {day}." for day in range(90)]
+        chunks = []
+
+        def summarize(text, max_words):
+            chunks.append(text)
+            return "Built and reviewed endpoints."
+
+        fitted = fit_entries(entries, 400, summarize, chunk_tokens=200)
+
+        self.assertLessEqual(estimate_entries_tokens(fitted), 400)
+        self.assertTrue(fitted[0].startswith("Summary of earlier entries: Built and reviewed endpoints."))
+        self.assertEqual(fitted[-1], entries[-1])
+        self.assertGreater(len(chunks), 1)
+        # Without a summarizer the oldest entries are dropped instead
+        self.assertTrue(fit_entries(entries, 400)[0].endswith("earlier entries omitted)"))
+
+
+class LongWindowAnalysisTests(SimpleTestCase):
+    def test_weeks_are_analyzed_concurrently_then_reduced(self):
+        entries = [
+            utils.LogbookEntry(day, "Working", "Backend", f"Worked on task {day}", "", "")
+            for day in ("2025-09-16", "2025-09-18", "2025-09-23", "2025-10-01", "2025-10-02")
+        ]
+        in_flight, peak, lock = [0], [0], threading.Lock()
+
+        def analyze(intern_name, texts, priority):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return {"trajectory": "improving", "summary": texts[0], "milestones_achieved": [texts[0]]}
+
+        with mock.patch.object(long_window, "analyze_with_ollama", side_effect=analyze), \
+                mock.patch.object(long_window, "reduce_weekly_analyses", return_value={"error": "timeout"}) as reduce:
+            result = long_window.analyze_long_window("Ada", entries)
+
+        weeks = reduce.call_args.args[1]
+        self.assertEqual([week for week, _ in weeks], ["2025-09-15", "2025-09-22", "2025-09-29"])
+        self.assertEqual(peak[0], 3)
+        # The reduce call failed: the weekly analyses are merged instead
+        self.assertEqual(
+            result["milestones_achieved"],
+            ["Worked on task 2025-09-16", "Worked on task 2025-09-23", "Worked on task 2025-10-01"],
+        )
+
+    def test_entries_without_a_usable_date_are_still_analyzed(self):
+        entries = [
+            utils.LogbookEntry("2025-09-16", "Working", "Backend", "Built the login API", "", ""),
+            utils.LogbookEntry("2025-13-45", "Working", "Backend", "Wrote the tests", "", ""),
+            utils.LogbookEntry(None, "Working", "Backend", "Fixed the build", "", ""),
+        ]
+        self.assertEqual(
+            long_window.weekly_chunks(entries),
+            [("2025-09-15", ["Built the login API"]), (long_window.UNDATED, ["Wrote the tests", "Fixed the build"])],
+        )
+
+        with mock.patch.object(long_window, "analyze_with_ollama", return_value={"trajectory": "steady"}) as analyze:
+            long_window.analyze_long_window("Ada", entries[1:])
+        self.assertEqual(analyze.call_args.args[1], ["Wrote the tests", "Fixed the build"])
+
+
+class OllamaClientTests(SimpleTestCase):
+    def test_reuses_connections_and_keeps_the_model_loaded(self):
+        with FakeOllamaServer() as fake:
+            client = OllamaClient(fake.url, model="gemma3:1b", keep_alive="1h")
+            self.addCleanup(client.close)
+            client.warm_up()
+            for _ in range(3):
+                client.generate({"model": "gemma3:1b", "prompt": "hi", "stream": False})
+            streamed = "".join(chunk.get("response", "") for chunk in client.stream_generate({"model": "gemma3:1b", "prompt": "hi"}))
+
+            self.assertEqual(fake.connections, 1)
+            self.assertEqual(fake.requests[0]["prompt"], "")  # warm-up only loads the model
+            self.assertTrue(all(request["keep_alive"] == "1h" for request in fake.requests))
+            self.assertEqual(json.loads(streamed), DEFAULT_ANALYSIS)
+            self.assertTrue(client.health()["ok"])
+            self.assertFalse(OllamaClient(fake.url, model="llama3:70b").health()["ok"])
+
+    @override_settings(OLLAMA_WARM_UP_ON_STARTUP=True)
+    def test_only_serving_entry_points_warm_up_the_model(self):
+        from django.apps import apps as app_registry
+        from intern_logbook_analysis.asgi import application
+        from . import apps as analytics_apps
+
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            pass
+
+        with mock.patch("analytics.services.ollama_client.warm_up_in_background") as warm_up, \
+                mock.patch.object(analytics_apps, "_started", False):
+            app_registry.get_app_config("analytics").ready()  # django.setup() in any process
+            self.assertFalse(warm_up.called)
+
+            asyncio.run(application({"type": "lifespan"}, receive, send))
+            analytics_apps.start_serving_process()
+        self.assertEqual(warm_up.call_count, 1)
+
+
+class OllamaRouterTests(SimpleTestCase):
+    PAYLOAD = {"model": "gemma3:1b", "prompt": "Completed the login page", "stream": False}
+
+    def test_balances_on_outstanding_requests(self):
+        with FakeOllamaServer(latency=0.2) as first, FakeOllamaServer(latency=0.2) as second:
+            router = OllamaRouter([first.url, second.url])
+            threads = [threading.Thread(target=router.generate, args=(self.PAYLOAD,)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual((len(first.requests), len(second.requests)), (2, 2))
+        self.assertEqual(router.metrics()["backends"][0]["outstanding"], 0)
+
+    def test_fails_over_to_a_live_backend(self):
+        dead = FakeOllamaServer().start()
+        dead.stop()  # nothing listens on its port any more
+        with FakeOllamaServer() as live:
+            router = OllamaRouter([dead.url, live.url], cooldown=60)
+            router.backends[1].outstanding = 1  # make the dead backend the first pick
+            result = router.generate(self.PAYLOAD, timeout=5)
+            router.backends[1].outstanding = 0
+
+            self.assertEqual(json.loads(result["response"]), DEFAULT_ANALYSIS)
+            self.assertFalse(router.backends[0].healthy)
+            router.generate(self.PAYLOAD, timeout=5)  # the unhealthy backend is skipped
+            self.assertEqual(len(live.requests), 2)
+            self.assertEqual(router.backends[0].failures, 1)
+
+    def test_async_calls_fail_over_on_timeout(self):
+        import httpx
+
+        async def post(url, payload):
+            async with httpx.AsyncClient(timeout=0.2) as client:
+                response = await client.post(f"{url}/api/generate", json=payload)
+                response.raise_for_status()
+                return response.json()
+
+        with FakeOllamaServer(latency=1) as slow, FakeOllamaServer() as live:
+            router = OllamaRouter([slow.url, live.url], cooldown=60)
+            router.backends[1].outstanding = 1  # make the slow backend the first pick
+            result = asyncio.run(router.agenerate(self.PAYLOAD, post))
+            router.backends[1].outstanding = 0
+
+        self.assertEqual(json.loads(result["response"]), DEFAULT_ANALYSIS)
+        self.assertFalse(router.backends[0].healthy)
+        server_error = httpx.HTTPStatusError(
+            "503", request=httpx.Request("POST", live.url), response=httpx.Response(503),
+        )
+        self.assertTrue(all(map(_is_failover_error, [httpx.ReadError("reset"), httpx.RemoteProtocolError("eof"), server_error])))
+        self.assertFalse(_is_failover_error(ValueError("bad payload")))
+
+    def test_switches_to_the_fallback_model_when_the_slo_is_breached(self):
+        with FakeOllamaServer(latency=0.1) as fake:
+            router = OllamaRouter([fake.url], fallback_model="gemma3:270m", latency_slo=0.05)
+            router.generate(self.PAYLOAD)
+            result = router.generate(self.PAYLOAD)
+
+        self.assertEqual([request["model"] for request in fake.requests], ["gemma3:1b", "gemma3:270m"])
+        self.assertEqual(result["model"], "gemma3:270m")
+        analysis = {}
+        text_processing._mark_fallback_model(analysis, self.PAYLOAD, result)
+        self.assertEqual(analysis, {"fallback_model": "gemma3:270m"})
+
+    def test_streamed_fallback_answers_are_not_cached(self):
+        scheduler = InferenceScheduler(max_in_flight=1, max_queue_size=1)
+        self.addCleanup(scheduler.shutdown)
+        cache = InMemoryLLMCache()
+        with FakeOllamaServer() as fake:
+            router = OllamaRouter([fake.url], fallback_model="gemma3:270m")
+            router.degraded_until = time.monotonic() + 60
+            with mock.patch.object(text_processing, "get_router", return_value=router), \
+                    mock.patch.object(text_processing, "get_scheduler", return_value=scheduler), \
+                    mock.patch.object(text_processing, "get_llm_cache", return_value=cache):
+                events = list(text_processing.stream_analysis_with_ollama("Intern", ["Completed the login page"]))
+
+        self.assertEqual(events[-1]["analysis"]["fallback_model"], "gemma3:270m")
+        self.assertEqual(cache.stats()["sets"], 0)
+
+
+class StructuredOutputTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = InferenceScheduler(max_in_flight=1, max_queue_size=4)
+        self.addCleanup(self.scheduler.shutdown)
+        for patcher in (
+            mock.patch.object(text_processing, "get_llm_cache", return_value=None),
+            mock.patch.object(text_processing, "get_scheduler", return_value=self.scheduler),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_validator_rejects_a_bad_field_before_the_object_ends(self):
+        validator = StreamingAnalysisValidator()
+        validator.feed('{"milestones_achieved": [], ')
+        with self.assertRaises(SchemaViolation):
+            validator.feed('"trajectory": "great", "summary": "')
+
+    def test_repair_closes_truncated_output(self):
+        self.assertEqual(
+            repair_json('```json\n{"summary": "Good week", "challenges": ["CSS",'),
+            {"summary": "Good week", "challenges": ["CSS"]},
+        )
+
+    def test_invalid_output_is_aborted_and_retried(self):
+        rambling = {"trajectory": "great", "summary": "x" * 400}
+        with FakeOllamaServer(response=[rambling, DEFAULT_ANALYSIS], chunk_latency=0.005) as fake:
+            with mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url):
+                result = text_processing.analyze_with_ollama("Intern", ["Completed the login page"])
+
+        self.assertEqual(result, DEFAULT_ANALYSIS)
+        self.assertEqual(len(fake.requests), 2)
+        self.assertIn("previous answer was rejected", fake.requests[1]["prompt"])
+        self.assertEqual(fake.requests[1]["options"]["temperature"], 0.0)
+
+    def test_gives_up_with_an_error_after_max_attempts(self):
+        with FakeOllamaServer(response="I cannot help with that.") as fake:
+            with mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url):
+                result = text_processing.analyze_with_ollama("Intern", ["Completed the login page"])
+
+        self.assertEqual(len(fake.requests), 2)
+        self.assertTrue(result["error"].startswith("Invalid model response after 2 attempts"))
+        self.assertEqual(report_generator._build_report("intern-1", 50, result)["error"], result["error"])
+
+    def test_async_path_validates_and_repairs_like_the_sync_path(self):
+        truncated_json = json.dumps(DEFAULT_ANALYSIS)[:-3]
+        bad_enum = {**DEFAULT_ANALYSIS, "trajectory": "great"}
+        for responses in ([truncated_json], ["I cannot help with that."], [bad_enum, DEFAULT_ANALYSIS]):
+            results = []
+            for run in (self._analyze_sync, self._analyze_async):
+                with FakeOllamaServer(response=list(responses)) as fake:
+                    with mock.patch.object(text_processing, "OLLAMA_API_URL", fake.url):
+                        results.append((run(), len(fake.requests)))
+            with self.subTest(responses=responses):
+                self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], (DEFAULT_ANALYSIS, 2))
+
+    def _analyze_sync(self):
+        return text_processing.analyze_with_ollama("Intern", ["Completed the login page"])
+
+    def _analyze_async(self):
+        async def run():
+            try:
+                return await text_processing.analyze_with_ollama_async("Intern", ["Completed the login page"])
+            finally:
+                await text_processing.aclose_async_client()
+
+        return asyncio.run(run())
+
+
+@override_settings(
+    LOGBOOK_DATA_SOURCE="snapshot", LOGBOOK_SNAPSHOT_AS_OF="2025-12-31", PERSIST_WEEKLY_REPORTS=False, LONG_WINDOW_MIN_DAYS=1000,
+)
+class PipelineTracingTests(SimpleTestCase):
+    def test_report_response_carries_stage_timings(self):
+        tracing.reset_metrics()
+        scheduler = InferenceScheduler(max_in_flight=1, max_queue_size=1)
+        self.addCleanup(scheduler.shutdown)
+        with FakeOllamaServer() as fake, override_settings(OLLAMA_BACKENDS=[fake.url]), \
+                mock.patch.object(text_processing, "get_scheduler", return_value=scheduler), \
+                mock.patch.object(text_processing, "get_llm_cache", return_value=None):
+            response = self.client.get("/api/interns/8/weekly-report/?days=120&fresh=1")
+
+        stages = [part.split(";")[0] for part in response["Server-Timing"].split(", ")]
+        for name in ("fetch", "text_build", "score_sentiment", "prompt_build", "llm", "json_parse", "total"):
+            self.assertIn(name, stages)
+        metrics = self.client.get("/api/metrics/").content.decode()
+        self.assertIn('report_stage_duration_seconds_count{stage="llm"} 1', metrics)
+        self.assertIn('report_stage_duration_seconds{stage="fetch",quantile="0.99"}', metrics)
+
+    @override_settings(LONG_WINDOW_MIN_DAYS=14)
+    def test_long_window_weeks_reach_the_request_trace(self):
+        scheduler = InferenceScheduler(max_in_flight=2, max_queue_size=64)
+        self.addCleanup(scheduler.shutdown)
+        with FakeOllamaServer() as fake, override_settings(OLLAMA_BACKENDS=[fake.url]), \
+                mock.patch.object(text_processing, "get_scheduler", return_value=scheduler), \
+                mock.patch.object(text_processing, "get_llm_cache", return_value=None), \
+                tracing.trace() as trace:
+            report_generator.generate_weekly_report("8", "Intern 8", days=120)
+
+        llm_calls = [name for name, _ in trace.stages if name == "llm"]
+        self.assertGreater(len(llm_calls), 1)
+        self.assertEqual(len(llm_calls), len(fake.requests))
+
+    @override_settings(PIPELINE_TRACING=False)
+    def test_disabled_tracing_records_nothing(self):
+        tracing.reset_metrics()
+        with tracing.stage("fetch"):
+            pass
+        self.assertEqual(tracing.stage_metrics(), {})
+
+
+class StructuredLoggingTests(SimpleTestCase):
+    def test_payloads_are_truncated_only_when_rendered(self):
+        class Entries(list):
+            def __repr__(self):
+                raise AssertionError("payload rendered for a disabled logger")
+
+        logging.getLogger("analytics.payloads").debug("Entries %s", truncated(Entries()))
+        self.assertEqual(str(truncated("x" * 30, max_chars=10)), "xxxxxxxxxx... (20 more chars)")
+
+    def test_full_queue_drops_records_instead_of_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        logger = logging.getLogger("analytics.tests.queue")
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(logger.removeHandler, handler)
+        for i in range(3):
+            logger.warning("record %d", i)
+        self.assertEqual(handler.dropped, 2)
+        self.assertEqual(handler.queue.get_nowait().getMessage(), "record 0")
+        self.assertFalse(SamplingFilter(rate=0.0).filter(logging.makeLogRecord({})))
+
+
+class TextNormalizationTests(SimpleTestCase):
+    ENTRIES = [
+        "  Fixed   the login\tbug (#42);\n reviewed PR-17 with José!  ",
+        "Built the API: 3 endpoints, tests @ 90% coverage.",
+        "",
+        "Met Nimal & Kasun \u2014 planned sprint \u0dc3\u0dd2\u0d82\u0dc4\u0dbd",
+        "stray \x00 separator\u00a0and\u2003spaces",
+    ]
+
+    def test_ascii_mode_matches_the_regex_clean_text(self):
+        def regex_clean_text(text):
+            return re.sub(r"[^A-Za-z0-9.,;:!?()\-\n ]", "", re.sub(r"\s+", " ", text)).strip()
+
+        for entry in self.ENTRIES:
+            # The regex left a double space where a removed character sat between two spaces
+            self.assertEqual(normalize_text(entry, unicode=False), " ".join(regex_clean_text(entry).split()))
+        self.assertEqual(normalize_text(self.ENTRIES[0], unicode=False), "Fixed the login bug (42); reviewed PR-17 with Jos!")
+
+    def test_batch_matches_per_entry(self):
+        for unicode in (False, True):
+            self.assertEqual(
+                normalize_batch(self.ENTRIES, unicode=unicode),
+                [normalize_text(entry, unicode=unicode) for entry in self.ENTRIES],
+            )
+            self.assertEqual(normalize_batch(self.ENTRIES[:2], unicode=unicode), normalize_batch(self.ENTRIES, unicode=unicode)[:2])
+        self.assertEqual(normalize_batch([]), [])
+
+    def test_unicode_mode_keeps_non_ascii_letters(self):
+        self.assertEqual(normalize_text("Jose\u0301 & Zoë", unicode=True), "José Zoë")
+        self.assertIn("\u0dc3\u0dd2\u0d82\u0dc4\u0dbd", normalize_text(self.ENTRIES[3], unicode=True))
+        with override_settings(TEXT_NORMALIZE_UNICODE=True):
+            self.assertEqual(text_processing.clean_text("Zoë  Ñuñez"), "Zoë Ñuñez")
+
+
+class ImportTimeTests(SimpleTestCase):
+    """Startup budget: `python -X importtime` of Django setup plus the app's URLs and services."""
+
+    BUDGET_MS = int(os.environ.get("IMPORT_TIME_BUDGET_MS", "150"))
+    LAZY_MODULES = ("pymongo", "requests", "httpx", "textblob")
+    SCRIPT = (
+        "import sys, django; django.setup(); "
+        "import analytics.urls, analytics.mongo_service, analytics.services.logbook_store, analytics.services.feature_store; "
+        "print(','.join(m for m in %r if m in sys.modules))"
+    )
+
+    @staticmethod
+    def _analytics_import_ms(importtime_output: str) -> float:
+        """Cumulative time of the analytics modules that no other analytics module imported."""
+        total, stack = 0, []
+        lines = [line for line in importtime_output.splitlines() if line.startswith("import time:") and "|" in line]
+        for line in reversed(lines[1:]):  # post-order reversed: parents come before their imports
+            _, cumulative, name = line[len("import time:"):].split("|")
+            depth = len(name) - len(name.lstrip())
+            name = name.strip()
+            while stack and stack[-1][0] >= depth:
+                stack.pop()
+            is_analytics = name == "analytics" or name.startswith("analytics.")
+            if is_analytics and not any(analytics for _, analytics in stack):
+                total += int(cumulative)
+            stack.append((depth, is_analytics))
+        return total / 1000
+
+    def test_startup_stays_lazy_and_within_budget(self):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "intern_logbook_analysis.settings",
+            "OLLAMA_WARM_UP_ON_STARTUP": "0",
+            "MONGODB_URI": "mongodb://unreachable.invalid:27017",
+        }
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", self.SCRIPT % (self.LAZY_MODULES,)],
+            cwd=Path(__file__).resolve().parent.parent, env=env, capture_output=True, text=True, timeout=120,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assertEqual(result.stdout.strip(), "", "imported at startup")
+        self.assertLess(self._analytics_import_ms(result.stderr), self.BUDGET_MS)
@@ -2,5 +2,11 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    path('interns/weekly-reports/', views.cohort_weekly_reports, name='cohort_weekly_reports'),
     path('interns/<str:intern_id>/weekly-report/', views.weekly_intern_report, name='weekly_intern_report'),
+    path('interns/<str:intern_id>/weekly-report/async/', views.weekly_intern_report_async, name='weekly_intern_report_async'),
+    path('inference/metrics/', views.inference_metrics, name='inference_metrics'),
+    path('inference/health/', views.ollama_health, name='ollama_health'),
+    path('metrics/', views.prometheus_metrics, name='prometheus_metrics'),
+    path('analytics/cohort-scores/', views.cohort_scores, name='cohort_scores'),
 ]
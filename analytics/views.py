@@ -1,7 +1,21 @@
 from __future__ import annotations
-from django.http import JsonResponse
+import json
+from datetime import date
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_GET
-from .services.report_generator import generate_weekly_report
+from .services.inference_scheduler import SchedulerQueueFull, get_async_limiter, get_scheduler
+from .services.llm_cache import get_llm_cache
+from .services.ollama_router import get_router
+from .services.tracing import prometheus_text, stage_metrics
+from .services.report_generator import (
+    agenerate_weekly_report,
+    generate_cohort_reports,
+    generate_weekly_report,
+    stream_weekly_report,
+)
+from .services.logbook_store import get_logbook_store
+from .services.utils import get_week_range, is_valid_intern_id
 
 
 @require_GET
@@ -26,10 +40,198 @@ def weekly_intern_report(request, intern_id: str):
     except ValueError:
         days = 7
 
-    report = generate_weekly_report(
-        intern_id=intern_id,
-        intern_name=intern_name,
-        days=days,
+    stream_format = request.GET.get("stream")
+    if stream_format in ("ndjson", "sse"):
+        try:
+            events = stream_weekly_report(
+                intern_id=intern_id,
+                intern_name=intern_name,
+                days=days,
+            )
+        except SchedulerQueueFull as e:
+            return _busy_response(e)
+        return _event_stream_response(events, stream_format)
+
+    try:
+        report, source = generate_weekly_report(
+            intern_id=intern_id,
+            intern_name=intern_name,
+            days=days,
+            use_stored=_use_precomputed(request),
+            with_source=True,
+        )
+    except SchedulerQueueFull as e:
+        return _busy_response(e)
+
+    return _report_response(report, source)
+
+
+@require_GET
+async def weekly_intern_report_async(request, intern_id: str):
+    """
+    Async twin of weekly_intern_report. Under an ASGI server (uvicorn/daphne) one worker
+    can hold many of these open while they wait on Mongo and Ollama.
+    """
+    intern_name = request.GET.get("name", f"Intern {intern_id}")
+    try:
+        days = int(request.GET.get("days", "7"))
+    except ValueError:
+        days = 7
+
+    try:
+        report, source = await agenerate_weekly_report(
+            intern_id=intern_id,
+            intern_name=intern_name,
+            days=days,
+            use_stored=_use_precomputed(request),
+            with_source=True,
+        )
+    except SchedulerQueueFull as e:
+        return _busy_response(e)
+
+    return _report_response(report, source)
+
+
+def _use_precomputed(request) -> bool:
+    """Serve a stored (e.g. nightly `score_interns`) report unless disabled or the caller asks for ?fresh=1."""
+    return getattr(settings, "SERVE_PRECOMPUTED_REPORTS", True) and request.GET.get("fresh") != "1"
+
+
+def _report_response(report, source: str) -> JsonResponse:
+    response = JsonResponse(report, safe=False, json_dumps_params={"ensure_ascii": False, "indent": 2})
+    if source == "precomputed":
+        response["X-Report-Source"] = "precomputed"
+    return response
+
+
+def _event_stream_response(events, stream_format: str) -> StreamingHttpResponse:
+    """
+    Relay report events as NDJSON (one JSON object per line) or Server-Sent Events
+    (`event: <name>` / `data: <json>` blocks).
+    """
+    if stream_format == "sse":
+        body = (
+            f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            for event in events
+        )
+        content_type = "text/event-stream"
+    else:
+        body = (json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+        content_type = "application/x-ndjson"
+
+    response = StreamingHttpResponse(body, content_type=content_type)
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream and killing time-to-first-byte
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _busy_response(error: SchedulerQueueFull) -> JsonResponse:
+    """429 with Retry-After when the Ollama inference queue is saturated."""
+    response = JsonResponse(
+        {"error": "The analysis service is busy, please retry later.", "retryAfter": error.retry_after},
+        status=429,
+    )
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+
+@require_GET
+def cohort_weekly_reports(request):
+    """
+    Weekly reports for a cohort of interns, e.g. /api/interns/weekly-reports/?ids=a,b,c&days=7
+    Reports are streamed back as newline-delimited JSON in completion order.
+    """
+    intern_ids = [
+        intern_id.strip()
+        for raw in request.GET.getlist("ids")
+        for intern_id in raw.split(",")
+        if intern_id.strip()
+    ]
+    # Keep the caller's order but drop duplicates
+    intern_ids = list(dict.fromkeys(intern_ids))
+
+    if not intern_ids:
+        return JsonResponse({"error": "Provide at least one intern id via ?ids=..."}, status=400)
+
+    max_cohort_size = getattr(settings, "MAX_COHORT_SIZE", 500)
+    if len(intern_ids) > max_cohort_size:
+        return JsonResponse(
+            {"error": f"At most {max_cohort_size} interns can be requested at once."},
+            status=400,
+        )
+
+    invalid_ids = [intern_id for intern_id in intern_ids if not is_valid_intern_id(intern_id)]
+    if invalid_ids:
+        return JsonResponse({"error": "Invalid intern ids.", "invalidIds": invalid_ids}, status=400)
+
+    try:
+        days = int(request.GET.get("days", "7"))
+    except ValueError:
+        days = 7
+
+    reports = generate_cohort_reports(intern_ids=intern_ids, days=days)
+    return StreamingHttpResponse(
+        (json.dumps(report, ensure_ascii=False) + "\n" for report in reports),
+        content_type="application/x-ndjson",
     )
 
-    return JsonResponse(report, safe=False, json_dumps_params={"ensure_ascii": False, "indent": 2})
+
+@require_GET
+def inference_metrics(request):
+    """
+    Queue depth, in-flight calls and wait/service times of the Ollama inference scheduler,
+    plus hit/miss counters of the analysis cache, per-backend router state and the
+    p50/p95/p99 of each report pipeline stage.
+    """
+    metrics = get_scheduler().metrics()
+    metrics["async"] = get_async_limiter().metrics()
+    cache = get_llm_cache()
+    metrics["cache"] = cache.stats() if cache is not None else None
+    metrics["router"] = get_router().metrics()
+    metrics["stages"] = stage_metrics()
+    return JsonResponse(metrics, json_dumps_params={"indent": 2})
+
+
+@require_GET
+def prometheus_metrics(request):
+    """p50/p95/p99, sum and count of every report pipeline stage, in Prometheus text format."""
+    return HttpResponse(prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@require_GET
+def ollama_health(request):
+    """
+    Probe every Ollama backend (reachable, model pulled, last warm-up) and update the
+    router's view of them. 503 when no backend is healthy.
+    """
+    backends = get_router().check_health()
+    ok = any(backend["ok"] for backend in backends)
+    return JsonResponse({"ok": ok, "backends": backends}, status=200 if ok else 503, json_dumps_params={"indent": 2})
+
+
+@require_GET
+def cohort_scores(request):
+    """
+    Scores of every intern (or ?ids=a,b) over any window, from the local logbook store:
+    /api/analytics/cohort-scores/?start=2025-09-01&end=2025-12-31[&daily=1]
+    """
+    start_date, end_date = request.GET.get("start"), request.GET.get("end")
+    if not start_date or not end_date:
+        start_date, end_date = get_week_range(days=7)
+    try:
+        date.fromisoformat(start_date)
+        date.fromisoformat(end_date)
+    except ValueError:
+        return JsonResponse({"error": "start and end must be YYYY-MM-DD dates."}, status=400)
+
+    intern_ids = [i.strip() for raw in request.GET.getlist("ids") for i in raw.split(",") if i.strip()]
+    store = get_logbook_store()
+    response = {
+        "start": start_date,
+        "end": end_date,
+        "scores": store.cohort_scores(start_date, end_date, intern_ids or None),
+    }
+    if request.GET.get("daily") == "1":
+        response["daily"] = store.daily_activity(start_date, end_date)
+    return JsonResponse(response)
@@ -13,4 +13,26 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'intern_logbook_analysis.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """
+    Django, plus the lifespan protocol: startup runs the serving-process hooks (index checks,
+    Ollama warm-up) and shutdown closes the Ollama HTTP client.
+    """
+    if scope["type"] != "lifespan":
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            from analytics.apps import start_serving_process
+
+            start_serving_process()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            from analytics.services.text_processing import aclose_async_client
+
+            await aclose_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -56,6 +56,8 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    # Outermost, so it adds to (rather than being replaced by) the debug toolbar's Server-Timing
+    'analytics.middleware.ServerTimingMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -146,11 +148,154 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MONGO_URI = os.getenv('MONGODB_URI')
 DATABASE_NAME = os.getenv('MONGODB_DB_NAME')
 
+# Shared MongoClient pool (one client per worker process, see analytics/services/mongo_client.py)
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '50'))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '0'))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', '300000'))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', '5000'))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', '30000'))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+
+# Indexes declared in analytics/services/mongo_indexes.py. `manage.py ensure_mongo_indexes`
+# creates/verifies them; with ENSURE_INDEXES_ON_STARTUP the app does it in the background on start.
+# EXPLAIN_QUERIES: explain() each hot query once per process and log COLLSCAN plans.
+MONGODB_ENSURE_INDEXES_ON_STARTUP = os.getenv('MONGODB_ENSURE_INDEXES_ON_STARTUP', '0') == '1'
+MONGODB_EXPLAIN_QUERIES = os.getenv('MONGODB_EXPLAIN_QUERIES', '0') == '1'
+
+# Where logbook entries come from: "mongo" (live dailyrecords) or "snapshot" (the mongodump
+# files in LOGBOOK_SNAPSHOT_DIR, no network needed). Snapshot report windows end at
+# LOGBOOK_SNAPSHOT_AS_OF ('YYYY-MM-DD', default: the latest entry in the snapshot).
+LOGBOOK_DATA_SOURCE = os.getenv('LOGBOOK_DATA_SOURCE', 'mongo')
+LOGBOOK_SNAPSHOT_DIR = os.getenv('LOGBOOK_SNAPSHOT_DIR') or str(BASE_DIR / 'analytics' / 'backup' / 'intern_logbook')
+LOGBOOK_SNAPSHOT_AS_OF = os.getenv('LOGBOOK_SNAPSHOT_AS_OF') or None
+
+# Local month-partitioned copy of the logbook with scoring features, filled by
+# `manage.py export_logbook_store`; serves /api/analytics/cohort-scores/.
+LOGBOOK_STORE_PATH = os.getenv('LOGBOOK_STORE_PATH') or str(BASE_DIR / 'logbook_store.sqlite3')
+
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_MODEL = "gemma3:1b"
 
 OLLAMA_API_URL = "http://localhost:11434"
 
-print("Loaded environment variables from .env file")
-print(f"MONGODB_URI: {os.getenv('MONGODB_URI')}")
-print(f"DATABASE_NAME: {os.getenv('MONGODB_DB_NAME')}")
\ No newline at end of file
+# Ollama inference scheduler: concurrent generations, queued calls beyond that
+# (extra calls get HTTP 429), and the per-call timeout in seconds.
+OLLAMA_MAX_IN_FLIGHT = int(os.getenv('OLLAMA_MAX_IN_FLIGHT', '2'))
+OLLAMA_QUEUE_SIZE = int(os.getenv('OLLAMA_QUEUE_SIZE', '32'))
+OLLAMA_REQUEST_TIMEOUT = float(os.getenv('OLLAMA_REQUEST_TIMEOUT', '120'))
+
+# The async views (ASGI) have their own limiter with OLLAMA_ASYNC_MAX_IN_FLIGHT slots (default:
+# OLLAMA_MAX_IN_FLIGHT). A process that serves both the sync and the async views can therefore
+# run both budgets at once; split the Ollama capacity between the two settings in that case.
+OLLAMA_ASYNC_MAX_IN_FLIGHT = int(os.getenv('OLLAMA_ASYNC_MAX_IN_FLIGHT', '0')) or None
+
+# How long Ollama keeps the model loaded after a call (Ollama duration string, "-1" = forever),
+# and whether the serving process loads it at startup so the first report skips the load time.
+# The warm-up runs from wsgi.py (also used by runserver) and the ASGI lifespan startup only.
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+OLLAMA_WARM_UP_ON_STARTUP = os.getenv('OLLAMA_WARM_UP_ON_STARTUP', '1') == '1'
+
+# Several Ollama servers (comma-separated URLs) behind the router: least-outstanding-requests
+# balancing and failover; a failed server is skipped for OLLAMA_BACKEND_COOLDOWN seconds. Empty = OLLAMA_API_URL only.
+# When a call takes longer than OLLAMA_LATENCY_SLO seconds, OLLAMA_FALLBACK_MODEL (a smaller
+# model) is used for the next cooldown period; unset either one to disable the fallback.
+OLLAMA_BACKENDS = [url.strip() for url in os.getenv('OLLAMA_BACKENDS', '').split(',') if url.strip()]
+OLLAMA_BACKEND_COOLDOWN = float(os.getenv('OLLAMA_BACKEND_COOLDOWN', '30'))
+OLLAMA_FALLBACK_MODEL = os.getenv('OLLAMA_FALLBACK_MODEL') or None
+OLLAMA_LATENCY_SLO = float(os.getenv('OLLAMA_LATENCY_SLO')) if os.getenv('OLLAMA_LATENCY_SLO') else None
+
+# Structured output: the analysis JSON schema is sent as Ollama's `format`, and the answer is
+# validated while it streams. An invalid answer stops the generation and is retried with a
+# repair prompt; OLLAMA_JSON_MAX_ATTEMPTS bounds the generations per analysis.
+OLLAMA_STRUCTURED_OUTPUT = os.getenv('OLLAMA_STRUCTURED_OUTPUT', '1') == '1'
+OLLAMA_JSON_MAX_ATTEMPTS = int(os.getenv('OLLAMA_JSON_MAX_ATTEMPTS', '2'))
+
+# Log entries are normalized before they go into prompts: whitespace collapsed and anything
+# but letters, digits and basic punctuation removed. Only ASCII letters survive unless
+# TEXT_NORMALIZE_UNICODE=1, which keeps the letters of every script (accented names, Sinhala, Tamil).
+TEXT_NORMALIZE_UNICODE = os.getenv('TEXT_NORMALIZE_UNICODE', '0') == '1'
+
+# Per-stage timings of the report pipeline (fetch, scoring, prompt, LLM, parse): sent as a
+# Server-Timing header, logged per request and aggregated at /api/metrics/ (Prometheus).
+PIPELINE_TRACING = os.getenv('PIPELINE_TRACING', '1') == '1'
+
+# Prompt budget: logbook text sent to the model is kept under OLLAMA_PROMPT_TOKEN_BUDGET
+# (estimated) tokens. Repeated lines are compressed, recent entries kept verbatim and older
+# ones summarized in parallel chunks of PROMPT_SUMMARY_CHUNK_TOKENS (or dropped when
+# PROMPT_SUMMARIZE_OLDER is off).
+OLLAMA_PROMPT_TOKEN_BUDGET = int(os.getenv('OLLAMA_PROMPT_TOKEN_BUDGET', '3000'))
+PROMPT_SUMMARY_CHUNK_TOKENS = int(os.getenv('PROMPT_SUMMARY_CHUNK_TOKENS', '1500'))
+PROMPT_SUMMARIZE_OLDER = os.getenv('PROMPT_SUMMARIZE_OLDER', '1') == '1'
+
+# Windows of LONG_WINDOW_MIN_DAYS or more (semester reviews) are analyzed week by week,
+# LONG_WINDOW_WORKERS weeks at a time, and a reduce prompt combines the weekly analyses.
+LONG_WINDOW_MIN_DAYS = int(os.getenv('LONG_WINDOW_MIN_DAYS', '14'))
+LONG_WINDOW_WORKERS = int(os.getenv('LONG_WINDOW_WORKERS', '4'))
+
+# Cache of Ollama analysis results keyed by hash(model, options, prompt).
+# BACKEND: "memory" (per process), "sqlite" (db.sqlite3, shared by workers),
+# "django" (Django cache alias given by ALIAS) or None to disable.
+LLM_CACHE = {
+    'BACKEND': os.getenv('LLM_CACHE_BACKEND', 'sqlite'),
+    'TTL': int(os.getenv('LLM_CACHE_TTL', '86400')),
+    'MAX_ENTRIES': int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000')),
+}
+
+# Per-intern, per-day feature store (kept up to date by `manage.py sync_intern_features`).
+# When enabled, report scores are summed from the stored daily aggregates.
+FEATURE_STORE_ENABLED = os.getenv('FEATURE_STORE_ENABLED', '0') == '1'
+FEATURE_STORE_INTERN_FIELD = 'internId'
+FEATURE_STORE_UPDATED_FIELD = 'updatedAt'
+
+# Sentiment scorer used by the scoring engine: "lexicon" (batched lexicon lookups,
+# same rules and scale as TextBlob) or "textblob" (needs the optional textblob package).
+# SENTIMENT_LEXICON_PATH: pattern-style sentiment XML; defaults to analytics/data/en-sentiment.xml,
+# the lexicon TextBlob uses, so the default backend needs no extra package.
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'lexicon')
+SENTIMENT_LEXICON_PATH = os.getenv('SENTIMENT_LEXICON_PATH') or None
+
+# Nightly `manage.py score_interns` batch: reports land in the WeeklyReport table and the
+# weekly report API serves them (unless ?fresh=1) while they cover the current window.
+# SCORE_INTERNS_CHECKPOINT: progress file used by `score_interns --resume`.
+SERVE_PRECOMPUTED_REPORTS = os.getenv('SERVE_PRECOMPUTED_REPORTS', '1') == '1'
+# PERSIST_WEEKLY_REPORTS: generate_weekly_report stores its reports too and serves them
+# again while the entries fingerprint, OLLAMA_MODEL and PROMPT_VERSION are unchanged.
+PERSIST_WEEKLY_REPORTS = os.getenv('PERSIST_WEEKLY_REPORTS', '1') == '1'
+SCORE_INTERNS_CHECKPOINT = os.getenv('SCORE_INTERNS_CHECKPOINT') or str(BASE_DIR / 'score_interns.checkpoint.json')
+
+# Cohort report endpoint (/api/interns/weekly-reports/)
+MAX_COHORT_SIZE = 500
+COHORT_REPORT_WORKERS = 4
+
+# Logging: the analytics loggers write through a bounded queue drained by a background
+# thread, so request threads never block on log I/O (records are dropped when it is full).
+# LOG_FORMAT=json emits one JSON object per line. Debug dumps of entries and model output
+# go to the `analytics.payloads` logger: off unless LOG_PAYLOAD_LEVEL=DEBUG, then only
+# LOG_PAYLOAD_SAMPLE_RATE of them are kept, each cut to LOG_PAYLOAD_MAX_CHARS characters.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_PAYLOAD_LEVEL = os.getenv('LOG_PAYLOAD_LEVEL', 'INFO')
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', '2000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'payload_sample': {
+            '()': 'analytics.services.structured_logging.SamplingFilter',
+            'rate': LOG_PAYLOAD_SAMPLE_RATE,
+        },
+    },
+    'handlers': {
+        'queued': {
+            '()': 'analytics.services.structured_logging.queued_stream_handler',
+            'json_format': LOG_FORMAT == 'json',
+        },
+    },
+    'loggers': {
+        'analytics': {'handlers': ['queued'], 'level': LOG_LEVEL, 'propagate': False},
+        'analytics.payloads': {'level': LOG_PAYLOAD_LEVEL, 'filters': ['payload_sample']},
+    },
+}
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'intern_logbook_analysis.settings')
 
 application = get_wsgi_application()
+
+# Loaded by WSGI servers and by runserver (in the process that serves, not the autoreloader)
+from analytics.apps import start_serving_process  # noqa: E402
+
+start_serving_process()